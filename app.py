@@ -7,12 +7,37 @@ import os
 import logging
 from dotenv import load_dotenv
 from flask import Flask, jsonify
-from flask_jwt_extended import JWTManager
 from flasgger import Swagger
 
 from controllers.user_controller import user_bp
 from controllers.electrodomesticos_controller import electrodomesticos_bp
+from controllers.jobs_controller import jobs_bp
+from controllers.health_controller import health_bp
+from controllers.export_controller import export_bp
+from controllers.profiler_controller import profiler_bp
+from controllers.batch_controller import batch_bp
+from controllers.load_shedding import init_load_control, init_warmup_gate, route_policy
 from models.db import db
+from commands.user_commands import users_cli
+from commands.job_commands import jobs_cli
+from commands.db_commands import db_cli
+from commands.health_commands import health_cli
+from commands.export_commands import export_cli
+from commands.shard_commands import shards_cli
+from commands.sse_commands import sse_cli
+from services.token_service import configure_jwt
+from services.query_cache import query_cache
+from services.catalog_snapshot import catalog_snapshot
+from services.stock_buffer import stock_buffer
+from services.job_queue import job_queue
+from services.columnar_catalog import columnar_catalog
+from services.tracing import tracer
+from services import sqlite_profile
+from services.sharding import shard_router
+from services.warmup import catalog_warmup
+from services.profiler import profiler
+from services.shared_paths import database_url
+from services.electrodomesticos_service import ElectrodomesticosService
 
 # =========================
 # Carga de entorno y logging
@@ -59,41 +84,79 @@ swagger = Swagger(app, template=swagger_template)
 # =========================
 # Configuración DB y JWT
 # =========================
-db_url = os.getenv("MYSQL_URL")
-if db_url and db_url.startswith("mysql://"):
-    # Normaliza a dialecto + driver de SQLAlchemy
-    db_url = db_url.replace("mysql://", "mysql+pymysql://", 1)
-
-if not db_url:
+# La misma URL identifica el estado compartido en /dev/shm de esta base de datos (services/shared_paths.py)
+db_url = database_url()
+if not os.getenv("MYSQL_URL"):
     # Fallback útil para desarrollo local si no hay MYSQL_URL
     logger.warning("MYSQL_URL no definido. Usando SQLite local 'sqlite:///app.db'.")
-    db_url = "sqlite:///app.db"
 
 app.config["SQLALCHEMY_DATABASE_URI"] = db_url
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "tu_clave_secreta_jwt")
 
-jwt = JWTManager(app)
+# SQLite en un solo nodo: WAL, PRAGMA de rendimiento y engines separados de lectura y escritura
+sqlite_profile.configure(app, db_url)
+
+# Sharding opcional de los electrodomésticos (SHARD_URLS): un bind por shard
+shard_router.configure(app)
+
+# JWT: algoritmo (HS256, RS256, EdDSA...), rotación de claves por kid y caché de verificación
+jwt = configure_jwt(app)
 logger.info(f"Conexión a la base de datos: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
 # Inicializar extensiones
 db.init_app(app)
+with app.app_context():
+    sqlite_profile.register_engines(db.engines)
+    shard_router.register_engines(db.engines)
 logger.info("SQLAlchemy inicializado")
 
+# Trazas por capa de las peticiones lentas (TRACING_ENABLED=1)
+tracer.init_app(app)
+
+# Profiler de muestreo bajo demanda (POST /profiler/): registra qué endpoint atiende cada hilo
+profiler.init_app(app)
+
+# Plazos por petición trasladados a SQL y rechazo temprano de carga (LOAD_SHEDDING=1)
+with app.app_context():
+    init_load_control(app, db.engines.values())
+
 # =========================
 # Blueprints
 # =========================
 app.register_blueprint(user_bp)
 app.register_blueprint(electrodomesticos_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(health_bp)
+app.register_blueprint(export_bp)
+app.register_blueprint(profiler_bp)
+app.register_blueprint(batch_bp)
 
 logger.info("Blueprint de usuarios registrado")
 logger.info("Blueprint de electrodomésticos registrado")
+logger.info("Blueprint de trabajos registrado")
+logger.info("Blueprint de salud registrado")
+logger.info("Blueprint de exportación registrado")
+logger.info("Blueprint del profiler registrado")
+logger.info("Blueprint de lotes registrado")
+
+# =========================
+# Comandos CLI (flask --app app <grupo> <comando>)
+# =========================
+app.cli.add_command(users_cli)
+app.cli.add_command(jobs_cli)
+app.cli.add_command(db_cli)
+app.cli.add_command(health_cli)
+app.cli.add_command(export_cli)
+app.cli.add_command(shards_cli)
+app.cli.add_command(sse_cli)
 
 # =========================
 # Rutas utilitarias
 # =========================
 @app.route("/health")
+@route_policy(shed=False)
 def health():
+    # Liveness (igual que /health/live); la comprobación de dependencias está en /health/ready
     return {"status": "ok"}, 200
 
 
@@ -108,9 +171,28 @@ def index():
             "endpoints": {
                 "POST /users/register": "Registro de usuario",
                 "POST /users/login": "Login y obtención de JWT",
+                "POST /users/refresh": "Nuevo access token a partir del refresh token",
+                "POST /users/bulk": "Alta masiva de usuarios (requiere JWT de administrador)",
                 "GET /users/": "Listado de usuarios (requiere JWT)",
+                "GET /electrodomesticos/": "Listado de electrodomésticos (requiere JWT)",
+                "GET /electrodomesticos/<id>": "Electrodoméstico por ID (requiere JWT)",
+                "GET /electrodomesticos/tipo/<tipo>": "Filtro por tipo (requiere JWT)",
+                "GET /electrodomesticos/marca/<marca>": "Filtro por marca (requiere JWT)",
+                "GET /electrodomesticos/en-stock": "Electrodomésticos en stock (requiere JWT)",
+                "GET /electrodomesticos/precio?min=&max=": "Filtro por rango de precio (requiere JWT)",
+                "PUT /electrodomesticos/<id>/stock": "Cambio de stock (write-behind con STOCK_WRITE_BEHIND=1) (requiere JWT)",
+                "GET /electrodomesticos/<id>/precios?from=&to=&bucket=": "Histórico de precios: eventos o agregados por hora/día (requiere JWT)",
+                "GET /electrodomesticos/stats": "Estadísticas del catálogo por tipo (requiere JWT)",
+                "GET /electrodomesticos/stream": "Stream SSE de cambios de stock y precio (requiere JWT)",
+                "GET /jobs/": "Estado de la cola de trabajos (requiere JWT de administrador)",
+                "GET /export/<tabla>?format=csv|arrow|parquet": "Exportación masiva por lotes (requiere JWT de administrador)",
+                "POST /profiler/": "Perfil de muestreo de N segundos en un worker (requiere JWT de administrador)",
+                "GET /profiler/<id>?format=collapsed|speedscope": "Resultado del perfil (requiere JWT de administrador)",
+                "POST /batch": "Varias subpeticiones a /users y /electrodomesticos en una, opcionalmente en una sola transacción",
                 "GET /": "Información de la API",
-                "GET /health": "Health check",
+                "GET /health": "Health check (liveness)",
+                "GET /health/ready": "Readiness: base de datos, pool, colas y modo drenaje",
+                "POST /health/drain": "Activa el modo drenaje (requiere JWT de administrador)",
             },
             "repository": "https://github.com/afmirandad/FlaskAPIExample",
         },
@@ -121,13 +203,41 @@ def index():
 # Creación de tablas
 # =========================
 def create_tables_if_not_exist() -> None:
-    """Crea las tablas definidas en modelos que heredan de db.Model."""
+    """
+    Crea las tablas definidas en modelos que heredan de db.Model.
+    No modifica tablas existentes: los cambios de esquema se aplican con `flask --app app db upgrade`.
+    """
     with app.app_context():
         db.create_all()
+        shard_router.create_tables(db.metadata)
         logger.info("Tablas creadas en la base de datos (db.Model)")
 
 create_tables_if_not_exist()
 
+# La caché de listados compartida (y el snapshot) puede venir de una ejecución anterior: se descarta
+# al arrancar. Con gunicorn lo hace una sola vez el master (gunicorn.conf.py), no cada worker al importar
+# la app: un worker que arranca tarde no invalida lo que otros ya han cargado o calentado
+if os.getenv("QUERY_CACHE_RESET_ON_IMPORT", "1") == "1":
+    query_cache.invalidate()
+
+
+columnar_catalog.configure(app, ElectrodomesticosService.build_columnar_catalog)
+
+# Calentamiento de los listados más pedidos (CATALOG_WARMUP=1): en el master con preload_app, o
+# en un hilo con la puerta que retiene las peticiones hasta que termine
+catalog_warmup.configure(app, ElectrodomesticosService.warm_catalog)
+init_warmup_gate(app, catalog_warmup)
+
+
+@app.before_request
+def start_worker_threads():
+    # Los hilos del snapshot y del buffer de stock se arrancan en cada worker ya forkeado (no hacen nada si están desactivados)
+    if not job_queue.enabled:
+        # Con BACKGROUND_JOBS=1 el snapshot lo recompila el worker de trabajos
+        catalog_snapshot.start(app, ElectrodomesticosService.build_catalog_snapshot)
+    # El del buffer de stock vuelca también lo que quedara en el journal tras una caída
+    stock_buffer.start(app, ElectrodomesticosService.apply_stock_changes)
+
 # =========================
 # Manejo básico de errores
 # =========================
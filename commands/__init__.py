@@ -0,0 +1,2 @@
+# Este archivo permite que la carpeta commands sea tratada como un módulo.
+# Aquí se definen los comandos de la CLI de Flask (`flask <grupo> <comando>`), registrados en app.py.
@@ -0,0 +1,59 @@
+"""
+Comandos de CLI para las migraciones de esquema.
+Uso: flask --app app db upgrade   (antes de arrancar los workers)
+"""
+
+import sys
+import click
+from flask.cli import AppGroup
+from models.db import db
+from services.migrations import MigrationRunner
+from services.precios_service import PreciosService
+from services.sharding import shard_router
+import logging
+
+logger = logging.getLogger(__name__)
+
+db_cli = AppGroup('db', help='Migraciones de esquema de la base de datos.')
+
+
+@db_cli.command('upgrade')
+@click.option('--target', default=None, help='Revisión hasta la que migrar (por defecto, todas).')
+@click.option('--batch-size', default=1000, show_default=True, help='Filas por lote en los backfills.')
+@click.option('--throttle', default=0.05, show_default=True, help='Segundos de pausa entre lotes de backfill.')
+def upgrade(target, batch_size, throttle):
+    """Aplica las migraciones pendientes."""
+    applied = MigrationRunner(db.engine).upgrade(target, batch_size=batch_size, throttle_seconds=throttle)
+    click.echo(f'Migraciones aplicadas: {", ".join(applied)}' if applied else 'El esquema ya está al día')
+    if shard_router.enabled:
+        # Los shards se crean con el esquema actual de sus tablas; no tienen historial de migraciones
+        shard_router.create_tables(db.metadata)
+        click.echo(f'Tablas de {len(shard_router.engines)} shards comprobadas')
+
+
+@db_cli.command('status')
+def status():
+    """Lista las migraciones y si están aplicadas."""
+    for migration in MigrationRunner(db.engine).status():
+        state = 'aplicada' if migration['applied_at'] else 'pendiente'
+        click.echo(f'{migration["revision"]}  {state:9}  {migration["description"]}')
+
+
+@db_cli.command('check')
+def check():
+    """Sale con código 1 si los modelos declaran tablas, columnas o índices que faltan en la base."""
+    missing = MigrationRunner(db.engine).drift(db.metadata)
+    for item in missing:
+        click.echo(f'Falta {item}')
+    if missing:
+        click.echo('Ejecuta `flask --app app db upgrade` o añade una migración')
+        sys.exit(1)
+    click.echo('El esquema coincide con los modelos')
+
+
+@db_cli.command('prune-precios')
+@click.option('--days', default=365, show_default=True, help='Antigüedad a partir de la cual se purgan los eventos.')
+def prune_precios(days):
+    """Purga los eventos antiguos del histórico de precios (los agregados por hora y día se conservan)."""
+    deleted = PreciosService.prune_events(days)
+    click.echo(f'Eventos de precio purgados: {deleted}')
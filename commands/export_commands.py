@@ -0,0 +1,46 @@
+"""
+Comandos de CLI para exportar tablas completas.
+Uso: flask --app app export electrodomesticos --format parquet --output catalogo.parquet
+"""
+
+import sys
+import click
+from flask.cli import AppGroup
+from models.db import db
+from services.export_service import EXPORT_TABLES, FORMATS, export_table
+import logging
+
+logger = logging.getLogger(__name__)
+
+export_cli = AppGroup('export', help='Exportación masiva (CSV, Arrow IPC, Parquet).')
+
+
+def _register(table):
+    @export_cli.command(table)
+    @click.option('--format', '-f', 'fmt', type=click.Choice(list(FORMATS)), default='csv', show_default=True,
+                  help='arrow y parquet requieren pyarrow.')
+    @click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True), default='-', show_default=True,
+                  help='Archivo de salida (- para la salida estándar).')
+    @click.option('--batch-size', default=10000, show_default=True, help='Filas leídas y codificadas por lote.')
+    def command(fmt, output, batch_size):
+        try:
+            chunks = export_table(db.session, table, fmt, batch_size)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+            db.session.remove()
+        if output != '-':
+            click.echo(f'Exportación de {table} guardada en {output}', err=True)
+
+    command.__doc__ = f'Exporta la tabla {table}.'
+    return command
+
+
+for _table in EXPORT_TABLES:
+    _register(_table)
@@ -0,0 +1,32 @@
+"""
+Comandos de CLI para el modo drenaje.
+Uso (p. ej. en el preStop del contenedor): flask --app app health drain --wait 15
+"""
+
+import time
+import click
+from flask.cli import AppGroup
+from services.health_service import readiness_probe
+import logging
+
+logger = logging.getLogger(__name__)
+
+health_cli = AppGroup('health', help='Readiness y modo drenaje.')
+
+
+@health_cli.command('drain')
+@click.option('--wait', default=0, show_default=True,
+              help='Segundos a esperar tras activar el drenaje (para que el balanceador deje de enviar tráfico).')
+def drain(wait):
+    """Hace fallar la readiness de todos los workers antes de un apagado ordenado."""
+    readiness_probe.start_drain()
+    click.echo('Modo drenaje activado')
+    if wait:
+        time.sleep(wait)
+
+
+@health_cli.command('undrain')
+def undrain():
+    """Desactiva el modo drenaje."""
+    readiness_probe.stop_drain()
+    click.echo('Modo drenaje desactivado')
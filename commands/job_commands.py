@@ -0,0 +1,79 @@
+"""
+Comandos de CLI para la cola de trabajos en segundo plano.
+Uso: flask --app app jobs worker --concurrency 4
+"""
+
+import signal
+import threading
+import time
+import click
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from flask.cli import AppGroup
+from services.catalog_snapshot import catalog_snapshot
+from services.electrodomesticos_service import ElectrodomesticosService
+from services.event_broker import event_broker
+from services.job_queue import job_queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+jobs_cli = AppGroup('jobs', help='Cola de trabajos en segundo plano.')
+
+
+@jobs_cli.command('worker')
+@click.option('--concurrency', default=4, show_default=True, help='Trabajos ejecutándose a la vez.')
+@click.option('--poll-interval', default=0.2, show_default=True, help='Segundos entre consultas a la cola.')
+@click.option('--maintenance-interval', default=60, show_default=True,
+              help='Segundos entre purgas de trabajos completados y de eventos antiguos.')
+def worker(concurrency, poll_interval, maintenance_interval):
+    """Ejecuta los trabajos encolados hasta recibir SIGTERM o SIGINT; termina los que tiene en curso."""
+    app = current_app._get_current_object()
+    running = set()
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        logger.info(f'Señal {signal.Signals(signum).name} recibida: el worker termina los trabajos en curso')
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    def run(job):
+        with app.app_context():
+            job_queue.run(job)
+
+    def maintenance():
+        purged = job_queue.purge(job_queue.retention_seconds)
+        if purged:
+            logger.info(f'{purged} trabajos completados purgados')
+        # Con la cola activa los workers web no purgan los eventos del stream: lo hace este proceso
+        event_broker.prune()
+
+    # Con la cola activa el snapshot del catálogo se recompila aquí y no en los workers web
+    catalog_snapshot.start(app, ElectrodomesticosService.build_catalog_snapshot)
+    logger.info(f'Worker de trabajos iniciado (concurrencia {concurrency})')
+    next_maintenance = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while not stopping.is_set():
+            if time.monotonic() >= next_maintenance:
+                maintenance()
+                next_maintenance = time.monotonic() + maintenance_interval
+            running = {f for f in running if not f.done()}
+            free = concurrency - len(running)
+            jobs = job_queue.claim(free) if free > 0 else []
+            for job in jobs:
+                running.add(pool.submit(run, job))
+            if not jobs:
+                stopping.wait(poll_interval)
+        # Al salir del bloque se espera a los trabajos reservados: ninguno queda en 'running'
+        logger.info(f'Esperando a {sum(not f.done() for f in running)} trabajos en curso')
+    logger.info('Worker de trabajos detenido')
+
+
+@jobs_cli.command('purge')
+@click.option('--older-than', default=86400, show_default=True, help='Antigüedad mínima en segundos.')
+def purge(older_than):
+    """Borra los trabajos completados antiguos."""
+    purged = job_queue.purge(older_than)
+    click.echo(f'Trabajos completados antiguos eliminados: {purged}')
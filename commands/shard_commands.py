@@ -0,0 +1,75 @@
+"""
+Comandos de CLI para el sharding de electrodomésticos (SHARD_URLS).
+Uso: flask --app app shards status
+     flask --app app shards import        (al activar el sharding sobre una base existente)
+     flask --app app shards rebalance     (tras añadir o quitar shards de SHARD_URLS)
+"""
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+from models.db import db
+from models.directorio import ElectrodomesticoDirectorio
+from models.electrodomesticos import Electrodomestico
+from repositories.sharded_electrodomesticos_repository import ShardedElectrodomesticosRepository
+from services.query_cache import query_cache
+from services.sharding import shard_router
+import logging
+
+logger = logging.getLogger(__name__)
+
+shards_cli = AppGroup('shards', help='Sharding de electrodomésticos: estado, importación y rebalanceo.')
+
+
+def _require_sharding():
+    if not shard_router.enabled:
+        raise click.UsageError('El sharding no está activo: define SHARD_URLS')
+
+
+@shards_cli.command('status')
+def status():
+    """Filas por shard (según el propio shard y según el directorio)."""
+    _require_sharding()
+    directorio = dict(db.session.execute(
+        select(ElectrodomesticoDirectorio.shard, func.count()).group_by(ElectrodomesticoDirectorio.shard)
+    ).all())
+    db.session.remove()
+    for shard in shard_router.shards:
+        with shard_router.session(shard) as session:
+            rows = session.execute(select(func.count()).select_from(Electrodomestico)).scalar()
+        click.echo(f'shard {shard}  {rows:>9} filas  {directorio.get(shard, 0):>9} en el directorio  '
+                   f'{shard_router.urls[shard]}')
+
+
+@shards_cli.command('import')
+@click.option('--batch-size', default=500, show_default=True, help='Filas copiadas por lote.')
+def import_unsharded(batch_size):
+    """Copia a los shards los electrodomésticos de la base principal que aún no están en el directorio."""
+    _require_sharding()
+    try:
+        imported = ShardedElectrodomesticosRepository.import_unsharded(db.session, batch_size)
+    finally:
+        db.session.remove()
+    query_cache.invalidate()
+    click.echo(f'Electrodomésticos importados a los shards: {imported}')
+
+
+@shards_cli.command('rebalance')
+@click.option('--batch-size', default=500, show_default=True, help='Filas revisadas por lote y shard.')
+@click.option('--dry-run', is_flag=True, help='Solo muestra cuántas filas se moverían.')
+def rebalance(batch_size, dry_run):
+    """Mueve las filas que el mapa actual asigna a otro shard; se puede interrumpir y repetir."""
+    _require_sharding()
+    try:
+        summary = ShardedElectrodomesticosRepository.rebalance(db.session, batch_size, dry_run)
+    finally:
+        db.session.remove()
+    if not dry_run:
+        query_cache.invalidate()
+    verb = 'se moverían' if dry_run else 'movidas'
+    for (source, target), moved in sorted(summary['movidas'].items()):
+        click.echo(f'shard {source} -> shard {target}: {moved} filas {verb}')
+    if summary['huerfanas']:
+        click.echo(f'Copias huérfanas {"a eliminar" if dry_run else "eliminadas"}: {summary["huerfanas"]}')
+    if not summary['movidas'] and not summary['huerfanas']:
+        click.echo('Todas las filas están en su shard')
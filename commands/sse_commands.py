@@ -0,0 +1,22 @@
+"""
+Comandos de CLI del servidor SSE.
+Uso: flask --app app sse serve --port 6061
+"""
+
+import os
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from services.sse_server import serve as serve_streams
+
+sse_cli = AppGroup('sse', help='Servidor del stream SSE.')
+
+
+@sse_cli.command('serve')
+@click.option('--host', default=lambda: os.getenv('SSE_HOST', '0.0.0.0'), show_default='0.0.0.0')
+@click.option('--port', default=lambda: int(os.getenv('SSE_PORT', '6061')), show_default='6061', type=int)
+@click.option('--max-streams', default=lambda: int(os.getenv('SSE_SERVER_MAX_STREAMS', '10000')),
+              show_default='10000', type=int, help='Streams abiertos a la vez antes de responder 503.')
+def serve(host, port, max_streams):
+    """Sirve GET /electrodomesticos/stream con un bucle asyncio hasta recibir SIGTERM o SIGINT."""
+    serve_streams(current_app._get_current_object(), host, port, max_streams)
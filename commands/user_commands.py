@@ -0,0 +1,66 @@
+"""
+Comandos de CLI para usuarios.
+Uso: flask --app app users import usuarios.csv
+     flask --app app users create-admin admin
+     flask --app app users grant-admin <username>   (y revoke-admin)
+"""
+
+import time
+import click
+from flask.cli import AppGroup
+from services.user_service import UserService
+import logging
+
+logger = logging.getLogger(__name__)
+
+users_cli = AppGroup('users', help='Gestión de usuarios.')
+
+
+@users_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Formato del archivo (por defecto según la extensión).')
+@click.option('--batch-size', default=1000, show_default=True, help='Usuarios por INSERT.')
+@click.option('--workers', default=None, type=int, help='Procesos para calcular hashes (por defecto, CPUs).')
+@click.option('--hash-method', default=None,
+              help='Método de hash de werkzeug, por ejemplo pbkdf2:sha256:100000.')
+def import_users(path, fmt, batch_size, workers, hash_method):
+    """Importa usuarios desde un CSV (username,password) o un JSONL."""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, encoding='utf-8') as f:
+        records = UserService.parse_user_records(f.read(), fmt)
+    start = time.perf_counter()
+    summary = UserService.bulk_register(records, batch_size=batch_size, workers=workers, hash_method=hash_method)
+    elapsed = time.perf_counter() - start
+    click.echo(f'{summary["created"]} creados, {summary["existing"]} existentes, '
+               f'{summary["duplicated"]} repetidos, {summary["invalid"]} inválidos, {summary["reserved"]} reservados '
+               f'de {summary["received"]} en {elapsed:.1f} s')
+
+
+@users_cli.command('create-admin')
+@click.argument('username')
+@click.password_option(help='Contraseña (se pide por teclado si se omite).')
+def create_admin(username, password):
+    """Crea un administrador; admite los nombres reservados en ADMIN_USERNAMES."""
+    user = UserService.create_admin(username, password)
+    if isinstance(user, dict):
+        raise click.ClickException(f'El usuario {username} ya existe: usa grant-admin')
+    click.echo(f'Administrador {user.username} creado (ID: {user.id})')
+
+
+@users_cli.command('grant-admin')
+@click.argument('username')
+def grant_admin(username):
+    """Concede permisos de administración a un usuario existente."""
+    if UserService.set_admin(username, True) is None:
+        raise click.ClickException(f'Usuario no encontrado: {username}')
+    click.echo(f'{username} es administrador')
+
+
+@users_cli.command('revoke-admin')
+@click.argument('username')
+def revoke_admin(username):
+    """Retira los permisos de administración a un usuario."""
+    if UserService.set_admin(username, False) is None:
+        raise click.ClickException(f'Usuario no encontrado: {username}')
+    click.echo(f'{username} ya no es administrador')
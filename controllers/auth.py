@@ -0,0 +1,24 @@
+"""
+Decoradores de autorización compartidos por los controladores.
+"""
+
+from functools import wraps
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from services.user_service import UserService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def admin_required(fn):
+    """Exige un JWT válido de un usuario con `is_admin` (concedido desde la CLI)."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        identity = get_jwt_identity()
+        if not UserService.is_admin(identity):
+            logger.warning(f'Acceso de administración denegado para usuario ID: {identity}')
+            return jsonify({'msg': 'Se requieren permisos de administrador'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,250 @@
+"""
+Controlador de lotes: POST /batch ejecuta en orden varias subpeticiones contra las rutas de
+usuarios y electrodomésticos y devuelve todas las respuestas en un solo cuerpo.
+Las subpeticiones se despachan dentro del mismo proceso y de la misma petición (sin hooks,
+sin volver a pasar por el limitador ni por la puerta de calentamiento): comparten la sesión de
+base de datos, el plazo del lote y la verificación del JWT, que se hace una vez para el sobre
+y las subpeticiones heredan (la caché de tokens resuelve las siguientes).
+"""
+
+import json
+import os
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask.globals import request_ctx
+from flask_jwt_extended import verify_jwt_in_request
+from werkzeug.test import EnvironBuilder
+from controllers.idempotency import idempotent
+from controllers.load_shedding import route_policy
+from controllers.validation import decode_body
+from schemas.base import ValidationError
+from schemas.batch import BatchRequest, SubRequest
+from services.batch_service import BatchService, in_transaction
+from services.load_control import deadline_expired
+from services.sharding import shard_router
+import logging
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch_bp', __name__)
+
+MAX_BATCH_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
+BATCH_TIMEOUT_MS = int(os.getenv('BATCH_TIMEOUT_MS', '30000'))
+BATCH_BLUEPRINTS = ('user_bp', 'electrodomesticos_bp')
+# Cabeceras de la subrespuesta que se devuelven en el lote (el cuerpo va siempre como JSON)
+FORWARDED_HEADERS = ('ETag', 'Location', 'Retry-After', 'Idempotent-Replayed')
+LOGIN_ENDPOINT = 'user_bp.login'
+
+
+def _decode_body():
+    """Devuelve (lote, subpeticiones, None) o (None, None, respuesta de error)."""
+    batch, error = decode_body(BatchRequest)
+    if error:
+        return None, None, error
+    if not 1 <= len(batch.requests) <= MAX_BATCH_REQUESTS:
+        return None, None, (jsonify({'msg': f'El lote debe tener entre 1 y {MAX_BATCH_REQUESTS} subpeticiones'}), 400)
+    items = []
+    for index, raw in enumerate(batch.requests):
+        try:
+            sub = SubRequest.decode(raw)
+        except ValidationError as e:
+            return None, None, (jsonify({'msg': 'Datos inválidos', 'index': index, 'detail': e.errors}), 422)
+        errors = {}
+        if not sub.path.startswith('/'):
+            errors['path'] = 'debe empezar por /'
+        if sub.headers and not all(type(value) is str for value in sub.headers.values()):
+            errors['headers'] = 'los valores deben ser texto'
+        if errors:
+            return None, None, (jsonify({'msg': 'Datos inválidos', 'index': index, 'detail': errors}), 422)
+        items.append(sub)
+    return batch, items, None
+
+
+def _item(status, body=None, headers=None):
+    """Respuesta de una subpetición ya serializada; `body` son los bytes JSON (o None)."""
+    return {'status': status, 'headers': headers or {}, 'body': body}
+
+
+def _error_item(status, msg):
+    return _item(status, json.dumps({'msg': msg}).encode('utf-8'))
+
+
+def _response_item(response):
+    data = response.get_data()
+    if not data:
+        body = None
+    elif response.is_json:
+        body = data
+    else:
+        body = json.dumps(data.decode('utf-8', errors='replace')).encode('utf-8')
+    headers = {name: response.headers[name] for name in FORWARDED_HEADERS if name in response.headers}
+    return _item(response.status_code, body, headers)
+
+
+def _dispatch(sub, authorization):
+    """Ejecuta una subpetición con la vista de su ruta; devuelve (item, endpoint)."""
+    app = current_app._get_current_object()
+    headers = dict(sub.headers or {})
+    if authorization and not any(name.lower() == 'authorization' for name in headers):
+        headers['Authorization'] = authorization
+    builder = EnvironBuilder(
+        path=sub.path,
+        method=sub.method.upper(),
+        headers=headers,
+        json=sub.body,
+        base_url=request.host_url,
+        environ_overrides={'REMOTE_ADDR': request.remote_addr},
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    ctx = request_ctx._get_current_object()
+    envelope = ctx.request
+    sub_request = app.request_class(environ)
+    ctx.request = sub_request
+    endpoint = None
+    try:
+        try:
+            rule, view_args = app.url_map.bind_to_environ(environ).match(return_rule=True)
+            sub_request.url_rule = rule
+            sub_request.view_args = view_args
+            endpoint = rule.endpoint
+            view = app.view_functions[endpoint]
+            if endpoint.partition('.')[0] not in BATCH_BLUEPRINTS or not getattr(view, 'load_policy', {}).get('shed', True):
+                return _error_item(400, f'Ruta no permitida en un lote: {sub.path}'), endpoint
+            if in_transaction() and 'Idempotency-Key' in sub_request.headers:
+                return _error_item(400, 'Idempotency-Key no se admite en un lote transaccional'), endpoint
+            response = app.make_response(view(**view_args))
+        except Exception as e:
+            try:
+                response = app.make_response(app.handle_user_exception(e))
+            except Exception:
+                logger.exception(f'Error en la subpetición {sub.method} {sub.path}')
+                return _error_item(500, 'Ocurrió un error interno'), endpoint
+        return _response_item(response), endpoint
+    finally:
+        ctx.request = envelope
+
+
+def _run(items, stop_on_error, transaction=None):
+    """Ejecuta las subpeticiones en orden; las que no llegan a ejecutarse se marcan con 424 o 504."""
+    authorization = request.headers.get('Authorization')
+    results = []
+    for index, sub in enumerate(items):
+        if deadline_expired():
+            logger.warning(f'Plazo agotado en el lote tras {index} subpeticiones')
+            results.extend(_error_item(504, 'Tiempo de espera del lote agotado') for _ in items[index:])
+            if transaction is not None:
+                transaction.rollback()
+            break
+        item, endpoint = _dispatch(sub, authorization)
+        results.append(item)
+        failed = item['status'] >= 400
+        if endpoint == LOGIN_ENDPOINT and not failed and not request.headers.get('Authorization'):
+            # Sin JWT en el sobre, el token de un login del lote autentica las subpeticiones siguientes
+            authorization = f'Bearer {json.loads(item["body"])["access_token"]}'
+        if failed and (stop_on_error or transaction is not None):
+            results.extend(_error_item(424, f'No ejecutada: falló la subpetición {index}') for _ in items[index + 1:])
+            if transaction is not None:
+                transaction.rollback()
+            break
+    return results
+
+
+def _render(results, transaction_status):
+    """Cuerpo del lote con los cuerpos de las subrespuestas incrustados sin volver a decodificarlos."""
+    parts = []
+    for item in results:
+        body = item['body'] if item['body'] is not None else b'null'
+        head = json.dumps({'status': item['status'], 'headers': item['headers']})[:-1].encode('utf-8')
+        parts.append(head + b', "body": ' + body + b'}')
+    tail = json.dumps({'transaction': transaction_status}).encode('utf-8')
+    return b'{"responses": [' + b', '.join(parts) + b'], ' + tail[1:]
+
+
+@batch_bp.route('/batch', methods=['POST'])
+@route_policy(timeout_ms=BATCH_TIMEOUT_MS)
+@idempotent
+def batch():
+    """
+    Ejecuta varias subpeticiones en orden y devuelve todas las respuestas en un solo cuerpo
+    ---
+    tags:
+      - Lotes
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - requests
+          properties:
+            requests:
+              type: array
+              description: Subpeticiones (hasta BATCH_MAX_REQUESTS) a /users/... o /electrodomesticos/...
+              items:
+                type: object
+                required:
+                  - method
+                  - path
+                properties:
+                  method:
+                    type: string
+                    example: PUT
+                  path:
+                    type: string
+                    example: /electrodomesticos/1/stock
+                  body:
+                    type: object
+                    example: {"en_stock": false}
+                  headers:
+                    type: object
+                    example: {"If-Match": "\\"3\\""}
+            transaction:
+              type: boolean
+              default: false
+              description: Todas las subpeticiones en una sola transacción; la primera que falla la deshace entera
+            stop_on_error:
+              type: boolean
+              default: false
+              description: Detiene el lote en la primera subpetición con estado >= 400
+    responses:
+      200:
+        description: Respuestas en orden (`status`, `headers`, `body`) y estado de la transacción
+        schema:
+          type: object
+          properties:
+            responses:
+              type: array
+              items:
+                type: object
+            transaction:
+              type: string
+              enum: [committed, rolled_back]
+      400:
+        description: Cuerpo inválido, demasiadas subpeticiones o transacción no disponible
+      401:
+        description: JWT inválido o expirado
+      422:
+        description: Datos inválidos (con el índice de la subpetición)
+    """
+    # Única verificación del JWT del sobre; las subpeticiones lo heredan
+    verify_jwt_in_request(optional=True)
+    batch, items, error = _decode_body()
+    if error:
+        return error
+    if batch.transaction and shard_router.enabled:
+        return jsonify({'msg': 'Las transacciones de lote no están disponibles con sharding'}), 400
+
+    logger.info(f'Ejecutando lote de {len(items)} subpeticiones (transacción: {batch.transaction})')
+    if not batch.transaction:
+        return Response(_render(_run(items, batch.stop_on_error), None), mimetype='application/json')
+
+    with BatchService.transaction() as transaction:
+        results = _run(items, batch.stop_on_error, transaction)
+    status = 'rolled_back' if transaction.rolled_back else 'committed'
+    return Response(_render(results, status), mimetype='application/json')
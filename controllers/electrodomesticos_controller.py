@@ -1,14 +1,117 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import create_access_token, jwt_required
-from services.electrodomesticos_service import ElectrodomesticosService
+from services.electrodomesticos_service import ElectrodomesticosService, decode_cursor
+from services.precios_service import PreciosService, BUCKET_OPTIONS
+from repositories.electrodomesticos_repository import VersionConflict
+from schemas.electrodomesticos import ElectrodomesticoCreate, ElectrodomesticoUpdate, StockUpdate
+from services.event_broker import BrokerFull, event_broker
+from controllers.idempotency import idempotent
+from controllers.auth import admin_required
+from controllers.load_shedding import route_policy, CRITICAL, LOW
+from controllers.validation import decode_body
+from services.query_cache import query_cache
+from datetime import datetime, timezone
+import json
+import os
+import queue
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 electrodomesticos_bp = Blueprint('electrodomesticos_bp', __name__, url_prefix='/electrodomesticos')
 
+SORT_OPTIONS = ('precio', '-precio', 'marca', '-marca', 'modelo', '-modelo', 'id', '-id')
+MAX_LIST_LIMIT = int(os.getenv('MAX_LIST_LIMIT', '1000'))
+DEFAULT_HISTORY_MS = 30 * 24 * 3600 * 1000
+
+
+def _bool_param(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if value.lower() in ('true', '1'):
+        return True
+    if value.lower() in ('false', '0'):
+        return False
+    raise ValueError(f'{name} debe ser true o false')
+
+
+def _page_params():
+    """Lee sort, limit y after de la query string de un listado; ValueError si no son válidos."""
+    sort = request.args.get('sort')
+    if sort is not None and sort not in SORT_OPTIONS:
+        raise ValueError(f'sort debe ser uno de {", ".join(SORT_OPTIONS)}')
+    limit = request.args.get('limit')
+    if limit is not None:
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_LIST_LIMIT:
+            raise ValueError(f'limit debe ser un entero entre 1 y {MAX_LIST_LIMIT}')
+        limit = int(limit)
+    after = request.args.get('after')
+    if after is not None:
+        if limit is None:
+            raise ValueError('after requiere limit')
+        after = decode_cursor(after, sort)
+    return {'sort': sort, 'limit': limit, 'after': after}
+
+
+def _instant_param(name, default_ms):
+    """Lee un instante ISO 8601 (sin zona = UTC) o epoch en segundos y lo devuelve en milisegundos."""
+    value = request.args.get(name)
+    if value is None:
+        return default_ms
+    try:
+        return int(float(value) * 1000)
+    except (ValueError, OverflowError):
+        pass
+    try:
+        instant = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} debe ser una fecha ISO 8601 o un epoch en segundos')
+    if instant.tzinfo is None:
+        instant = instant.replace(tzinfo=timezone.utc)
+    return int(instant.timestamp() * 1000)
+
+
+def _expected_version():
+    """
+    Versión exigida por la cabecera If-Match ("3" o W/"3"); None si no se envía o es `*`.
+    ValueError si no es un ETag de este recurso (no puede coincidir nunca).
+    """
+    value = request.headers.get('If-Match')
+    if value is None or value.strip() == '*':
+        return None
+    tag = value.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    if not tag.isdigit():
+        raise ValueError(f'If-Match inválido: {value}')
+    return int(tag)
+
+
+def _with_etag(response, version):
+    response.headers['ETag'] = f'"{version}"'
+    return response
+
+
+def _precondition_failed(current_version=None):
+    response = jsonify({"mensaje": "El electrodoméstico fue modificado por otra petición (If-Match no coincide)"})
+    if current_version is not None:
+        _with_etag(response, current_version)
+    return response, 412
+
+
+def _list_response(body, page):
+    response = Response(body, status=200, mimetype='application/json')
+    cursor = ElectrodomesticosService.next_cursor(body, page['sort'], page['limit'])
+    if cursor is not None:
+        response.headers['X-Next-Cursor'] = cursor
+    return response
+
 @electrodomesticos_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_electrodomestico():
     """
     Crear un nuevo electrodoméstico
@@ -18,6 +121,11 @@ def create_electrodomestico():
     consumes:
       - application/json
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Clave única del cliente; los reintentos con la misma clave repiten la respuesta original
       - in: body
         name: body
         required: true
@@ -71,13 +179,24 @@ def create_electrodomestico():
               type: boolean
               example: true
       400:
-        description: Petición inválida
+        description: El cuerpo no es JSON válido
         schema:
           type: object
           properties:
-            mensaje:
+            msg:
               type: string
-              example: "Error en la petición"
+              example: "Formato inválido"
+      422:
+        description: Datos inválidos (errores por campo)
+        schema:
+          type: object
+          properties:
+            msg:
+              type: string
+              example: "Datos inválidos"
+            detail:
+              type: object
+              example: {"precio": "debe ser un número"}
         500:
           description: Error interno del servidor
           schema:
@@ -87,28 +206,19 @@ def create_electrodomestico():
                 type: string
                 example: "Error en el servidor"
     """
-    data = request.get_json() or {}
-    required_fields = ['marca', 'modelo', 'tipo', 'precio']
-    if not all(field in data for field in required_fields):
-        return jsonify({"mensaje": "Error en la petición"}), 400
+    payload, error = decode_body(ElectrodomesticoCreate)
+    if error:
+        return error
 
     try:
-        electrodomestico = ElectrodomesticosService.create_electrodomestico(data)
-        response = {
-            "id": electrodomestico.id,
-            "marca": electrodomestico.marca,
-            "modelo": electrodomestico.modelo,
-            "tipo": electrodomestico.tipo,
-            "precio": electrodomestico.precio,
-            "clase_energetica": electrodomestico.clase_energetica,
-            "en_stock": electrodomestico.en_stock
-        }
-        return jsonify(response), 201
+        electrodomestico = ElectrodomesticosService.create_electrodomestico(payload.to_dict())
+        return _with_etag(jsonify(electrodomestico.to_dict()), electrodomestico.version), 201
     except Exception as e:
         logger.error(f'Error al crear el electrodoméstico: {str(e)}')
         return jsonify({"mensaje": "Error en el servidor"}), 500
 
 @electrodomesticos_bp.route('/<int:electrodomestico_id>', methods=['GET'])
+@route_policy(CRITICAL, timeout_ms=5000)
 @jwt_required()
 def get_electrodomestico(electrodomestico_id):
     """
@@ -149,6 +259,13 @@ def get_electrodomestico(electrodomestico_id):
             en_stock:
               type: boolean
               example: true
+            version:
+              type: integer
+              example: 2
+        headers:
+          ETag:
+            type: string
+            description: Versión actual del electrodoméstico
       404:
         description: Electrodoméstico no encontrado
         schema:
@@ -171,21 +288,13 @@ def get_electrodomestico(electrodomestico_id):
         if not electrodomestico:
             return jsonify({"mensaje": "Electrodoméstico no encontrado"}), 404
 
-        response = {
-            "id": electrodomestico.id,
-            "marca": electrodomestico.marca,
-            "modelo": electrodomestico.modelo,
-            "tipo": electrodomestico.tipo,
-            "precio": electrodomestico.precio,
-            "clase_energetica": electrodomestico.clase_energetica,
-            "en_stock": electrodomestico.en_stock
-        }
-        return jsonify(response), 200
+        return _with_etag(jsonify(electrodomestico), electrodomestico["version"]), 200
     except Exception as e:
         logger.error(f'Error al obtener el electrodoméstico: {str(e)}')
         return jsonify({"mensaje": "Error en el servidor"}), 500
 
 @electrodomesticos_bp.route('/', methods=['GET'])
+@route_policy(LOW, timeout_ms=10000)
 @jwt_required()
 def get_all_electrodomesticos():
     """
@@ -193,6 +302,23 @@ def get_all_electrodomesticos():
     ---
     tags:
       - Electrodomésticos
+    parameters:
+      - in: query
+        name: sort
+        required: false
+        type: string
+        enum: [precio, -precio, marca, -marca, modelo, -modelo, id, -id]
+        description: Orden del listado (prefijo - para descendente; empates por id)
+      - in: query
+        name: limit
+        required: false
+        type: integer
+        description: Máximo de elementos (1-1000); si hay más, la cabecera X-Next-Cursor trae el cursor de la página siguiente
+      - in: query
+        name: after
+        required: false
+        type: string
+        description: Cursor X-Next-Cursor de la página anterior
     responses:
       200:
         description: Lista de electrodomésticos obtenida exitosamente
@@ -222,6 +348,14 @@ def get_all_electrodomesticos():
                 en_stock:
                   type: boolean
                   example: true
+      400:
+        description: Petición inválida
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en la petición"
       500:
         description: Error interno del servidor
         schema:
@@ -232,19 +366,13 @@ def get_all_electrodomesticos():
               example: "Error en el servidor"
     """
     try:
-        electrodomesticos = ElectrodomesticosService.get_all_electrodomesticos()
-        response = []
-        for e in electrodomesticos:
-            response.append({
-                "id": e.id,
-                "marca": e.marca,
-                "modelo": e.modelo,
-                "tipo": e.tipo,
-                "precio": e.precio,
-                "clase_energetica": e.clase_energetica,
-                "en_stock": e.en_stock
-            })
-        return jsonify(response), 200
+        page = _page_params()
+    except ValueError as e:
+        return jsonify({"mensaje": f"Error en la petición: {str(e)}"}), 400
+
+    try:
+        electrodomesticos = ElectrodomesticosService.get_all_electrodomesticos(**page)
+        return _list_response(electrodomesticos, page)
     except Exception as e:
         logger.error(f'Error al obtener los electrodomésticos: {str(e)}')
         return jsonify({"mensaje": "Error en el servidor"}), 500
@@ -265,6 +393,11 @@ def update_electrodomestico(electrodomestico_id):
         required: true
         type: integer
         description: ID del electrodoméstico
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: ETag devuelto al leer el electrodoméstico (p. ej. "3"); si la versión cambió se responde 412
       - in: body
         name: body
         required: true
@@ -316,6 +449,24 @@ def update_electrodomestico(electrodomestico_id):
             en_stock:
               type: boolean
               example: true
+            version:
+              type: integer
+              example: 2
+        headers:
+          ETag:
+            type: string
+            description: Versión actual del electrodoméstico
+      422:
+        description: Datos inválidos (errores por campo, o ningún campo que actualizar)
+        schema:
+          type: object
+          properties:
+            msg:
+              type: string
+              example: "Datos inválidos"
+            detail:
+              type: object
+              example: {"precio": "debe ser un número"}
       404:
         description: Electrodoméstico no encontrado
         schema:
@@ -324,6 +475,14 @@ def update_electrodomestico(electrodomestico_id):
             mensaje:
               type: string
               example: "Electrodoméstico no encontrado"
+      412:
+        description: La versión de If-Match no coincide con la actual
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "El electrodoméstico fue modificado por otra petición (If-Match no coincide)"
         500:
           description: Error interno del servidor
           schema:
@@ -333,22 +492,28 @@ def update_electrodomestico(electrodomestico_id):
                 type: string
                 example: "Error en el servidor"
     """
-    data = request.get_json() or {}
+    payload, error = decode_body(ElectrodomesticoUpdate)
+    if error:
+        return error
+    if not payload.fields_set:
+        # Sin campos no hay nada que escribir: no se incrementa la versión ni se publica ningún evento
+        return jsonify({'msg': 'Datos inválidos', 'detail': {'body': 'no contiene ningún campo que actualizar'}}), 422
     try:
-        electrodomestico = ElectrodomesticosService.update_electrodomestico(electrodomestico_id, data)
+        expected_version = _expected_version()
+    except ValueError as e:
+        logger.warning(str(e))
+        return _precondition_failed()
+
+    try:
+        electrodomestico = ElectrodomesticosService.update_electrodomestico(
+            electrodomestico_id, payload.to_dict(), expected_version
+        )
         if not electrodomestico:
             return jsonify({"mensaje": "Electrodoméstico no encontrado"}), 404
 
-        response = {
-            "id": electrodomestico.id,
-            "marca": electrodomestico.marca,
-            "modelo": electrodomestico.modelo,
-            "tipo": electrodomestico.tipo,
-            "precio": electrodomestico.precio,
-            "clase_energetica": electrodomestico.clase_energetica,
-            "en_stock": electrodomestico.en_stock
-        }
-        return jsonify(response), 200
+        return _with_etag(jsonify(electrodomestico), electrodomestico["version"]), 200
+    except VersionConflict as e:
+        return _precondition_failed(e.current_version)
     except Exception as e:
         logger.error(f'Error al actualizar el electrodoméstico: {str(e)}')
         return jsonify({"mensaje": "Error en el servidor"}), 500
@@ -367,6 +532,11 @@ def delete_electrodomestico(electrodomestico_id):
         required: true
         type: integer
         description: ID del electrodoméstico
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: ETag devuelto al leer el electrodoméstico; si la versión cambió se responde 412
     responses:
       200:
         description: Electrodoméstico eliminado exitosamente
@@ -384,6 +554,14 @@ def delete_electrodomestico(electrodomestico_id):
               mensaje:
                 type: string
                 example: "Electrodoméstico no encontrado"
+        412:
+          description: La versión de If-Match no coincide con la actual
+          schema:
+            type: object
+            properties:
+              mensaje:
+                type: string
+                example: "El electrodoméstico fue modificado por otra petición (If-Match no coincide)"
         500:
           description: Error interno del servidor
           schema:
@@ -394,12 +572,681 @@ def delete_electrodomestico(electrodomestico_id):
                 example: "Error en el servidor"
     """
     try:
-        result = ElectrodomesticosService.delete_electrodomestico(electrodomestico_id)
+        expected_version = _expected_version()
+    except ValueError as e:
+        logger.warning(str(e))
+        return _precondition_failed()
+
+    try:
+        result = ElectrodomesticosService.delete_electrodomestico(electrodomestico_id, expected_version)
         if not result:
             return jsonify({"mensaje": "Electrodoméstico no encontrado"}), 404
 
         return jsonify({"mensaje": "Electrodoméstico eliminado exitosamente"}), 200
+    except VersionConflict as e:
+        return _precondition_failed(e.current_version)
     except Exception as e:
         logger.error(f'Error al eliminar el electrodoméstico: {str(e)}')
         return jsonify({"mensaje": "Error en el servidor"}), 500
 
+@electrodomesticos_bp.route('/<int:electrodomestico_id>/stock', methods=['PUT'])
+@route_policy(timeout_ms=5000)
+@jwt_required()
+def set_electrodomestico_stock(electrodomestico_id):
+    """
+    Cambiar el stock de un electrodoméstico (pensado para integraciones que lo cambian con frecuencia)
+    ---
+    tags:
+      - Electrodomésticos
+    parameters:
+      - in: path
+        name: electrodomestico_id
+        required: true
+        type: integer
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [en_stock]
+          properties:
+            en_stock:
+              type: boolean
+              example: false
+    responses:
+      200:
+        description: Stock actualizado en la base de datos (buffer write-behind desactivado)
+      202:
+        description: Cambio anotado en el journal; se escribe en el siguiente volcado y las lecturas (por ID, listados y estadísticas) ya lo reflejan
+        schema:
+          type: object
+          properties:
+            id:
+              type: integer
+              example: 1
+            en_stock:
+              type: boolean
+              example: false
+            pendiente:
+              type: boolean
+              example: true
+      400:
+        description: El cuerpo no es JSON válido
+      404:
+        description: Electrodoméstico no encontrado
+      422:
+        description: Datos inválidos
+      500:
+        description: Error interno del servidor
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en el servidor"
+    """
+    payload, error = decode_body(StockUpdate)
+    if error:
+        return error
+
+    try:
+        result = ElectrodomesticosService.set_stock(electrodomestico_id, payload.en_stock)
+        if result is None:
+            return jsonify({"mensaje": "Electrodoméstico no encontrado"}), 404
+        return jsonify(result), 202 if result['pendiente'] else 200
+    except Exception as e:
+        logger.error(f'Error al cambiar el stock del electrodoméstico: {str(e)}')
+        return jsonify({"mensaje": "Error en el servidor"}), 500
+
+@electrodomesticos_bp.route('/<int:electrodomestico_id>/precios', methods=['GET'])
+@route_policy(LOW, timeout_ms=10000)
+@jwt_required()
+def get_electrodomestico_precios(electrodomestico_id):
+    """
+    Histórico de precios de un electrodoméstico
+    ---
+    tags:
+      - Electrodomésticos
+    parameters:
+      - in: path
+        name: electrodomestico_id
+        required: true
+        type: integer
+      - in: query
+        name: from
+        required: false
+        type: string
+        description: Inicio del rango (ISO 8601 o epoch en segundos; por defecto, 30 días antes de `to`)
+      - in: query
+        name: to
+        required: false
+        type: string
+        description: Fin del rango (ISO 8601 o epoch en segundos; por defecto, ahora)
+      - in: query
+        name: bucket
+        required: false
+        type: string
+        enum: [raw, hour, day]
+        description: raw devuelve cada cambio; hour y day los agregados min/max/último precalculados. Sin bucket se elige según la longitud del rango
+    responses:
+      200:
+        description: Precio vigente al empezar el rango y puntos del histórico
+        schema:
+          type: object
+          properties:
+            electrodomestico_id:
+              type: integer
+              example: 1
+            bucket:
+              type: string
+              example: day
+            precio_inicial:
+              type: number
+              example: 1250.0
+            puntos:
+              type: array
+              items:
+                type: object
+              example: [{"inicio": "2026-10-01T00:00:00.000+00:00", "precio_min": 1199.9, "precio_max": 1250.0, "precio_ultimo": 1199.9, "cambios": 2}]
+      400:
+        description: Petición inválida
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en la petición: bucket debe ser uno de raw, hour, day"
+      404:
+        description: Electrodoméstico no encontrado
+      500:
+        description: Error interno del servidor
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en el servidor"
+    """
+    try:
+        hasta_ms = _instant_param('to', int(time.time() * 1000))
+        desde_ms = _instant_param('from', hasta_ms - DEFAULT_HISTORY_MS)
+        bucket = request.args.get('bucket')
+        if bucket is not None and bucket not in BUCKET_OPTIONS:
+            raise ValueError(f'bucket debe ser uno de {", ".join(BUCKET_OPTIONS)}')
+        if desde_ms > hasta_ms:
+            raise ValueError('from debe ser anterior a to')
+    except ValueError as e:
+        return jsonify({"mensaje": f"Error en la petición: {str(e)}"}), 400
+
+    try:
+        if ElectrodomesticosService.get_electrodomestico_by_id(electrodomestico_id) is None:
+            return jsonify({"mensaje": "Electrodoméstico no encontrado"}), 404
+        return jsonify(PreciosService.get_price_history(electrodomestico_id, desde_ms, hasta_ms, bucket)), 200
+    except Exception as e:
+        logger.error(f'Error al obtener el histórico de precios: {str(e)}')
+        return jsonify({"mensaje": "Error en el servidor"}), 500
+
+@electrodomesticos_bp.route('/tipo/<string:tipo>', methods=['GET'])
+@route_policy(LOW, timeout_ms=10000)
+@jwt_required()
+def get_electrodomesticos_by_tipo(tipo):
+    """
+    Obtener electrodomésticos por tipo
+    ---
+    tags:
+      - Electrodomésticos
+    parameters:
+      - in: path
+        name: tipo
+        required: true
+        type: string
+        description: Tipo de electrodoméstico (Ej. Nevera)
+      - in: query
+        name: en_stock
+        required: false
+        type: boolean
+        description: Filtrar además por disponibilidad en stock
+      - in: query
+        name: sort
+        required: false
+        type: string
+        enum: [precio, -precio, marca, -marca, modelo, -modelo, id, -id]
+        description: Orden del listado (prefijo - para descendente; empates por id)
+      - in: query
+        name: limit
+        required: false
+        type: integer
+        description: Máximo de elementos (1-1000); si hay más, la cabecera X-Next-Cursor trae el cursor de la página siguiente
+      - in: query
+        name: after
+        required: false
+        type: string
+        description: Cursor X-Next-Cursor de la página anterior
+    responses:
+      200:
+        description: Lista de electrodomésticos filtrada
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+                example: 1
+              marca:
+                type: string
+                example: Samsung
+              modelo:
+                type: string
+                example: Nevera RF28R7351SG
+              tipo:
+                type: string
+                example: Nevera
+              precio:
+                type: number
+                example: 1200.50
+              clase_energetica:
+                type: string
+                example: A++
+              en_stock:
+                type: boolean
+                example: true
+      400:
+        description: Petición inválida
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en la petición"
+      500:
+        description: Error interno del servidor
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en el servidor"
+    """
+    try:
+        en_stock = _bool_param('en_stock')
+        page = _page_params()
+    except ValueError as e:
+        return jsonify({"mensaje": f"Error en la petición: {str(e)}"}), 400
+
+    try:
+        electrodomesticos = ElectrodomesticosService.get_electrodomesticos_by_tipo(tipo, en_stock=en_stock, **page)
+        return _list_response(electrodomesticos, page)
+    except Exception as e:
+        logger.error(f'Error al obtener los electrodomésticos por tipo: {str(e)}')
+        return jsonify({"mensaje": "Error en el servidor"}), 500
+
+@electrodomesticos_bp.route('/marca/<string:marca>', methods=['GET'])
+@route_policy(LOW, timeout_ms=10000)
+@jwt_required()
+def get_electrodomesticos_by_marca(marca):
+    """
+    Obtener electrodomésticos por marca
+    ---
+    tags:
+      - Electrodomésticos
+    parameters:
+      - in: path
+        name: marca
+        required: true
+        type: string
+        description: Marca del electrodoméstico (Ej. Samsung)
+      - in: query
+        name: en_stock
+        required: false
+        type: boolean
+        description: Filtrar además por disponibilidad en stock
+      - in: query
+        name: sort
+        required: false
+        type: string
+        enum: [precio, -precio, marca, -marca, modelo, -modelo, id, -id]
+        description: Orden del listado (prefijo - para descendente; empates por id)
+      - in: query
+        name: limit
+        required: false
+        type: integer
+        description: Máximo de elementos (1-1000); si hay más, la cabecera X-Next-Cursor trae el cursor de la página siguiente
+      - in: query
+        name: after
+        required: false
+        type: string
+        description: Cursor X-Next-Cursor de la página anterior
+    responses:
+      200:
+        description: Lista de electrodomésticos filtrada
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+                example: 1
+              marca:
+                type: string
+                example: Samsung
+              modelo:
+                type: string
+                example: Nevera RF28R7351SG
+              tipo:
+                type: string
+                example: Nevera
+              precio:
+                type: number
+                example: 1200.50
+              clase_energetica:
+                type: string
+                example: A++
+              en_stock:
+                type: boolean
+                example: true
+      400:
+        description: Petición inválida
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en la petición"
+      500:
+        description: Error interno del servidor
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en el servidor"
+    """
+    try:
+        en_stock = _bool_param('en_stock')
+        page = _page_params()
+    except ValueError as e:
+        return jsonify({"mensaje": f"Error en la petición: {str(e)}"}), 400
+
+    try:
+        electrodomesticos = ElectrodomesticosService.get_electrodomesticos_by_marca(marca, en_stock=en_stock, **page)
+        return _list_response(electrodomesticos, page)
+    except Exception as e:
+        logger.error(f'Error al obtener los electrodomésticos por marca: {str(e)}')
+        return jsonify({"mensaje": "Error en el servidor"}), 500
+
+@electrodomesticos_bp.route('/en-stock', methods=['GET'])
+@route_policy(LOW, timeout_ms=10000)
+@jwt_required()
+def get_electrodomesticos_in_stock():
+    """
+    Obtener electrodomésticos en stock
+    ---
+    tags:
+      - Electrodomésticos
+    parameters:
+      - in: query
+        name: sort
+        required: false
+        type: string
+        enum: [precio, -precio, marca, -marca, modelo, -modelo, id, -id]
+        description: Orden del listado (prefijo - para descendente; empates por id)
+      - in: query
+        name: limit
+        required: false
+        type: integer
+        description: Máximo de elementos (1-1000); si hay más, la cabecera X-Next-Cursor trae el cursor de la página siguiente
+      - in: query
+        name: after
+        required: false
+        type: string
+        description: Cursor X-Next-Cursor de la página anterior
+    responses:
+      200:
+        description: Lista de electrodomésticos filtrada
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+                example: 1
+              marca:
+                type: string
+                example: Samsung
+              modelo:
+                type: string
+                example: Nevera RF28R7351SG
+              tipo:
+                type: string
+                example: Nevera
+              precio:
+                type: number
+                example: 1200.50
+              clase_energetica:
+                type: string
+                example: A++
+              en_stock:
+                type: boolean
+                example: true
+      400:
+        description: Petición inválida
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en la petición"
+      500:
+        description: Error interno del servidor
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en el servidor"
+    """
+    try:
+        page = _page_params()
+    except ValueError as e:
+        return jsonify({"mensaje": f"Error en la petición: {str(e)}"}), 400
+
+    try:
+        electrodomesticos = ElectrodomesticosService.get_electrodomesticos_in_stock(**page)
+        return _list_response(electrodomesticos, page)
+    except Exception as e:
+        logger.error(f'Error al obtener los electrodomésticos en stock: {str(e)}')
+        return jsonify({"mensaje": "Error en el servidor"}), 500
+
+@electrodomesticos_bp.route('/precio', methods=['GET'])
+@route_policy(LOW, timeout_ms=10000)
+@jwt_required()
+def get_electrodomesticos_by_price_range():
+    """
+    Obtener electrodomésticos por rango de precio
+    ---
+    tags:
+      - Electrodomésticos
+    parameters:
+      - in: query
+        name: min
+        required: true
+        type: number
+        description: Precio mínimo
+      - in: query
+        name: max
+        required: true
+        type: number
+        description: Precio máximo
+      - in: query
+        name: sort
+        required: false
+        type: string
+        enum: [precio, -precio, marca, -marca, modelo, -modelo, id, -id]
+        description: Orden del listado (prefijo - para descendente; empates por id)
+      - in: query
+        name: limit
+        required: false
+        type: integer
+        description: Máximo de elementos (1-1000); si hay más, la cabecera X-Next-Cursor trae el cursor de la página siguiente
+      - in: query
+        name: after
+        required: false
+        type: string
+        description: Cursor X-Next-Cursor de la página anterior
+    responses:
+      200:
+        description: Lista de electrodomésticos filtrada
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+                example: 1
+              marca:
+                type: string
+                example: Samsung
+              modelo:
+                type: string
+                example: Nevera RF28R7351SG
+              tipo:
+                type: string
+                example: Nevera
+              precio:
+                type: number
+                example: 1200.50
+              clase_energetica:
+                type: string
+                example: A++
+              en_stock:
+                type: boolean
+                example: true
+      400:
+        description: Petición inválida
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en la petición"
+      500:
+        description: Error interno del servidor
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en el servidor"
+    """
+    min_price = request.args.get('min', type=float)
+    max_price = request.args.get('max', type=float)
+    if min_price is None or max_price is None or min_price > max_price:
+        return jsonify({"mensaje": "Error en la petición"}), 400
+    try:
+        page = _page_params()
+    except ValueError as e:
+        return jsonify({"mensaje": f"Error en la petición: {str(e)}"}), 400
+
+    try:
+        electrodomesticos = ElectrodomesticosService.get_electrodomesticos_by_price_range(min_price, max_price, **page)
+        return _list_response(electrodomesticos, page)
+    except Exception as e:
+        logger.error(f'Error al obtener los electrodomésticos por rango de precio: {str(e)}')
+        return jsonify({"mensaje": "Error en el servidor"}), 500
+
+@electrodomesticos_bp.route('/stats', methods=['GET'])
+@route_policy(LOW, timeout_ms=10000)
+@jwt_required()
+def get_electrodomesticos_stats():
+    """
+    Estadísticas del catálogo
+    ---
+    tags:
+      - Electrodomésticos
+    responses:
+      200:
+        description: Totales, stock y precios mínimo, máximo y promedio por tipo
+        schema:
+          type: object
+          properties:
+            total:
+              type: integer
+              example: 20
+            en_stock:
+              type: integer
+              example: 17
+            por_tipo:
+              type: object
+              example: {"Nevera": {"total": 5, "en_stock": 4, "precio_min": 899.9, "precio_max": 2500.0, "precio_promedio": 1530.2}}
+      500:
+        description: Error interno del servidor
+        schema:
+          type: object
+          properties:
+            mensaje:
+              type: string
+              example: "Error en el servidor"
+    """
+    try:
+        return jsonify(ElectrodomesticosService.get_stats()), 200
+    except Exception as e:
+        logger.error(f'Error al obtener las estadísticas: {str(e)}')
+        return jsonify({"mensaje": "Error en el servidor"}), 500
+
+@electrodomesticos_bp.route('/cache', methods=['GET'])
+@admin_required
+def get_query_cache_stats():
+    """
+    Estadísticas de la caché de listados del worker (requiere JWT de administrador)
+    ---
+    tags:
+      - Electrodomésticos
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Generación, memoria usada, aciertos y desalojos de los niveles L1 y L2
+    """
+    return jsonify(query_cache.stats()), 200
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+
+@electrodomesticos_bp.route('/stream', methods=['GET'])
+@route_policy(shed=False)
+@jwt_required()
+def stream_electrodomesticos():
+    """
+    Stream (Server-Sent Events) de cambios de stock y precio
+    ---
+    tags:
+      - Electrodomésticos
+    produces:
+      - text/event-stream
+    parameters:
+      - in: query
+        name: id
+        type: integer
+        required: false
+        description: Solo eventos del electrodoméstico con este ID
+      - in: query
+        name: tipo
+        type: string
+        required: false
+        description: Solo eventos de este tipo (Ej. Nevera)
+      - in: query
+        name: marca
+        type: string
+        required: false
+        description: Solo eventos de esta marca (Ej. Samsung)
+      - in: header
+        name: Last-Event-ID
+        type: integer
+        required: false
+        description: Reenvía los eventos posteriores a este ID al reconectar
+    responses:
+      200:
+        description: Stream de eventos `actualizado` y `eliminado` con id, marca, modelo, tipo, precio y en_stock
+      503:
+        description: El worker ya tiene abiertos SSE_MAX_STREAMS streams
+    """
+    filters = {
+        'id': request.args.get('id', type=int),
+        'tipo': request.args.get('tipo'),
+        'marca': request.args.get('marca'),
+    }
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    try:
+        subscription = event_broker.subscribe(filters)
+    except BrokerFull:
+        logger.warning('Stream SSE rechazado: el worker no admite más streams')
+        response = jsonify({"mensaje": "Demasiados streams abiertos, inténtalo más tarde"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    def generate():
+        sent_id = last_event_id or 0
+        try:
+            if last_event_id is not None:
+                for event_id, event in event_broker.replay(subscription, last_event_id):
+                    sent_id = event_id
+                    yield f'id: {event_id}\nevent: {event["evento"]}\ndata: {json.dumps(event)}\n\n'
+            while True:
+                try:
+                    event_id, event = subscription.queue.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Comentario SSE para mantener viva la conexión a través de proxies
+                    yield ': keep-alive\n\n'
+                    continue
+                if event_id <= sent_id:
+                    continue
+                sent_id = event_id
+                yield f'id: {event_id}\nevent: {event["evento"]}\ndata: {json.dumps(event)}\n\n'
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
@@ -0,0 +1,84 @@
+"""
+Controlador de exportación masiva para consumidores analíticos (CSV, Arrow IPC y Parquet).
+"""
+
+import os
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from controllers.auth import admin_required
+from controllers.load_shedding import route_policy, LOW
+from models.db import db
+from services.export_service import FORMATS, available_formats, export_table
+import logging
+
+logger = logging.getLogger(__name__)
+
+export_bp = Blueprint('export_bp', __name__, url_prefix='/export')
+
+EXPORT_TIMEOUT_MS = int(os.getenv('EXPORT_TIMEOUT_MS', '600000'))
+MAX_EXPORT_BATCH = 100000
+
+
+@export_bp.route('/<string:table>', methods=['GET'])
+@route_policy(LOW, timeout_ms=EXPORT_TIMEOUT_MS)
+@admin_required
+def export(table):
+    """
+    Exporta una tabla completa por lotes (requiere JWT de administrador)
+    ---
+    tags:
+      - Exportación
+    security:
+      - Bearer: []
+    produces:
+      - text/csv
+      - application/vnd.apache.arrow.stream
+      - application/vnd.apache.parquet
+    parameters:
+      - in: path
+        name: table
+        required: true
+        type: string
+        enum: [electrodomesticos, users]
+        description: Tabla a exportar (de users solo id y username)
+      - in: query
+        name: format
+        type: string
+        enum: [csv, arrow, parquet]
+        default: csv
+        description: arrow y parquet requieren pyarrow en el servidor
+      - in: query
+        name: batch_size
+        type: integer
+        default: 10000
+        description: Filas leídas y codificadas por lote
+    responses:
+      200:
+        description: Contenido de la tabla en el formato pedido (respuesta en streaming)
+      400:
+        description: Tabla, formato o tamaño de lote no válidos
+        schema:
+          type: object
+          properties:
+            msg:
+              type: string
+              example: "El formato parquet requiere pyarrow"
+            formats:
+              type: array
+              items:
+                type: string
+      403:
+        description: Se requieren permisos de administrador
+    """
+    fmt = request.args.get('format', 'csv')
+    batch_size = request.args.get('batch_size', '10000')
+    if not batch_size.isdigit() or not 1 <= int(batch_size) <= MAX_EXPORT_BATCH:
+        return jsonify({'msg': f'batch_size debe ser un entero entre 1 y {MAX_EXPORT_BATCH}'}), 400
+    try:
+        chunks = export_table(db.session, table, fmt, int(batch_size))
+    except ValueError as e:
+        return jsonify({'msg': str(e), 'formats': available_formats()}), 400
+
+    logger.info(f'Exportando {table} en {fmt} por lotes de {batch_size}')
+    mimetype, extension = FORMATS[fmt]
+    headers = {'Content-Disposition': f'attachment; filename="{table}.{extension}"', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
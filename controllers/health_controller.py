@@ -0,0 +1,114 @@
+"""
+Controlador de liveness, readiness y modo drenaje.
+"""
+
+from flask import Blueprint, jsonify
+from controllers.auth import admin_required
+from controllers.load_shedding import route_policy, SHEDDING_ENABLED
+from models.db import db
+from services.health_service import readiness_probe
+from services.job_queue import job_queue
+from services.load_control import limiter
+from services.warmup import catalog_warmup
+import logging
+
+logger = logging.getLogger(__name__)
+
+health_bp = Blueprint('health_bp', __name__, url_prefix='/health')
+
+
+@health_bp.route('/live', methods=['GET'])
+@route_policy(shed=False)
+def live():
+    """
+    Liveness: el proceso responde (no comprueba dependencias)
+    ---
+    tags:
+      - Salud
+    responses:
+      200:
+        description: El worker está vivo
+    """
+    return jsonify({'status': 'ok'}), 200
+
+
+@health_bp.route('/ready', methods=['GET'])
+@route_policy(shed=False)
+def ready():
+    """
+    Readiness: catálogo calentado, base de datos accesible, pool no saturado y worker fuera de drenaje
+    ---
+    tags:
+      - Salud
+    responses:
+      200:
+        description: El worker puede recibir tráfico
+        schema:
+          type: object
+          properties:
+            status:
+              type: string
+              example: ready
+            reasons:
+              type: array
+              items:
+                type: string
+            database:
+              type: object
+            pool:
+              type: object
+            inflight_requests:
+              type: integer
+            job_queue_depth:
+              type: integer
+            warmup:
+              type: object
+      503:
+        description: El worker no debe recibir tráfico (reasons indica por qué)
+    """
+    inflight = limiter.stats()['inflight'] if SHEDDING_ENABLED else None
+    is_ready, detail = readiness_probe.readiness(
+        db.engine, inflight=inflight, job_queue_depth=readiness_probe.job_queue_depth(job_queue),
+        warmup=catalog_warmup.status() if catalog_warmup.enabled else None,
+    )
+    if not is_ready:
+        logger.warning(f'Readiness fallida: {", ".join(detail["reasons"])}')
+    return jsonify(detail), 200 if is_ready else 503
+
+
+@health_bp.route('/drain', methods=['POST'])
+@route_policy(shed=False)
+@admin_required
+def start_drain():
+    """
+    Activa el modo drenaje en todos los workers (requiere JWT de administrador)
+    ---
+    tags:
+      - Salud
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Modo drenaje activado; /health/ready devuelve 503
+    """
+    readiness_probe.start_drain()
+    return jsonify({'draining': True}), 200
+
+
+@health_bp.route('/drain', methods=['DELETE'])
+@route_policy(shed=False)
+@admin_required
+def stop_drain():
+    """
+    Desactiva el modo drenaje (requiere JWT de administrador)
+    ---
+    tags:
+      - Salud
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Modo drenaje desactivado
+    """
+    readiness_probe.stop_drain()
+    return jsonify({'draining': False}), 200
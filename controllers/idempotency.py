@@ -0,0 +1,69 @@
+"""
+Decorador `Idempotency-Key` para endpoints POST.
+La primera petición con una clave se ejecuta y su respuesta se guarda; los reintentos reciben la
+misma respuesta (header `Idempotent-Replayed: true`) y las peticiones concurrentes con la misma
+clave esperan a la primera en lugar de ejecutarse de nuevo.
+"""
+
+import hashlib
+import time
+from functools import wraps
+from flask import request, jsonify, make_response
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from services.idempotency_service import idempotency_store, DONE
+import logging
+
+logger = logging.getLogger(__name__)
+
+WAIT_TIMEOUT_SECONDS = 10
+WAIT_POLL_SECONDS = 0.05
+
+
+def _replay(row):
+    _, _, status_code, content_type, body, _ = row
+    response = make_response(bytes(body), status_code)
+    response.headers['Content-Type'] = content_type
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        client_key = request.headers.get('Idempotency-Key')
+        if not client_key:
+            return fn(*args, **kwargs)
+        if len(client_key) > 255:
+            return jsonify({'msg': 'Idempotency-Key demasiado larga'}), 400
+
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity() or ''
+        key = f'{request.endpoint}:{identity}:{client_key}'
+        fingerprint = hashlib.sha256(request.method.encode() + request.path.encode() + request.get_data()).hexdigest()
+
+        row = idempotency_store.acquire(key, fingerprint)
+        deadline = time.monotonic() + WAIT_TIMEOUT_SECONDS
+        while row is not None:
+            if row[1] != fingerprint:
+                return jsonify({'msg': 'Idempotency-Key ya usada con otra petición'}), 422
+            if row[0] == DONE:
+                logger.info(f'Respuesta repetida por Idempotency-Key: {client_key}')
+                return _replay(row)
+            if time.monotonic() > deadline:
+                return jsonify({'msg': 'Petición con la misma Idempotency-Key en curso'}), 409
+            # Otra petición con la misma clave se está ejecutando: se espera su resultado
+            time.sleep(WAIT_POLL_SECONDS)
+            row = idempotency_store.acquire(key, fingerprint)
+
+        try:
+            response = make_response(fn(*args, **kwargs))
+        except Exception:
+            idempotency_store.release(key)
+            raise
+        if response.status_code >= 500:
+            # Los errores del servidor no se guardan: el reintento debe poder ejecutarse
+            idempotency_store.release(key)
+        else:
+            idempotency_store.complete(key, response.status_code, response.content_type, response.get_data())
+        return response
+    return wrapper
@@ -0,0 +1,74 @@
+"""
+Controlador de estado de la cola de trabajos en segundo plano.
+"""
+
+from flask import Blueprint, jsonify
+from controllers.auth import admin_required
+from services.job_queue import job_queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+jobs_bp = Blueprint('jobs_bp', __name__, url_prefix='/jobs')
+
+
+@jobs_bp.route('/', methods=['GET'])
+@admin_required
+def get_jobs_stats():
+    """
+    Estado de la cola de trabajos (requiere JWT de administrador)
+    ---
+    tags:
+      - Trabajos
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Número de trabajos por estado
+        schema:
+          type: object
+          properties:
+            enabled:
+              type: boolean
+              example: true
+            queued:
+              type: integer
+              example: 3
+            running:
+              type: integer
+              example: 1
+            done:
+              type: integer
+              example: 120
+            failed:
+              type: integer
+              example: 0
+    """
+    return jsonify({'enabled': job_queue.enabled, **job_queue.stats()}), 200
+
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@admin_required
+def get_job(job_id):
+    """
+    Estado de un trabajo (requiere JWT de administrador)
+    ---
+    tags:
+      - Trabajos
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: job_id
+        required: true
+        type: integer
+    responses:
+      200:
+        description: Estado, intentos y último error del trabajo
+      404:
+        description: Trabajo no encontrado
+    """
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'mensaje': 'Trabajo no encontrado'}), 404
+    return jsonify(job), 200
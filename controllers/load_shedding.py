@@ -0,0 +1,110 @@
+"""
+Plazos por petición y rechazo temprano de carga.
+Cada ruta declara con `route_policy` su prioridad y su plazo por defecto; el cliente puede acortar
+(o alargar hasta REQUEST_TIMEOUT_MAX_MS) el plazo con la cabecera `X-Request-Timeout-Ms`.
+Con LOAD_SHEDDING=1 las peticiones que no caben en el límite adaptativo de su prioridad se
+rechazan con 503 antes de tocar la base de datos.
+"""
+
+import os
+import time
+from flask import current_app, request, jsonify, g
+from services.load_control import (
+    limiter, set_deadline, clear_deadline, deadline_expired, register_sql_deadlines, CRITICAL, NORMAL, LOW,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEADLINES_ENABLED = os.getenv('REQUEST_DEADLINES', '1') == '1'
+SHEDDING_ENABLED = os.getenv('LOAD_SHEDDING', '0') == '1'
+DEFAULT_TIMEOUT_MS = int(os.getenv('DEFAULT_REQUEST_TIMEOUT_MS', '30000'))
+MAX_TIMEOUT_MS = int(os.getenv('REQUEST_TIMEOUT_MAX_MS', '120000'))
+TIMEOUT_HEADER = 'X-Request-Timeout-Ms'
+
+
+def route_policy(priority=NORMAL, timeout_ms=None, shed=True):
+    """
+    Declara la prioridad (`critical`, `normal`, `low`) y el plazo por defecto de una ruta.
+    `shed=False` la excluye del limitador y de los plazos (health checks, streams).
+    Va justo debajo de `@blueprint.route`.
+    """
+    def decorator(fn):
+        fn.load_policy = {'priority': priority, 'timeout_ms': timeout_ms, 'shed': shed}
+        return fn
+    return decorator
+
+
+def _policy():
+    view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(view, 'load_policy', None) or {'priority': NORMAL, 'timeout_ms': None, 'shed': True}
+
+
+def _request_timeout_ms(policy):
+    header = request.headers.get(TIMEOUT_HEADER)
+    if header is not None:
+        try:
+            return max(1, min(int(header), MAX_TIMEOUT_MS))
+        except ValueError:
+            logger.warning(f'Cabecera {TIMEOUT_HEADER} inválida: {header}')
+    return policy['timeout_ms'] or DEFAULT_TIMEOUT_MS
+
+
+def init_load_control(app, engines):
+    if DEADLINES_ENABLED:
+        for engine in engines:
+            register_sql_deadlines(engine)
+
+    @app.before_request
+    def _admit_request():
+        policy = _policy()
+        if not policy['shed']:
+            return None
+        if SHEDDING_ENABLED:
+            if not limiter.try_acquire(policy['priority']):
+                logger.warning(f'Petición rechazada por sobrecarga ({policy["priority"]}): {request.path}')
+                response = jsonify({"error": "Service Unavailable", "msg": "Servidor sobrecargado, inténtalo más tarde"})
+                response.headers['Retry-After'] = '1'
+                return response, 503
+            g.load_slot_start = time.perf_counter()
+        if DEADLINES_ENABLED:
+            set_deadline(_request_timeout_ms(policy))
+            g.request_deadline = True
+        return None
+
+    @app.after_request
+    def _deadline_response(response):
+        # Los controladores convierten cualquier excepción en 500: si el plazo venció se informa como 504
+        if DEADLINES_ENABLED and response.status_code >= 500 and deadline_expired():
+            logger.warning(f'Plazo agotado en {request.path}')
+            response = jsonify({"error": "Gateway Timeout", "msg": "Tiempo de espera de la petición agotado"})
+            response.status_code = 504
+        return response
+
+    @app.teardown_request
+    def _release_request(exc):
+        start = g.pop('load_slot_start', None)
+        if start is not None:
+            limiter.release((time.perf_counter() - start) * 1000, overloaded=deadline_expired())
+        if g.pop('request_deadline', False):
+            clear_deadline()
+
+
+def init_warmup_gate(app, warmup):
+    """
+    Retiene las peticiones mientras el catálogo se calienta (como mucho `gate_timeout_ms`) y
+    responde 503 si no termina a tiempo. Las rutas con `shed=False` (health checks) no esperan.
+    """
+    if warmup.ready:
+        return
+
+    @app.before_request
+    def _wait_for_warmup():
+        if warmup.ready or not _policy()['shed']:
+            return None
+        if warmup.wait():
+            return None
+        logger.warning(f'Petición rechazada durante el calentamiento del catálogo: {request.path}')
+        response = jsonify({"error": "Service Unavailable", "msg": "El servidor se está iniciando, inténtalo más tarde"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
@@ -0,0 +1,129 @@
+"""
+Controlador del profiler estadístico bajo demanda (solo administradores).
+"""
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from controllers.auth import admin_required
+from controllers.load_shedding import route_policy
+from controllers.validation import decode_body
+from schemas.profiler import ProfileStart
+from services.profiler import FORMATS, ProfilerBusy, profiler
+import logging
+
+logger = logging.getLogger(__name__)
+
+profiler_bp = Blueprint('profiler_bp', __name__, url_prefix='/profiler')
+
+
+@profiler_bp.route('/', methods=['POST'])
+@route_policy(shed=False)
+@admin_required
+def start_profile():
+    """
+    Inicia un perfil de muestreo en el worker que atiende la petición (requiere JWT de administrador)
+    ---
+    tags:
+      - Profiler
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            seconds:
+              type: number
+              default: 10
+              description: Duración del perfil (hasta PROFILER_MAX_SECONDS)
+            route:
+              type: string
+              example: electrodomesticos_bp.get_all_electrodomesticos
+              description: Endpoint a perfilar; todas las peticiones si se omite
+            interval_ms:
+              type: number
+              default: 10
+              description: Intervalo mínimo entre muestras
+    responses:
+      202:
+        description: Perfil iniciado; el resultado se consulta en GET /profiler/<id>
+      400:
+        description: Cuerpo inválido, duración excesiva o endpoint desconocido
+      403:
+        description: Se requieren permisos de administrador
+      409:
+        description: Ya hay un perfil en curso
+      422:
+        description: Datos inválidos
+    """
+    payload, error = decode_body(ProfileStart, allow_empty=True)
+    if error:
+        return error
+    if payload.seconds > profiler.max_seconds:
+        return jsonify({'msg': f'seconds no puede superar {profiler.max_seconds}'}), 400
+    if payload.route is not None and payload.route not in current_app.view_functions:
+        return jsonify({'msg': f'Endpoint desconocido: {payload.route}'}), 400
+    try:
+        profile = profiler.start(payload.seconds, payload.route, payload.interval_ms)
+    except ProfilerBusy:
+        return jsonify({'msg': 'Ya hay un perfil en curso'}), 409
+    return jsonify(profile), 202
+
+
+@profiler_bp.route('/<string:profile_id>', methods=['GET'])
+@route_policy(shed=False)
+@admin_required
+def get_profile(profile_id):
+    """
+    Resultado de un perfil como pilas colapsadas o JSON de speedscope (requiere JWT de administrador)
+    ---
+    tags:
+      - Profiler
+    security:
+      - Bearer: []
+    produces:
+      - text/plain
+      - application/json
+    parameters:
+      - in: path
+        name: profile_id
+        required: true
+        type: string
+      - in: query
+        name: format
+        type: string
+        enum: [collapsed, speedscope]
+        default: collapsed
+    responses:
+      200:
+        description: Pilas agregadas del perfil
+      202:
+        description: El perfil sigue en curso
+      400:
+        description: Formato no soportado
+      404:
+        description: Perfil no encontrado
+      500:
+        description: El perfil terminó con error
+    """
+    fmt = request.args.get('format', 'collapsed')
+    if fmt not in FORMATS:
+        return jsonify({'msg': f'Formato no soportado: {fmt}', 'formats': list(FORMATS)}), 400
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return jsonify({'msg': 'Perfil no encontrado'}), 404
+    if profile['status'] == 'running':
+        return jsonify(profile), 202
+    if profile['status'] == 'error':
+        return jsonify(profile), 500
+
+    headers = {
+        'X-Profile-Samples': str(profile['samples']),
+        'X-Profile-Overhead': str(profile['overhead']),
+        'Content-Disposition': f'attachment; filename="perfil-{profile_id}.{"txt" if fmt == "collapsed" else "speedscope.json"}"',
+    }
+    if fmt == 'speedscope':
+        response = jsonify(profiler.speedscope(profile))
+        response.headers.update(headers)
+        return response
+    return Response(profiler.collapsed(profile), mimetype='text/plain', headers=headers)
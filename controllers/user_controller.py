@@ -5,8 +5,13 @@ Puedes crear más controladores siguiendo este ejemplo.
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity, jwt_required
 from services.user_service import UserService
+from controllers.auth import admin_required
+from controllers.load_shedding import route_policy, CRITICAL, LOW
+from controllers.idempotency import idempotent
+from controllers.validation import decode_body
+from schemas.users import UserCredentials
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +20,7 @@ user_bp = Blueprint('user_bp', __name__, url_prefix='/users')
 
 
 @user_bp.route('/register', methods=['POST'])
+@idempotent
 def register():
     """
     Registro de usuario
@@ -24,6 +30,11 @@ def register():
     consumes:
       - application/json
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Clave única del cliente; los reintentos con la misma clave repiten la respuesta original
       - in: body
         name: body
         required: true
@@ -50,13 +61,26 @@ def register():
               type: string
               example: usuario1
       400:
-        description: Petición inválida
+        description: El cuerpo no es JSON válido
+        schema:
+          type: object
+          properties:
+            msg:
+              type: string
+              example: "Formato inválido"
+      422:
+        description: Datos inválidos (errores por campo)
         schema:
           type: object
           properties:
             msg:
               type: string
-              example: "username y password son requeridos"
+              example: "Datos inválidos"
+            detail:
+              type: object
+              example: {"username": "campo requerido"}
+      403:
+        description: Nombre de usuario reservado (ADMIN_USERNAMES)
       409:
         description: Usuario ya existe
         schema:
@@ -74,11 +98,11 @@ def register():
               type: string
               example: "No se pudo completar el registro"
     """
-    data = request.get_json() or {}
-    username = data.get('username')
-    password = data.get('password')
-    if not username or not password:
-        return jsonify({"msg": "username y password son requeridos"}), 400
+    credentials, error = decode_body(UserCredentials)
+    if error:
+        return error
+    username = credentials.username
+    password = credentials.password
 
     try:
         logger.info(f'Registrando usuario: {username}')
@@ -88,16 +112,21 @@ def register():
         if isinstance(user, dict) and user.get('error') == 'Usuario ya existe':
             logger.warning(f'Usuario ya existe: {username}')
             return jsonify({'msg': 'Usuario ya existe'}), 409
+        if isinstance(user, dict) and user.get('error') == 'Nombre reservado':
+            return jsonify({'msg': 'Nombre de usuario reservado'}), 403
+        if isinstance(user, dict) and user.get('error') == 'Nombre inválido':
+            return jsonify({'msg': 'Datos inválidos', 'detail': {'username': 'no puede estar vacío'}}), 422
 
         logger.info(f'Usuario registrado: {user.username} (ID: {user.id})')
         return jsonify({'id': user.id, 'username': user.username}), 201
 
-    except Exception as e:
+    except Exception:
         logger.exception("Error en registro de usuario")
-        return jsonify({'msg': 'No se pudo completar el registro', 'detail': str(e)}), 500
+        return jsonify({'msg': 'No se pudo completar el registro'}), 500
 
 
 @user_bp.route('/login', methods=['POST'])
+@route_policy(CRITICAL, timeout_ms=5000)
 def login():
     """
     Login de usuario
@@ -129,14 +158,28 @@ def login():
             access_token:
               type: string
               example: "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
+            refresh_token:
+              type: string
+              example: "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
       400:
-        description: Petición inválida
+        description: El cuerpo no es JSON válido
         schema:
           type: object
           properties:
             msg:
               type: string
-              example: "username y password son requeridos"
+              example: "Formato inválido"
+      422:
+        description: Datos inválidos (errores por campo)
+        schema:
+          type: object
+          properties:
+            msg:
+              type: string
+              example: "Datos inválidos"
+            detail:
+              type: object
+              example: {"username": "campo requerido"}
       401:
         description: Credenciales inválidas
         schema:
@@ -146,24 +189,54 @@ def login():
               type: string
               example: "Credenciales inválidas"
     """
-    data = request.get_json() or {}
-    username = data.get('username')
-    password = data.get('password')
-    if not username or not password:
-        return jsonify({"msg": "username y password son requeridos"}), 400
+    credentials, error = decode_body(UserCredentials)
+    if error:
+        return error
+    username = credentials.username
+    password = credentials.password
 
     logger.info(f'Intento de login para usuario: {username}')
     user = UserService.authenticate(username, password)
     if user:
         access_token = create_access_token(identity=str(user.id))  # identity debe ser string
+        refresh_token = create_refresh_token(identity=str(user.id))
         logger.info(f'Login exitoso para usuario: {username}')
-        return jsonify({'access_token': access_token}), 200
+        return jsonify({'access_token': access_token, 'refresh_token': refresh_token}), 200
 
     logger.warning(f'Login fallido para usuario: {username}')
     return jsonify({'msg': 'Credenciales inválidas'}), 401
 
 
+@user_bp.route('/refresh', methods=['POST'])
+@route_policy(CRITICAL, timeout_ms=5000)
+@jwt_required(refresh=True)
+def refresh():
+    """
+    Renovación del access token (requiere refresh token)
+    ---
+    tags:
+      - Usuarios
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Nuevo access token
+        schema:
+          type: object
+          properties:
+            access_token:
+              type: string
+              example: "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
+      401:
+        description: Refresh token ausente o expirado
+    """
+    identity = get_jwt_identity()
+    logger.info(f'Renovando access token para usuario ID: {identity}')
+    return jsonify({'access_token': create_access_token(identity=identity)}), 200
+
+
 @user_bp.route('/', methods=['GET'])
+@route_policy(LOW, timeout_ms=10000)
 @jwt_required()
 def get_users():
     """
@@ -215,6 +288,86 @@ def get_users():
         return jsonify({'error': 'No autenticado', 'msg': str(e)}), 401
 
 
+@user_bp.route('/bulk', methods=['POST'])
+@route_policy(LOW, timeout_ms=300000)
+@admin_required
+def bulk_register():
+    """
+    Alta masiva de usuarios (requiere JWT de administrador)
+    ---
+    tags:
+      - Usuarios
+    security:
+      - Bearer: []
+    consumes:
+      - application/json
+      - text/csv
+      - application/x-ndjson
+    parameters:
+      - in: body
+        name: body
+        required: true
+        description: Lista JSON de {username, password}, CSV con cabecera username,password o JSONL
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              username:
+                type: string
+                example: usuario1
+              password:
+                type: string
+                example: "Secreta123!"
+    responses:
+      200:
+        description: Resumen del alta masiva
+        schema:
+          type: object
+          properties:
+            received:
+              type: integer
+              example: 3
+            created:
+              type: integer
+              example: 2
+            existing:
+              type: integer
+              example: 1
+            duplicated:
+              type: integer
+              example: 0
+            invalid:
+              type: integer
+              example: 0
+            reserved:
+              type: integer
+              example: 0
+      400:
+        description: Petición inválida
+      403:
+        description: Se requieren permisos de administrador
+    """
+    try:
+        if request.mimetype == 'text/csv':
+            records = UserService.parse_user_records(request.get_data(as_text=True), 'csv')
+        elif request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            records = UserService.parse_user_records(request.get_data(as_text=True), 'jsonl')
+        else:
+            records = request.get_json(silent=True)
+        if not isinstance(records, list):
+            return jsonify({'msg': 'Se esperaba una lista de usuarios'}), 400
+    except ValueError as e:
+        return jsonify({'msg': 'Formato inválido', 'detail': str(e)}), 400
+
+    try:
+        summary = UserService.bulk_register(records)
+        return jsonify(summary), 200
+    except Exception:
+        logger.exception('Error en alta masiva de usuarios')
+        return jsonify({'msg': 'No se pudo completar el alta masiva'}), 500
+
+
 """
 Para crear más controladores:
 1. Crea un archivo en la carpeta controllers (ejemplo: product_controller.py).
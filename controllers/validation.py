@@ -0,0 +1,21 @@
+"""
+Decodificación de los cuerpos JSON con los esquemas compilados (schemas/) y respuesta de error
+común a todas las rutas: 400 si el cuerpo no es JSON y 422 con un mensaje por campo, ambas con
+`{msg, detail}`, antes de cualquier consulta a la base de datos.
+"""
+
+from flask import request, jsonify
+from schemas.base import DecodeError, ValidationError
+
+
+def decode_body(schema, allow_empty=False):
+    """
+    Devuelve (dto, None) o (None, respuesta de error).
+    Con `allow_empty` un cuerpo vacío se trata como `{}` (los campos toman sus valores por defecto).
+    """
+    try:
+        return schema.decode(request.get_data() or (b'{}' if allow_empty else b'')), None
+    except DecodeError as e:
+        return None, (jsonify({'msg': 'Formato inválido', 'detail': str(e)}), 400)
+    except ValidationError as e:
+        return None, (jsonify({'msg': 'Datos inválidos', 'detail': e.errors}), 422)
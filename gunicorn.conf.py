@@ -0,0 +1,126 @@
+"""
+Configuración de gunicorn (se carga automáticamente desde el directorio de trabajo).
+Al arrancar desactiva el modo drenaje que hubiera quedado de la ejecución anterior.
+Con MIGRATE_ON_START=1 aplica las migraciones pendientes antes de crear los workers.
+Descarta una sola vez, en el master, la caché de listados compartida de la ejecución anterior.
+Con BACKGROUND_JOBS=1 arranca el worker de la cola de trabajos junto a gunicorn y lo detiene al salir.
+Con CATALOG_WARMUP=1 la app se carga en el master (preload_app) y calienta el catálogo antes del
+fork, así los workers comparten esa memoria copy-on-write (PRELOAD_APP=0 lo desactiva).
+Los workers son gthread con tantos hilos como conexiones puede dar el pool de la base de datos.
+Con SSE_SERVER=1 arranca además el servidor SSE asyncio (`flask sse serve`, en SSE_PORT), que
+sostiene los streams sin ocupar hilos de los workers, y lo detiene al salir.
+"""
+
+import os
+import secrets
+import subprocess
+import sys
+
+_jobs_worker = None
+_sse_server = None
+
+
+def _pool_capacity():
+    # Conexiones que un worker puede tener a la vez (pool_size + max_overflow): más hilos solo
+    # esperarían en el pool hasta pool_timeout
+    from services import sqlite_profile
+    from services.shared_paths import database_url
+    if sqlite_profile.applies_to(database_url()):
+        # Las lecturas van al pool lector; las escrituras hacen cola a propósito en el escritor único
+        return 2 * sqlite_profile.READER_POOL_SIZE
+    return 5 + 10  # pool por defecto de SQLAlchemy
+
+
+# gthread y no gevent: la app usa hilos, flock, ContextVar por hilo y sys._current_frames (profiler)
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', str(_pool_capacity())))
+if threads > _pool_capacity():
+    print(f'GUNICORN_THREADS={threads} supera las {_pool_capacity()} conexiones del pool de cada worker: '
+          'los hilos de más esperarán una conexión.', file=sys.stderr)
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+# La ruta SSE de los workers (sin SSE_SERVER) deja al menos la mitad de los hilos a las demás rutas
+os.environ.setdefault('SSE_MAX_STREAMS', str(max(1, threads // 2)))
+
+if os.getenv('JWT_ALGORITHM', 'HS256').startswith('HS') and not os.getenv('JWT_SECRET_KEY'):
+    # Un solo secreto aleatorio para todos los workers (lo heredan del master); no sobrevive a un reinicio
+    os.environ['JWT_SECRET_KEY'] = secrets.token_urlsafe(64)
+    print('JWT_SECRET_KEY no definido: se usa un secreto aleatorio generado en el master; '
+          'los tokens no serán válidos tras reiniciar.', file=sys.stderr)
+
+preload_app = os.getenv('PRELOAD_APP', os.getenv('CATALOG_WARMUP', '0')) == '1'
+if preload_app:
+    # Lo lee services/warmup.py al importar la app en el master
+    os.environ['WARMUP_IN_MASTER'] = '1'
+
+
+def _migrate():
+    # En un proceso aparte para no importar la app (ni abrir conexiones) en el master antes del fork
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade'])
+    if result.returncode != 0:
+        raise RuntimeError('Las migraciones fallaron; no se arrancan los workers')
+
+
+def _reset_query_cache():
+    # Una sola vez por master: la caché compartida y su generación pueden venir de una ejecución
+    # anterior. Los workers, el worker de trabajos y las migraciones heredan la variable y no la
+    # vuelven a invalidar al importar la app (eso descartaría lo que ya han cargado los demás)
+    from services.query_cache import query_cache
+    query_cache.invalidate()
+    os.environ['QUERY_CACHE_RESET_ON_IMPORT'] = '0'
+
+
+# Con preload la app se importa antes de on_starting: las migraciones y la invalidación tienen que ir antes
+if preload_app:
+    if os.getenv('MIGRATE_ON_START', '0') == '1':
+        _migrate()
+    _reset_query_cache()
+
+
+def on_starting(server):
+    # Un drenaje de la ejecución anterior no debe dejar a los workers nuevos fuera del balanceador
+    from services.health_service import readiness_probe
+    readiness_probe.stop_drain()
+    if not server.cfg.preload_app:
+        if os.getenv('MIGRATE_ON_START', '0') == '1':
+            _migrate()
+        _reset_query_cache()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    # Las conexiones que abrió el master al calentar no se comparten: cada worker abre las suyas
+    from app import app
+    from models.db import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def when_ready(server):
+    global _jobs_worker, _sse_server
+    if os.getenv('SSE_SERVER', '0') == '1':
+        _sse_server = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'app', 'sse', 'serve'])
+        server.log.info(f'Servidor SSE iniciado (PID {_sse_server.pid}, puerto {os.getenv("SSE_PORT", "6061")})')
+    if os.getenv('BACKGROUND_JOBS', '0') != '1':
+        return
+    concurrency = os.getenv('JOBS_CONCURRENCY', '4')
+    _jobs_worker = subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'jobs', 'worker', '--concurrency', concurrency]
+    )
+    server.log.info(f'Worker de trabajos iniciado (PID {_jobs_worker.pid})')
+
+
+def on_exit(server):
+    if _sse_server is not None and _sse_server.poll() is None:
+        # Los clientes reconectan con Last-Event-ID
+        _sse_server.terminate()
+        _sse_server.wait()
+    if _jobs_worker is not None and _jobs_worker.poll() is None:
+        # SIGTERM: el worker deja de reservar y termina los trabajos en curso antes de salir
+        _jobs_worker.terminate()
+        try:
+            _jobs_worker.wait(timeout=float(os.getenv('JOBS_DRAIN_SECONDS', '30')))
+        except subprocess.TimeoutExpired:
+            server.log.warning('El worker de trabajos no terminó a tiempo; los trabajos en curso se reintentarán')
+            _jobs_worker.kill()
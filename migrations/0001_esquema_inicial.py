@@ -0,0 +1,33 @@
+"""
+Esquema inicial (tablas users y electrodomesticos tal como las creaba db.create_all).
+En una base ya existente no hace nada y solo deja registrada la revisión.
+"""
+
+from sqlalchemy import Boolean, Column, Float, Integer, MetaData, String, Table
+
+revision = '0001'
+description = 'Esquema inicial: users y electrodomesticos'
+
+metadata = MetaData()
+
+Table(
+    'users', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('password', String(255), nullable=False),
+)
+
+Table(
+    'electrodomesticos', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('marca', String(100), nullable=False),
+    Column('modelo', String(100), nullable=False, unique=True),
+    Column('tipo', String(80), nullable=False),
+    Column('precio', Float, nullable=False),
+    Column('clase_energetica', String(5), nullable=True),
+    Column('en_stock', Boolean),
+)
+
+
+def upgrade(ctx):
+    ctx.create_tables(metadata)
@@ -0,0 +1,22 @@
+"""
+Índices compuestos de los listados ordenados y paginados por keyset (ver Electrodomestico.__table_args__).
+"""
+
+revision = '0002'
+description = 'Índices compuestos para listados ordenados de electrodomésticos'
+
+INDEXES = [
+    ('ix_electrodomesticos_tipo_stock_precio', ['tipo', 'en_stock', 'precio', 'id']),
+    ('ix_electrodomesticos_tipo_precio', ['tipo', 'precio', 'id']),
+    ('ix_electrodomesticos_marca_precio', ['marca', 'precio', 'id']),
+    ('ix_electrodomesticos_stock_precio', ['en_stock', 'precio', 'id']),
+    ('ix_electrodomesticos_precio', ['precio', 'id']),
+    ('ix_electrodomesticos_marca', ['marca', 'id']),
+]
+
+
+def upgrade(ctx):
+    # Filas antiguas sin en_stock (la columna admite NULL): se normalizan antes de indexar
+    ctx.backfill('electrodomesticos', 'en_stock = :en_stock', 'en_stock IS NULL', params={'en_stock': True})
+    for name, columns in INDEXES:
+        ctx.create_index(name, 'electrodomesticos', columns)
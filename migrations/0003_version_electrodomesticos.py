@@ -0,0 +1,11 @@
+"""
+Columna `version` de electrodomésticos para el control de concurrencia optimista (ETag / If-Match).
+"""
+
+revision = '0003'
+description = 'Columna version en electrodomésticos'
+
+
+def upgrade(ctx):
+    # Con DEFAULT 1 las filas existentes quedan en la versión 1 sin backfill (ALGORITHM=INSTANT en MySQL)
+    ctx.add_column('electrodomesticos', 'version', 'INTEGER NOT NULL DEFAULT 1')
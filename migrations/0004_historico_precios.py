@@ -0,0 +1,73 @@
+"""
+Histórico de precios (eventos) y agregados por hora y por día (ver models/precios.py).
+Cada electrodoméstico existente recibe su precio actual como primer evento, así el precio
+vigente al empezar un rango es conocido también para el catálogo anterior a la migración.
+"""
+
+import time
+
+from sqlalchemy import BigInteger, Column, Float, Index, Integer, MetaData, String, Table, text
+
+revision = '0004'
+description = 'Histórico de precios y agregados por hora y por día'
+
+metadata = MetaData()
+
+Table(
+    'precios_historial', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('electrodomestico_id', Integer, nullable=False),
+    Column('precio', Float, nullable=False),
+    Column('registrado_ms', BigInteger, nullable=False),
+    Index('ix_precios_historial_electrodomestico_fecha', 'electrodomestico_id', 'registrado_ms'),
+    Index('ix_precios_historial_fecha', 'registrado_ms'),
+)
+
+Table(
+    'precios_agregados', metadata,
+    Column('electrodomestico_id', Integer, primary_key=True, autoincrement=False),
+    Column('bucket', String(8), primary_key=True),
+    Column('inicio_ms', BigInteger, primary_key=True, autoincrement=False),
+    Column('precio_min', Float, nullable=False),
+    Column('precio_max', Float, nullable=False),
+    Column('precio_ultimo', Float, nullable=False),
+    Column('ultimo_ms', BigInteger, nullable=False),
+    Column('cambios', Integer, nullable=False),
+)
+
+BUCKETS = {'hour': 3600 * 1000, 'day': 24 * 3600 * 1000}
+
+
+def upgrade(ctx):
+    ctx.create_tables(metadata)
+    now_ms = int(time.time() * 1000)
+    # Por rangos de id y solo para los electrodomésticos sin histórico: se puede reanudar
+    last_id = 0
+    while True:
+        with ctx.engine.begin() as conn:
+            ids = conn.execute(
+                text('SELECT id FROM electrodomesticos WHERE id > :last_id ORDER BY id LIMIT :batch_size'),
+                {'last_id': last_id, 'batch_size': ctx.batch_size},
+            ).scalars().all()
+            if not ids:
+                break
+            params = {'low': ids[0], 'high': ids[-1], 'now_ms': now_ms}
+            conn.execute(text(
+                'INSERT INTO precios_historial (electrodomestico_id, precio, registrado_ms) '
+                'SELECT e.id, e.precio, :now_ms FROM electrodomesticos e WHERE e.id BETWEEN :low AND :high '
+                'AND NOT EXISTS (SELECT 1 FROM precios_historial h WHERE h.electrodomestico_id = e.id)'
+            ), params)
+            for bucket, size in BUCKETS.items():
+                conn.execute(text(
+                    'INSERT INTO precios_agregados (electrodomestico_id, bucket, inicio_ms, precio_min, precio_max, '
+                    'precio_ultimo, ultimo_ms, cambios) '
+                    'SELECT e.id, :bucket, :inicio_ms, e.precio, e.precio, e.precio, :now_ms, 1 '
+                    'FROM electrodomesticos e WHERE e.id BETWEEN :low AND :high '
+                    'AND NOT EXISTS (SELECT 1 FROM precios_agregados a WHERE a.electrodomestico_id = e.id '
+                    'AND a.bucket = :bucket)'
+                ), {**params, 'bucket': bucket, 'inicio_ms': now_ms - now_ms % size})
+            last_id = ids[-1]
+        if len(ids) < ctx.batch_size:
+            break
+        if ctx.throttle_seconds:
+            time.sleep(ctx.throttle_seconds)
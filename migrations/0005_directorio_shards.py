@@ -0,0 +1,23 @@
+"""
+Directorio del sharding de electrodomésticos (ver models/directorio.py y services/sharding.py).
+Sin SHARD_URLS la tabla queda vacía.
+"""
+
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table
+
+revision = '0005'
+description = 'Directorio de shards de electrodomésticos'
+
+metadata = MetaData()
+
+Table(
+    'electrodomesticos_directorio', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('modelo', String(100), nullable=False, unique=True),
+    Column('shard', Integer, nullable=False),
+    Index('ix_electrodomesticos_directorio_shard', 'shard', 'id'),
+)
+
+
+def upgrade(ctx):
+    ctx.create_tables(metadata)
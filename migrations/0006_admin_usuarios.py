@@ -0,0 +1,12 @@
+"""
+Columna `is_admin` de usuarios: los permisos de administración se guardan en la base y solo se
+conceden desde la CLI (`flask --app app users grant-admin <username>`), no por el nombre de usuario.
+"""
+
+revision = '0006'
+description = 'Columna is_admin en users'
+
+
+def upgrade(ctx):
+    # Ningún usuario existente pasa a ser administrador: hay que concederlo de forma explícita
+    ctx.add_column('users', 'is_admin', 'BOOLEAN NOT NULL DEFAULT 0')
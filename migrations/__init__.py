@@ -0,0 +1,2 @@
+# Migraciones de esquema: un módulo NNNN_descripcion.py por cambio, aplicados en orden por
+# `flask --app app db upgrade` (ver services/migrations.py).
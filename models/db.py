@@ -3,5 +3,7 @@ Archivo para inicializar el objeto db de SQLAlchemy.
 Importa este objeto en los modelos y repositorios para evitar ciclos de importación.
 """
 from flask_sqlalchemy import SQLAlchemy
+from services.sqlite_profile import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession solo cambia de engine con el perfil SQLite (bind de lectura); con MySQL usa el engine por defecto
+db = SQLAlchemy(session_options={'class_': RoutingSession})
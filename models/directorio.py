@@ -0,0 +1,23 @@
+from models.db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ElectrodomesticoDirectorio(db.Model):
+    """
+    Directorio del sharding de electrodomésticos (vive en la base principal): reparte los IDs
+    (autoincremento global) y dice en qué shard está cada electrodoméstico. El modelo es único
+    en todo el catálogo aunque las filas estén en bases distintas.
+    """
+    __tablename__ = 'electrodomesticos_directorio'
+    __table_args__ = (
+        db.Index('ix_electrodomesticos_directorio_shard', 'shard', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    modelo = db.Column(db.String(100), nullable=False, unique=True)
+    shard = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<ElectrodomesticoDirectorio {self.id} {self.modelo} -> shard {self.shard}>'
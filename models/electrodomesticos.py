@@ -5,6 +5,16 @@ logger = logging.getLogger(__name__)
 
 class Electrodomestico(db.Model):
     __tablename__ = 'electrodomesticos'
+    # Índices compuestos para filtros ordenados (ORDER BY ... LIMIT y paginación por keyset);
+    # el id final desempata y permite continuar la página sin OFFSET
+    __table_args__ = (
+        db.Index('ix_electrodomesticos_tipo_stock_precio', 'tipo', 'en_stock', 'precio', 'id'),
+        db.Index('ix_electrodomesticos_tipo_precio', 'tipo', 'precio', 'id'),
+        db.Index('ix_electrodomesticos_marca_precio', 'marca', 'precio', 'id'),
+        db.Index('ix_electrodomesticos_stock_precio', 'en_stock', 'precio', 'id'),
+        db.Index('ix_electrodomesticos_precio', 'precio', 'id'),
+        db.Index('ix_electrodomesticos_marca', 'marca', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     marca = db.Column(db.String(100), nullable=False) # Ej: "Samsung", "LG"
@@ -16,8 +26,28 @@ class Electrodomestico(db.Model):
     
     en_stock = db.Column(db.Boolean, default=True) 
 
+    # Control de concurrencia optimista: se incrementa en cada escritura (ETag / If-Match)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+
     def __repr__(self):
         """
         Representación legible del objeto Electrodomestico.
         """
-        return f'<Electrodomestico {self.marca} {self.modelo} ({self.tipo})>'
\ No newline at end of file
+        return f'<Electrodomestico {self.marca} {self.modelo} ({self.tipo})>'
+
+    def to_dict(self):
+        """
+        Representación serializable del electrodoméstico (la que devuelve la API).
+        """
+        return {
+            "id": self.id,
+            "marca": self.marca,
+            "modelo": self.modelo,
+            "tipo": self.tipo,
+            "precio": self.precio,
+            "clase_energetica": self.clase_energetica,
+            "en_stock": self.en_stock,
+            "version": self.version
+        }
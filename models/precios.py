@@ -0,0 +1,48 @@
+from models.db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tamaños de los agregados precalculados, en milisegundos
+BUCKETS = {'hour': 3600 * 1000, 'day': 24 * 3600 * 1000}
+
+
+class PrecioHistorial(db.Model):
+    """
+    Histórico de precios: una fila por cada escritura que fija el precio de un electrodoméstico.
+    Solo se inserta (nunca se actualiza) y se conserva aunque el electrodoméstico se elimine.
+    """
+    __tablename__ = 'precios_historial'
+    # Las consultas por rango recorren un tramo contiguo del índice (producto, instante)
+    __table_args__ = (
+        db.Index('ix_precios_historial_electrodomestico_fecha', 'electrodomestico_id', 'registrado_ms'),
+        db.Index('ix_precios_historial_fecha', 'registrado_ms'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    electrodomestico_id = db.Column(db.Integer, nullable=False)
+    precio = db.Column(db.Float, nullable=False)
+    registrado_ms = db.Column(db.BigInteger, nullable=False) # Epoch en milisegundos (UTC)
+
+    def __repr__(self):
+        return f'<PrecioHistorial {self.electrodomestico_id} {self.precio} @ {self.registrado_ms}>'
+
+
+class PrecioAgregado(db.Model):
+    """
+    Mínimo, máximo y último precio de un electrodoméstico por hora y por día, mantenidos en la
+    misma transacción que el histórico; los rangos largos se responden desde aquí.
+    """
+    __tablename__ = 'precios_agregados'
+
+    electrodomestico_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bucket = db.Column(db.String(8), primary_key=True) # 'hour' o 'day'
+    inicio_ms = db.Column(db.BigInteger, primary_key=True, autoincrement=False) # Inicio del intervalo (UTC)
+    precio_min = db.Column(db.Float, nullable=False)
+    precio_max = db.Column(db.Float, nullable=False)
+    precio_ultimo = db.Column(db.Float, nullable=False)
+    ultimo_ms = db.Column(db.BigInteger, nullable=False) # Instante del último precio del intervalo
+    cambios = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f'<PrecioAgregado {self.electrodomestico_id} {self.bucket} @ {self.inicio_ms}>'
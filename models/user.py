@@ -14,6 +14,8 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
+    # Solo se concede desde la CLI (flask users grant-admin / create-admin), nunca por la API
+    is_admin = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     def __repr__(self):
         logger.info(f'Representación de usuario solicitada: {self.username}')
@@ -1,9 +1,31 @@
+from sqlalchemy import Float, and_, case, cast, delete, func, or_, select, update
 from sqlalchemy.orm import Session
 from models.electrodomesticos import Electrodomestico
+from repositories.precios_repository import PreciosRepository
+from services.tracing import traced_class
 import logging
 
 logger = logging.getLogger(__name__)
 
+table = Electrodomestico.__table__
+UPDATABLE_FIELDS = ('marca', 'modelo', 'tipo', 'precio', 'clase_energetica', 'en_stock')
+# SQLite devuelve en RETURNING el valor enlazado sin la afinidad de la columna (30 en lugar de 30.0):
+# las columnas Float se convierten con CAST para que la respuesta coincida con la de una lectura
+RETURNING_COLUMNS = tuple(cast(c, c.type).label(c.name) if isinstance(c.type, Float) else c for c in table.c)
+
+
+class VersionConflict(Exception):
+    """La fila existe pero su versión no coincide con la esperada (precondición If-Match)."""
+
+    def __init__(self, electrodomestico_id, expected_version, current_version):
+        super().__init__(f'Electrodoméstico {electrodomestico_id}: versión esperada {expected_version}, '
+                         f'actual {current_version}')
+        self.electrodomestico_id = electrodomestico_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+@traced_class('repository')
 class ElectrodomesticosRepository:
     @staticmethod
     def create(electrodomestico_data, session: Session):
@@ -159,63 +181,297 @@ class ElectrodomesticosRepository:
         return electrodomesticos
     
     @staticmethod
-    def update(electrodomestico_id, electrodomestico_data, session: Session):
+    def build_filtered_query(session: Session, tipo=None, marca=None, en_stock=None, min_price=None,
+                             max_price=None, sort=None, limit=None, after=None, ids=None):
+        """
+        Construye la consulta de listado con filtros, orden y paginación por keyset.
+        
+        Args:
+            session (Session): Sesión de SQLAlchemy
+            tipo, marca (str): Filtros de igualdad opcionales
+            en_stock (bool): Filtro de stock opcional
+            min_price, max_price (float): Rango de precio opcional
+            sort (str): 'precio', '-precio', 'marca', '-marca', 'modelo', '-modelo', 'id' o '-id'
+            limit (int): Máximo de filas
+            after (tuple): (valor de la columna de orden, id) de la última fila de la página anterior
+            ids (list): Restringe la consulta a esos IDs
+            
+        Returns:
+            Query: Consulta lista para ejecutar (o para EXPLAIN)
+        """
+        query = session.query(Electrodomestico)
+        if ids is not None:
+            query = query.filter(Electrodomestico.id.in_(ids))
+        if tipo is not None:
+            query = query.filter(Electrodomestico.tipo == tipo)
+        if marca is not None:
+            query = query.filter(Electrodomestico.marca == marca)
+        if en_stock is not None:
+            query = query.filter(Electrodomestico.en_stock == en_stock)
+        if min_price is not None:
+            query = query.filter(Electrodomestico.precio >= min_price)
+        if max_price is not None:
+            query = query.filter(Electrodomestico.precio <= max_price)
+
+        sort = sort or 'id'
+        descending = sort.startswith('-')
+        column = getattr(Electrodomestico, sort.lstrip('-'))
+        id_column = Electrodomestico.id
+        if after is not None:
+            value, last_id = after
+            if column is id_column:
+                query = query.filter(id_column < last_id if descending else id_column > last_id)
+            elif descending:
+                # El predicado redundante column <= value permite al índice empezar en el cursor
+                query = query.filter(column <= value,
+                                     or_(column < value, and_(column == value, id_column < last_id)))
+            else:
+                query = query.filter(column >= value,
+                                     or_(column > value, and_(column == value, id_column > last_id)))
+        # Mismo sentido en la columna y en el id para que un único índice sirva el ORDER BY
+        if column is id_column:
+            query = query.order_by(id_column.desc() if descending else id_column)
+        elif descending:
+            query = query.order_by(column.desc(), id_column.desc())
+        else:
+            query = query.order_by(column, id_column)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+    
+    @staticmethod
+    def list_filtered(session: Session, **params):
+        """
+        Obtiene electrodomésticos filtrados, ordenados y paginados (ver build_filtered_query).
+        
+        Args:
+            session (Session): Sesión de SQLAlchemy
+            
+        Returns:
+            list: Lista de electrodomésticos
+        """
+        logger.info(f'Listando electrodomésticos filtrados en repositorio: {params}')
+        electrodomesticos = ElectrodomesticosRepository.build_filtered_query(session, **params).all()
+        logger.info(f'{len(electrodomesticos)} electrodomésticos obtenidos en repositorio')
+        return electrodomesticos
+    
+    @staticmethod
+    def get_stats(session: Session):
+        """
+        Obtiene totales, stock y precios mínimo, máximo y promedio por tipo.
+        
+        Args:
+            session (Session): Sesión de SQLAlchemy
+            
+        Returns:
+            dict: Estadísticas globales y por tipo
+        """
+        logger.info('Calculando estadísticas de electrodomésticos en repositorio')
+        rows = session.query(
+            Electrodomestico.tipo,
+            func.count(Electrodomestico.id),
+            func.sum(case((Electrodomestico.en_stock.is_(True), 1), else_=0)),
+            func.min(Electrodomestico.precio),
+            func.max(Electrodomestico.precio),
+            func.avg(Electrodomestico.precio),
+        ).group_by(Electrodomestico.tipo).all()
+        por_tipo = {
+            tipo: {
+                'total': total,
+                'en_stock': int(en_stock or 0),
+                'precio_min': precio_min,
+                'precio_max': precio_max,
+                'precio_promedio': round(float(precio_promedio), 2),
+            }
+            for tipo, total, en_stock, precio_min, precio_max, precio_promedio in rows
+        }
+        return {
+            'total': sum(e['total'] for e in por_tipo.values()),
+            'en_stock': sum(e['en_stock'] for e in por_tipo.values()),
+            'por_tipo': por_tipo,
+        }
+    
+    @staticmethod
+    def get_top_values(column, limit, session: Session):
+        """
+        Valores más frecuentes de una columna (p. ej. los tipos o marcas con más electrodomésticos).
+        
+        Args:
+            column (str): 'tipo' o 'marca'
+            limit (int): Número de valores
+            session (Session): Sesión de SQLAlchemy
+            
+        Returns:
+            list: Tuplas (valor, filas) de mayor a menor número de filas
+        """
+        logger.info(f'Obteniendo los {limit} valores más frecuentes de {column} en repositorio')
+        col = table.c[column]
+        count = func.count(table.c.id)
+        return [tuple(row) for row in session.execute(
+            select(col, count).group_by(col).order_by(count.desc(), col).limit(limit)
+        ).all()]
+    
+    @staticmethod
+    def iter_snapshot_rows(session: Session, batch_size=5000):
+        """
+        Recorre todas las filas ordenadas por ID como tuplas, sin crear objetos ORM.
+        
+        Args:
+            session (Session): Sesión de SQLAlchemy
+            batch_size (int): Filas leídas por lote
+            
+        Returns:
+            iterator: Tuplas (id, marca, modelo, tipo, precio, clase_energetica, en_stock, version)
+        """
+        logger.info('Leyendo electrodomésticos para el snapshot del catálogo en repositorio')
+        query = session.query(
+            Electrodomestico.id, Electrodomestico.marca, Electrodomestico.modelo, Electrodomestico.tipo,
+            Electrodomestico.precio, Electrodomestico.clase_energetica, Electrodomestico.en_stock,
+            Electrodomestico.version,
+        ).order_by(Electrodomestico.id)
+        return iter(query.yield_per(batch_size))
+    
+    @staticmethod
+    def update(electrodomestico_id, electrodomestico_data, session: Session, expected_version=None):
         """
-        Actualiza un electrodoméstico existente.
+        Actualiza un electrodoméstico existente con una sola sentencia
+        `UPDATE ... WHERE id = ? [AND version = ?]` que además incrementa la versión; la fila
+        resultante se obtiene con RETURNING si el dialecto lo soporta. Si el precio cambia,
+        se registra en el histórico en la misma transacción con un INSERT condicional que lo compara
+        con el último precio registrado (fijarlo al mismo valor no cuenta).
         
         Args:
             electrodomestico_id (int): ID del electrodoméstico a actualizar
             electrodomestico_data (dict): Diccionario con los datos a actualizar
             session (Session): Sesión de SQLAlchemy
+            expected_version (int): Versión que debe tener la fila (If-Match), o None para no comprobarla
             
         Returns:
-            Electrodomestico: El electrodoméstico actualizado o None si no existe
+            Row: La fila actualizada o None si no existe
+            
+        Raises:
+            VersionConflict: Si la fila existe pero su versión no es `expected_version`
         """
         logger.info(f'Actualizando electrodoméstico en repositorio: ID {electrodomestico_id}')
-        electrodomestico = session.query(Electrodomestico).filter_by(id=electrodomestico_id).first()
+        values = {field: electrodomestico_data[field] for field in UPDATABLE_FIELDS if field in electrodomestico_data}
+        values['version'] = table.c.version + 1
+        statement = update(table).where(*_version_criteria(electrodomestico_id, expected_version)).values(values)
+        
+        if session.get_bind().dialect.update_returning:
+            row = session.execute(statement.returning(*RETURNING_COLUMNS)).first()
+        else:
+            result = session.execute(statement)
+            row = None
+            if result.rowcount:
+                row = session.execute(select(*table.c).where(table.c.id == electrodomestico_id)).first()
         
-        if not electrodomestico:
+        if row is None:
+            session.rollback()
+            _raise_if_conflict(electrodomestico_id, expected_version, session)
             logger.warning(f'Electrodoméstico no encontrado para actualizar con ID: {electrodomestico_id}')
             return None
         
-        # Actualizar solo los campos proporcionados
-        if 'marca' in electrodomestico_data:
-            electrodomestico.marca = electrodomestico_data['marca']
-        if 'modelo' in electrodomestico_data:
-            electrodomestico.modelo = electrodomestico_data['modelo']
-        if 'tipo' in electrodomestico_data:
-            electrodomestico.tipo = electrodomestico_data['tipo']
-        if 'precio' in electrodomestico_data:
-            electrodomestico.precio = electrodomestico_data['precio']
-        if 'clase_energetica' in electrodomestico_data:
-            electrodomestico.clase_energetica = electrodomestico_data['clase_energetica']
-        if 'en_stock' in electrodomestico_data:
-            electrodomestico.en_stock = electrodomestico_data['en_stock']
+        if 'precio' in values:
+            # El UPDATE ya tiene bloqueada la fila: dos escrituras del mismo id no se cruzan aquí
+            PreciosRepository.record_if_changed(row.id, row.precio, session.connection())
+        session.commit()
+        logger.info(f'Electrodoméstico actualizado en repositorio: {row.modelo} (ID: {row.id}, versión {row.version})')
+        return row
+    
+    @staticmethod
+    def update_stock_batch(changes, session: Session):
+        """
+        Aplica varios cambios de stock con un solo UPDATE
+        (`SET en_stock = CASE WHEN id IN (...) THEN true ELSE false END, version = version + 1`);
+        las filas que ya tienen ese valor no se tocan ni cambian de versión.
+        
+        Args:
+            changes (dict): ID del electrodoméstico -> en_stock
+            session (Session): Sesión de SQLAlchemy
+            
+        Returns:
+            list: Filas actualizadas (los ids que ya no existen se ignoran)
+        """
+        logger.info(f'Actualizando stock de {len(changes)} electrodomésticos en repositorio')
+        in_stock = [electrodomestico_id for electrodomestico_id, en_stock in changes.items() if en_stock]
+        new_value = case((table.c.id.in_(in_stock), True), else_=False)
+        statement = (
+            update(table)
+            .where(table.c.id.in_(list(changes)), table.c.en_stock.is_distinct_from(new_value))
+            .values(en_stock=new_value, version=table.c.version + 1)
+        )
         
+        if session.get_bind().dialect.update_returning:
+            rows = session.execute(statement.returning(*RETURNING_COLUMNS)).all()
+        else:
+            # Sin RETURNING se bloquean antes (FOR UPDATE) solo las filas que van a cambiar y se releen
+            # después: las que ya tenían el valor pedido no generan eventos ni cambios de catálogo
+            changed = session.execute(
+                select(table.c.id)
+                .where(table.c.id.in_(list(changes)), table.c.en_stock.is_distinct_from(new_value))
+                .with_for_update()
+            ).scalars().all()
+            rows = []
+            if changed:
+                session.execute(statement.where(table.c.id.in_(changed)))
+                rows = session.execute(select(*table.c).where(table.c.id.in_(changed))).all()
         session.commit()
-        logger.info(f'Electrodoméstico actualizado en repositorio: {electrodomestico.modelo} (ID: {electrodomestico.id})')
-        return electrodomestico
+        logger.info(f'Stock actualizado en repositorio: {len(rows)} filas')
+        return rows
     
     @staticmethod
-    def delete(electrodomestico_id, session: Session):
+    def delete(electrodomestico_id, session: Session, expected_version=None):
         """
-        Elimina un electrodoméstico por su ID.
+        Elimina un electrodoméstico por su ID con una sola sentencia
+        `DELETE ... WHERE id = ? [AND version = ?]`, devolviendo la fila eliminada con RETURNING
+        si el dialecto lo soporta.
         
         Args:
             electrodomestico_id (int): ID del electrodoméstico a eliminar
             session (Session): Sesión de SQLAlchemy
+            expected_version (int): Versión que debe tener la fila (If-Match), o None para no comprobarla
             
         Returns:
-            bool: True si se eliminó correctamente, False si no existe
+            Row: La fila eliminada o None si no existe
+            
+        Raises:
+            VersionConflict: Si la fila existe pero su versión no es `expected_version`
         """
         logger.info(f'Eliminando electrodoméstico en repositorio: ID {electrodomestico_id}')
-        electrodomestico = session.query(Electrodomestico).filter_by(id=electrodomestico_id).first()
+        criteria = _version_criteria(electrodomestico_id, expected_version)
+        
+        if session.get_bind().dialect.delete_returning:
+            row = session.execute(delete(table).where(*criteria).returning(*RETURNING_COLUMNS)).first()
+        else:
+            # Sin RETURNING la fila se lee antes con bloqueo (FOR UPDATE) para publicar sus datos
+            row = session.execute(select(*table.c).where(*criteria).with_for_update()).first()
+            if row is not None:
+                session.execute(delete(table).where(*criteria))
         
-        if not electrodomestico:
+        if row is None:
+            session.rollback()
+            _raise_if_conflict(electrodomestico_id, expected_version, session)
             logger.warning(f'Electrodoméstico no encontrado para eliminar con ID: {electrodomestico_id}')
-            return False
+            return None
         
-        session.delete(electrodomestico)
         session.commit()
         logger.info(f'Electrodoméstico eliminado en repositorio: ID {electrodomestico_id}')
-        return True
\ No newline at end of file
+        return row
+
+
+def _version_criteria(electrodomestico_id, expected_version):
+    criteria = [table.c.id == electrodomestico_id]
+    if expected_version is not None:
+        criteria.append(table.c.version == expected_version)
+    return criteria
+
+
+def _raise_if_conflict(electrodomestico_id, expected_version, session: Session):
+    """Distingue una fila inexistente (None) de una versión distinta (VersionConflict) tras no afectar filas."""
+    if expected_version is None:
+        return
+    current = session.execute(select(table.c.version).where(table.c.id == electrodomestico_id)).scalar()
+    if current is not None:
+        logger.warning(f'Conflicto de versión en electrodoméstico ID {electrodomestico_id}: '
+                       f'esperada {expected_version}, actual {current}')
+        raise VersionConflict(electrodomestico_id, expected_version, current)
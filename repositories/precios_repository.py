@@ -0,0 +1,216 @@
+from sqlalchemy import case, delete, func, insert, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from models.precios import BUCKETS, PrecioAgregado, PrecioHistorial
+from services.tracing import traced_class
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+historial = PrecioHistorial.__table__
+agregados = PrecioAgregado.__table__
+
+
+@traced_class('repository')
+class PreciosRepository:
+    @staticmethod
+    def record(changes, connection: Connection, registrado_ms=None):
+        """
+        Registra precios en el histórico y actualiza los agregados por hora y por día.
+        Usa la conexión de la transacción en curso, así el histórico se confirma (o se descarta)
+        junto con la escritura del electrodoméstico.
+        
+        Args:
+            changes (list): Pares (electrodomestico_id, precio)
+            connection (Connection): Conexión de la transacción en curso
+            registrado_ms (int): Instante del cambio en milisegundos (por defecto, ahora)
+        """
+        # Un mismo electrodoméstico dos veces en el mismo instante: cuenta el último precio
+        changes = list(dict(changes).items())
+        if not changes:
+            return
+        registrado_ms = registrado_ms if registrado_ms is not None else int(time.time() * 1000)
+        connection.execute(insert(historial), [
+            {'electrodomestico_id': electrodomestico_id, 'precio': precio, 'registrado_ms': registrado_ms}
+            for electrodomestico_id, precio in changes
+        ])
+        rows = [
+            {'electrodomestico_id': electrodomestico_id, 'bucket': bucket, 'inicio_ms': registrado_ms - registrado_ms % size,
+             'precio_min': precio, 'precio_max': precio, 'precio_ultimo': precio, 'ultimo_ms': registrado_ms, 'cambios': 1}
+            for electrodomestico_id, precio in changes
+            for bucket, size in BUCKETS.items()
+        ]
+        _upsert_rollups(connection, rows)
+        logger.info(f'{len(changes)} precios registrados en el histórico')
+
+    @staticmethod
+    def record_if_changed(electrodomestico_id, precio, connection: Connection, registrado_ms=None):
+        """
+        Registra `precio` solo si difiere del último precio registrado, con un único
+        `INSERT ... SELECT ... WHERE` (sin leer antes la fila del electrodoméstico). El último precio
+        sale del histórico o, si ya se purgó, del último agregado diario.
+        
+        Returns:
+            bool: True si el precio cambió y se registró
+        """
+        registrado_ms = registrado_ms if registrado_ms is not None else int(time.time() * 1000)
+        last_event = (
+            select(historial.c.precio).where(historial.c.electrodomestico_id == electrodomestico_id)
+            .order_by(historial.c.registrado_ms.desc(), historial.c.id.desc()).limit(1).scalar_subquery()
+        )
+        last_rollup = (
+            select(agregados.c.precio_ultimo)
+            .where(agregados.c.electrodomestico_id == electrodomestico_id, agregados.c.bucket == 'day')
+            .order_by(agregados.c.inicio_ms.desc()).limit(1).scalar_subquery()
+        )
+        changed = select(literal(electrodomestico_id), literal(precio), literal(registrado_ms)).where(
+            func.coalesce(last_event, last_rollup).is_distinct_from(precio)
+        )
+        result = connection.execute(
+            insert(historial).from_select(['electrodomestico_id', 'precio', 'registrado_ms'], changed)
+        )
+        if not result.rowcount:
+            return False
+        _upsert_rollups(connection, [
+            {'electrodomestico_id': electrodomestico_id, 'bucket': bucket, 'inicio_ms': registrado_ms - registrado_ms % size,
+             'precio_min': precio, 'precio_max': precio, 'precio_ultimo': precio, 'ultimo_ms': registrado_ms, 'cambios': 1}
+            for bucket, size in BUCKETS.items()
+        ])
+        logger.info(f'Precio registrado en el histórico: ID {electrodomestico_id}')
+        return True
+
+    @staticmethod
+    def get_events(electrodomestico_id, desde_ms, hasta_ms, limit, session: Session):
+        """
+        Obtiene los precios registrados en [desde_ms, hasta_ms] en orden cronológico.
+        
+        Args:
+            electrodomestico_id (int): ID del electrodoméstico
+            desde_ms, hasta_ms (int): Rango en milisegundos
+            limit (int): Máximo de filas
+            session (Session): Sesión de SQLAlchemy
+            
+        Returns:
+            list: Tuplas (registrado_ms, precio)
+        """
+        logger.info(f'Leyendo histórico de precios en repositorio: ID {electrodomestico_id}')
+        return session.execute(
+            select(historial.c.registrado_ms, historial.c.precio)
+            .where(historial.c.electrodomestico_id == electrodomestico_id,
+                   historial.c.registrado_ms.between(desde_ms, hasta_ms))
+            .order_by(historial.c.registrado_ms, historial.c.id)
+            .limit(limit)
+        ).all()
+
+    @staticmethod
+    def get_rollups(electrodomestico_id, bucket, desde_ms, hasta_ms, session: Session):
+        """
+        Obtiene los agregados de `bucket` cuyos intervalos se solapan con [desde_ms, hasta_ms].
+        
+        Returns:
+            list: Tuplas (inicio_ms, precio_min, precio_max, precio_ultimo, cambios)
+        """
+        logger.info(f'Leyendo agregados de precios ({bucket}) en repositorio: ID {electrodomestico_id}')
+        return session.execute(
+            select(agregados.c.inicio_ms, agregados.c.precio_min, agregados.c.precio_max,
+                   agregados.c.precio_ultimo, agregados.c.cambios)
+            .where(agregados.c.electrodomestico_id == electrodomestico_id, agregados.c.bucket == bucket,
+                   agregados.c.inicio_ms.between(desde_ms - desde_ms % BUCKETS[bucket], hasta_ms))
+            .order_by(agregados.c.inicio_ms)
+        ).all()
+
+    @staticmethod
+    def get_price_before(electrodomestico_id, instante_ms, session: Session):
+        """
+        Último precio registrado antes de `instante_ms` (el vigente al empezar un rango), o None.
+        Se lee del agregado diario anterior y del histórico del mismo día, así sigue funcionando
+        después de purgar el histórico antiguo.
+        """
+        day = BUCKETS['day']
+        latest = session.execute(
+            select(historial.c.precio)
+            .where(historial.c.electrodomestico_id == electrodomestico_id,
+                   historial.c.registrado_ms.between(instante_ms - instante_ms % day, instante_ms - 1))
+            .order_by(historial.c.registrado_ms.desc(), historial.c.id.desc())
+            .limit(1)
+        ).scalar()
+        if latest is not None:
+            return latest
+        return session.execute(
+            select(agregados.c.precio_ultimo)
+            .where(agregados.c.electrodomestico_id == electrodomestico_id, agregados.c.bucket == 'day',
+                   agregados.c.inicio_ms < instante_ms - instante_ms % day)
+            .order_by(agregados.c.inicio_ms.desc())
+            .limit(1)
+        ).scalar()
+
+    @staticmethod
+    def prune_events(before_ms, session: Session, batch_size=5000):
+        """
+        Elimina del histórico los eventos anteriores a `before_ms` por lotes de clave primaria
+        (transacciones cortas); los agregados se conservan.
+        
+        Returns:
+            int: Filas eliminadas
+        """
+        logger.info(f'Purgando histórico de precios anterior a {before_ms}')
+        deleted = 0
+        while True:
+            ids = session.execute(
+                select(historial.c.id).where(historial.c.registrado_ms < before_ms)
+                .order_by(historial.c.registrado_ms).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            deleted += session.execute(delete(historial).where(historial.c.id.in_(ids))).rowcount
+            session.commit()
+        logger.info(f'{deleted} eventos de precio purgados')
+        return deleted
+
+
+def _upsert_rollups(connection: Connection, rows):
+    """INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE de los agregados según el dialecto."""
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(agregados)
+        new = statement.excluded
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[agregados.c.electrodomestico_id, agregados.c.bucket, agregados.c.inicio_ms],
+            set_=_rollup_assignments(new),
+        ), rows)
+    elif dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(agregados)
+        # MySQL evalúa las asignaciones en orden y las siguientes ya ven los valores nuevos:
+        # precio_ultimo debe asignarse antes que ultimo_ms
+        connection.execute(statement.on_duplicate_key_update(list(_rollup_assignments(statement.inserted).items())), rows)
+    else:
+        for row in rows:
+            key = (agregados.c.electrodomestico_id == row['electrodomestico_id'],
+                   agregados.c.bucket == row['bucket'], agregados.c.inicio_ms == row['inicio_ms'])
+            values = _rollup_assignments(None, row)
+            if not connection.execute(agregados.update().where(*key).values(values)).rowcount:
+                connection.execute(insert(agregados), row)
+
+
+def _rollup_assignments(new, row=None):
+    """
+    Asignaciones que combinan el agregado existente con uno nuevo: `new` son los valores
+    insertados (excluded / VALUES()) o, con `row`, los valores literales de la fila.
+    """
+    def value(name):
+        return row[name] if row is not None else new[name]
+
+    newer = agregados.c.ultimo_ms <= value('ultimo_ms')
+    return {
+        'precio_min': case((agregados.c.precio_min > value('precio_min'), value('precio_min')), else_=agregados.c.precio_min),
+        'precio_max': case((agregados.c.precio_max < value('precio_max'), value('precio_max')), else_=agregados.c.precio_max),
+        'precio_ultimo': case((newer, value('precio_ultimo')), else_=agregados.c.precio_ultimo),
+        'ultimo_ms': case((newer, value('ultimo_ms')), else_=agregados.c.ultimo_ms),
+        'cambios': agregados.c.cambios + value('cambios'),
+    }
@@ -0,0 +1,446 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from models.directorio import ElectrodomesticoDirectorio
+from models.electrodomesticos import Electrodomestico
+from models.precios import PrecioAgregado, PrecioHistorial
+from repositories.electrodomesticos_repository import ElectrodomesticosRepository, table
+from services.sharding import shard_router
+from services.tracing import traced_class
+import heapq
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+directorio = ElectrodomesticoDirectorio.__table__
+historial = PrecioHistorial.__table__
+agregados = PrecioAgregado.__table__
+
+
+@traced_class('repository')
+class ShardedElectrodomesticosRepository:
+    """
+    Misma interfaz que ElectrodomesticosRepository sobre los shards de services/sharding.py.
+    `session` es la sesión de la base principal (directorio); cada shard usa su propia sesión.
+    """
+
+    @staticmethod
+    def create(electrodomestico_data, session: Session):
+        """
+        Reserva el ID y el modelo en el directorio y crea la fila en el shard que indica el mapa.
+        Si falla en el shard, se libera la entrada del directorio.
+        """
+        modelo, tipo = electrodomestico_data.get('modelo'), electrodomestico_data.get('tipo')
+        shard = shard_router.shard_for(modelo, tipo)
+        logger.info(f'Creando electrodoméstico en el shard {shard}: {electrodomestico_data.get("marca")} {modelo}')
+        electrodomestico_id = session.execute(
+            insert(directorio).values(modelo=modelo, shard=shard)
+        ).inserted_primary_key[0]
+        session.commit()
+        try:
+            with shard_router.session(shard) as shard_session:
+                electrodomestico = Electrodomestico(
+                    id=electrodomestico_id,
+                    marca=electrodomestico_data.get('marca'),
+                    modelo=modelo,
+                    tipo=tipo,
+                    precio=electrodomestico_data.get('precio'),
+                    clase_energetica=electrodomestico_data.get('clase_energetica'),
+                    en_stock=electrodomestico_data.get('en_stock', True)
+                )
+                shard_session.add(electrodomestico)
+                shard_session.commit()
+        except Exception:
+            session.execute(delete(directorio).where(directorio.c.id == electrodomestico_id))
+            session.commit()
+            raise
+        shard_router.remember(electrodomestico_id, shard)
+        logger.info(f'Electrodoméstico creado en el shard {shard}: {modelo} (ID: {electrodomestico_id})')
+        return electrodomestico
+
+    @staticmethod
+    def get_by_id(electrodomestico_id, session: Session):
+        logger.info(f'Buscando electrodoméstico por ID en shards: {electrodomestico_id}')
+
+        def fetch(shard):
+            with shard_router.session(shard) as shard_session:
+                return shard_session.get(Electrodomestico, electrodomestico_id)
+
+        return _locate(electrodomestico_id, session, fetch)[1]
+
+    @staticmethod
+    def get_by_modelo(modelo, session: Session):
+        logger.info(f'Buscando electrodoméstico por modelo en shards: {modelo}')
+        electrodomestico_id = session.execute(
+            select(directorio.c.id).where(directorio.c.modelo == modelo)
+        ).scalar()
+        if electrodomestico_id is None:
+            return None
+        return ShardedElectrodomesticosRepository.get_by_id(electrodomestico_id, session)
+
+    @staticmethod
+    def get_all(session: Session):
+        return ShardedElectrodomesticosRepository.list_filtered(session)
+
+    @staticmethod
+    def get_by_tipo(tipo, session: Session):
+        return ShardedElectrodomesticosRepository.list_filtered(session, tipo=tipo)
+
+    @staticmethod
+    def get_by_marca(marca, session: Session):
+        return ShardedElectrodomesticosRepository.list_filtered(session, marca=marca)
+
+    @staticmethod
+    def get_in_stock(session: Session):
+        return ShardedElectrodomesticosRepository.list_filtered(session, en_stock=True)
+
+    @staticmethod
+    def get_by_price_range(min_price, max_price, session: Session):
+        return ShardedElectrodomesticosRepository.list_filtered(session, min_price=min_price, max_price=max_price)
+
+    @staticmethod
+    def list_filtered(session: Session, **params):
+        """
+        Lanza la misma consulta (filtros, orden, límite y cursor keyset) a todos los shards en
+        paralelo y combina las listas ya ordenadas con una mezcla de k vías hasta el límite.
+        """
+        logger.info(f'Listando electrodomésticos filtrados en {len(shard_router.shards)} shards: {params}')
+
+        def fetch(shard):
+            with shard_router.session(shard) as shard_session:
+                return ElectrodomesticosRepository.build_filtered_query(shard_session, **params).all()
+
+        sort = params.get('sort') or 'id'
+        column = sort.lstrip('-')
+        if column == 'id':
+            key = lambda e: e.id  # noqa: E731
+        else:
+            key = lambda e: (getattr(e, column), e.id)  # noqa: E731
+        merged = heapq.merge(*shard_router.scatter(fetch), key=key, reverse=sort.startswith('-'))
+        limit = params.get('limit')
+        electrodomesticos = list(itertools.islice(merged, limit) if limit is not None else merged)
+        logger.info(f'{len(electrodomesticos)} electrodomésticos obtenidos de los shards')
+        return electrodomesticos
+
+    @staticmethod
+    def get_stats(session: Session):
+        """Agrega por tipo en cada shard (con la suma de precios para el promedio) y combina."""
+        logger.info('Calculando estadísticas de electrodomésticos en shards')
+
+        def fetch(shard):
+            with shard_router.session(shard) as shard_session:
+                return shard_session.execute(
+                    select(
+                        table.c.tipo,
+                        func.count(table.c.id),
+                        func.sum(case((table.c.en_stock.is_(True), 1), else_=0)),
+                        func.min(table.c.precio),
+                        func.max(table.c.precio),
+                        func.sum(table.c.precio),
+                    ).group_by(table.c.tipo)
+                ).all()
+
+        totals = {}
+        for tipo, total, en_stock, precio_min, precio_max, precio_sum in itertools.chain(*shard_router.scatter(fetch)):
+            current = totals.get(tipo)
+            if current is None:
+                totals[tipo] = [total, int(en_stock or 0), precio_min, precio_max, precio_sum]
+            else:
+                current[0] += total
+                current[1] += int(en_stock or 0)
+                current[2] = min(current[2], precio_min)
+                current[3] = max(current[3], precio_max)
+                current[4] += precio_sum
+        por_tipo = {
+            tipo: {
+                'total': total,
+                'en_stock': en_stock,
+                'precio_min': precio_min,
+                'precio_max': precio_max,
+                'precio_promedio': round(float(precio_sum) / total, 2),
+            }
+            for tipo, (total, en_stock, precio_min, precio_max, precio_sum) in totals.items()
+        }
+        return {
+            'total': sum(e['total'] for e in por_tipo.values()),
+            'en_stock': sum(e['en_stock'] for e in por_tipo.values()),
+            'por_tipo': por_tipo,
+        }
+
+    @staticmethod
+    def get_top_values(column, limit, session: Session):
+        """Cuenta por valor en cada shard (sin límite: un valor puede estar repartido) y se queda con los `limit` mayores."""
+        logger.info(f'Obteniendo los {limit} valores más frecuentes de {column} en shards')
+
+        def fetch(shard):
+            with shard_router.session(shard) as shard_session:
+                return shard_session.execute(
+                    select(table.c[column], func.count(table.c.id)).group_by(table.c[column])
+                ).all()
+
+        counts = defaultdict(int)
+        for value, rows in itertools.chain(*shard_router.scatter(fetch)):
+            counts[value] += rows
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    @staticmethod
+    def iter_snapshot_rows(session: Session, batch_size=5000):
+        """Recorre los shards a la vez y mezcla sus filas por ID (para el snapshot y el catálogo columnar)."""
+        logger.info('Leyendo electrodomésticos de los shards para el snapshot del catálogo')
+
+        def rows(shard):
+            with shard_router.session(shard) as shard_session:
+                yield from ElectrodomesticosRepository.iter_snapshot_rows(shard_session, batch_size)
+
+        return heapq.merge(*(rows(shard) for shard in shard_router.shards), key=lambda row: row[0])
+
+    @staticmethod
+    def update(electrodomestico_id, electrodomestico_data, session: Session, expected_version=None):
+        """
+        Actualiza en el shard del electrodoméstico con ElectrodomesticosRepository.update (una
+        sentencia, histórico de precios en la misma transacción). Un cambio de modelo se refleja
+        en el directorio, que solo se confirma si la fila se actualizó; si el cambio de modelo o de
+        tipo lo asigna a otro shard, la fila se mueve.
+        """
+        logger.info(f'Actualizando electrodoméstico en shards: ID {electrodomestico_id}')
+
+        def run(shard):
+            with shard_router.session(shard) as shard_session:
+                return ElectrodomesticosRepository.update(electrodomestico_id, electrodomestico_data,
+                                                          shard_session, expected_version)
+
+        try:
+            if 'modelo' in electrodomestico_data:
+                session.execute(update(directorio).where(directorio.c.id == electrodomestico_id)
+                                .values(modelo=electrodomestico_data['modelo']))
+            shard, row = _locate(electrodomestico_id, session, run)
+        except Exception:
+            session.rollback()
+            raise
+        if row is None:
+            session.rollback()
+            return None
+        session.commit()
+
+        target = shard_router.shard_for(row.modelo, row.tipo)
+        if target != shard:
+            ShardedElectrodomesticosRepository.move_rows([electrodomestico_id], shard, target, session)
+        return row
+
+    @staticmethod
+    def update_stock_batch(changes, session: Session):
+        """Agrupa los cambios por shard según el directorio y aplica un UPDATE por shard en paralelo."""
+        logger.info(f'Actualizando stock de {len(changes)} electrodomésticos en shards')
+        placement = dict(session.execute(
+            select(directorio.c.id, directorio.c.shard).where(directorio.c.id.in_(list(changes)))
+        ).all())
+        by_shard = defaultdict(dict)
+        for electrodomestico_id, en_stock in changes.items():
+            if electrodomestico_id in placement:
+                by_shard[placement[electrodomestico_id]][electrodomestico_id] = en_stock
+
+        def run(shard):
+            with shard_router.session(shard) as shard_session:
+                return ElectrodomesticosRepository.update_stock_batch(by_shard[shard], shard_session)
+
+        return list(itertools.chain(*shard_router.scatter(run, shards=list(by_shard))))
+
+    @staticmethod
+    def delete(electrodomestico_id, session: Session, expected_version=None):
+        """Elimina en el shard del electrodoméstico y después libera su entrada del directorio."""
+        logger.info(f'Eliminando electrodoméstico en shards: ID {electrodomestico_id}')
+
+        def run(shard):
+            with shard_router.session(shard) as shard_session:
+                return ElectrodomesticosRepository.delete(electrodomestico_id, shard_session, expected_version)
+
+        row = _locate(electrodomestico_id, session, run)[1]
+        if row is not None:
+            session.execute(delete(directorio).where(directorio.c.id == electrodomestico_id))
+            session.commit()
+            shard_router.forget(electrodomestico_id)
+        return row
+
+    @staticmethod
+    @contextmanager
+    def history_session(electrodomestico_id, session: Session):
+        """Sesión del shard que guarda el histórico de precios del electrodoméstico (la principal si no tiene shard)."""
+        shard = _shard_of(electrodomestico_id, session)
+        if shard is None:
+            yield session
+            return
+        with shard_router.session(shard) as shard_session:
+            yield shard_session
+
+    # =========================
+    # Movimiento de filas entre shards
+    # =========================
+    @staticmethod
+    def move_rows(ids, source, target, session: Session):
+        """
+        Mueve electrodomésticos (con su histórico y sus agregados) de `source` a `target`:
+        copia en el destino, apunta el directorio al destino y borra del origen. Al borrar se
+        comprueba la versión de cada fila: si alguien la escribió en el origen durante la copia
+        (un worker con el directorio en caché) se vuelve a copiar. Se puede repetir si se interrumpe.
+
+        Returns:
+            int: Filas movidas
+        """
+        with shard_router.session(source) as src, shard_router.session(target) as dst:
+            copied = _copy_rows(src, dst, ids)
+            if not copied:
+                return 0
+            moved = list(copied)
+            session.execute(update(directorio).where(directorio.c.id.in_(moved)).values(shard=target))
+            session.commit()
+            for electrodomestico_id in moved:
+                shard_router.remember(electrodomestico_id, target)
+
+            current = dict(src.execute(
+                select(table.c.id, table.c.version).where(table.c.id.in_(moved)).with_for_update()
+            ).all())
+            changed = [i for i, version in current.items() if version != copied[i]]
+            if changed:
+                logger.warning(f'{len(changed)} filas escritas durante el movimiento; se copian de nuevo')
+                _copy_rows(src, dst, changed)
+            src.execute(delete(historial).where(historial.c.electrodomestico_id.in_(moved)))
+            src.execute(delete(agregados).where(agregados.c.electrodomestico_id.in_(moved)))
+            src.execute(delete(table).where(table.c.id.in_(moved)))
+            src.commit()
+        logger.info(f'{len(moved)} electrodomésticos movidos del shard {source} al {target}')
+        return len(moved)
+
+    @staticmethod
+    def rebalance(session: Session, batch_size=500, dry_run=False):
+        """
+        Recorre cada shard y mueve las filas que el mapa actual asigna a otro (p. ej. tras añadir
+        una URL a SHARD_URLS). También borra las copias que dejó un movimiento interrumpido
+        (filas cuyo directorio ya apunta a otro shard).
+
+        Returns:
+            dict: Filas movidas por (origen, destino) y copias huérfanas eliminadas
+        """
+        summary = {'movidas': defaultdict(int), 'huerfanas': 0}
+        for source in shard_router.shards:
+            last_id = 0
+            while True:
+                with shard_router.session(source) as src:
+                    rows = src.execute(
+                        select(table.c.id, table.c.modelo, table.c.tipo)
+                        .where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+                    ).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                placement = dict(session.execute(
+                    select(directorio.c.id, directorio.c.shard).where(directorio.c.id.in_([r.id for r in rows]))
+                ).all())
+                session.rollback()
+                orphans = [r.id for r in rows if placement.get(r.id, source) != source]
+                moves = defaultdict(list)
+                for row in rows:
+                    target = shard_router.shard_for(row.modelo, row.tipo)
+                    if row.id not in orphans and target != source:
+                        moves[target].append(row.id)
+                summary['huerfanas'] += len(orphans)
+                if orphans and not dry_run:
+                    with shard_router.session(source) as src:
+                        src.execute(delete(historial).where(historial.c.electrodomestico_id.in_(orphans)))
+                        src.execute(delete(agregados).where(agregados.c.electrodomestico_id.in_(orphans)))
+                        src.execute(delete(table).where(table.c.id.in_(orphans)))
+                        src.commit()
+                for target, ids in moves.items():
+                    moved = len(ids) if dry_run else ShardedElectrodomesticosRepository.move_rows(ids, source, target, session)
+                    summary['movidas'][(source, target)] += moved
+        return summary
+
+    @staticmethod
+    def import_unsharded(session: Session, batch_size=500):
+        """
+        Copia a los shards los electrodomésticos de la tabla de la base principal (la de antes de
+        activar el sharding) que aún no están en el directorio, conservando IDs e histórico.
+
+        Returns:
+            int: Filas importadas
+        """
+        imported = 0
+        last_id = 0
+        while True:
+            rows = session.execute(
+                select(table.c.id, table.c.modelo, table.c.tipo)
+                .where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            known = set(session.execute(
+                select(directorio.c.id).where(directorio.c.id.in_([r.id for r in rows]))
+            ).scalars())
+            targets = defaultdict(list)
+            for row in rows:
+                if row.id not in known:
+                    targets[shard_router.shard_for(row.modelo, row.tipo)].append(row)
+            for target, pending in targets.items():
+                with shard_router.session(target) as dst:
+                    _copy_rows(session, dst, [r.id for r in pending])
+                session.execute(insert(directorio), [{'id': r.id, 'modelo': r.modelo, 'shard': target} for r in pending])
+                session.commit()
+                imported += len(pending)
+        logger.info(f'{imported} electrodomésticos importados a los shards')
+        return imported
+
+
+def _shard_of(electrodomestico_id, session: Session, refresh=False):
+    shard = None if refresh else shard_router.cached_shard(electrodomestico_id)
+    if shard is None:
+        shard = session.execute(select(directorio.c.shard).where(directorio.c.id == electrodomestico_id)).scalar()
+        if shard is not None:
+            shard_router.remember(electrodomestico_id, shard)
+    return shard
+
+
+def _locate(electrodomestico_id, session: Session, fn):
+    """
+    Ejecuta `fn(shard)` en el shard del electrodoméstico. Si no encuentra la fila y el
+    directorio dice ahora otro shard (la caché quedó desfasada por un resharding), reintenta allí.
+    Devuelve (shard, resultado) o (None, None) si el ID no está en el directorio.
+    """
+    shard = _shard_of(electrodomestico_id, session)
+    if shard is None:
+        return None, None
+    result = fn(shard)
+    if result is None:
+        current = _shard_of(electrodomestico_id, session, refresh=True)
+        if current is not None and current != shard:
+            return current, fn(current)
+        if current is None:
+            shard_router.forget(electrodomestico_id)
+    return shard, result
+
+
+def _copy_rows(src: Session, dst: Session, ids):
+    """
+    Copia filas, histórico y agregados de `ids` de una sesión a otra reemplazando lo que ya
+    hubiera en el destino; el histórico recibe IDs nuevos del destino. Devuelve {id: versión}.
+    """
+    rows = src.execute(select(*table.c).where(table.c.id.in_(ids))).all()
+    if not rows:
+        return {}
+    ids = [row.id for row in rows]
+    events = src.execute(
+        select(historial.c.electrodomestico_id, historial.c.precio, historial.c.registrado_ms)
+        .where(historial.c.electrodomestico_id.in_(ids)).order_by(historial.c.registrado_ms, historial.c.id)
+    ).all()
+    rollups = src.execute(select(*agregados.c).where(agregados.c.electrodomestico_id.in_(ids))).all()
+    dst.execute(delete(historial).where(historial.c.electrodomestico_id.in_(ids)))
+    dst.execute(delete(agregados).where(agregados.c.electrodomestico_id.in_(ids)))
+    dst.execute(delete(table).where(table.c.id.in_(ids)))
+    dst.execute(insert(table), [dict(row._mapping) for row in rows])
+    if events:
+        dst.execute(insert(historial), [dict(row._mapping) for row in events])
+    if rollups:
+        dst.execute(insert(agregados), [dict(row._mapping) for row in rollups])
+    dst.commit()
+    return {row.id: row.version for row in rows}
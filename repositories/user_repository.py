@@ -5,12 +5,15 @@ Puedes crear más repositorios siguiendo este ejemplo.
 """
 
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from models.user import User
+from services.tracing import traced_class
 import logging
 
 logger = logging.getLogger(__name__)
 
+@traced_class('repository')
 class UserRepository:
     @staticmethod
     def get_by_username(username, session: Session):
@@ -23,14 +26,29 @@ class UserRepository:
         return user
 
     @staticmethod
-    def create_user(username, password, session: Session):
+    def get_by_id(user_id, session: Session):
+        logger.info(f'Buscando usuario por ID en repositorio: {user_id}')
+        return session.get(User, user_id)
+
+    @staticmethod
+    def create_user(username, password, session: Session, is_admin=False):
         logger.info(f'Creando usuario en repositorio: {username}')
-        user = User(username=username, password=password)
+        user = User(username=username, password=password, is_admin=is_admin)
         session.add(user)
         session.commit()
         logger.info(f'Usuario creado en repositorio: {username} (ID: {user.id})')
         return user
 
+    @staticmethod
+    def set_admin(username, is_admin, session: Session):
+        logger.info(f'Cambiando permisos de administración en repositorio: {username} -> {is_admin}')
+        user = session.query(User).filter_by(username=username).first()
+        if user is None:
+            return None
+        user.is_admin = is_admin
+        session.commit()
+        return user
+
     @staticmethod
     def get_all(session: Session):
         logger.info('Obteniendo todos los usuarios en repositorio')
@@ -38,6 +56,26 @@ class UserRepository:
         logger.info(f'{len(users)} usuarios obtenidos en repositorio')
         return users
 
+    @staticmethod
+    def get_existing_usernames(usernames, session: Session, chunk_size=5000):
+        logger.info(f'Buscando usernames existentes en repositorio: {len(usernames)} candidatos')
+        usernames = list(usernames)
+        existing = set()
+        # Una consulta IN por bloque en lugar de una consulta por usuario
+        for start in range(0, len(usernames), chunk_size):
+            chunk = usernames[start:start + chunk_size]
+            rows = session.query(User.username).filter(User.username.in_(chunk)).all()
+            existing.update(row[0] for row in rows)
+        logger.info(f'{len(existing)} usernames ya existen en repositorio')
+        return existing
+
+    @staticmethod
+    def bulk_create(users_data, session: Session):
+        logger.info(f'Insertando lote de {len(users_data)} usuarios en repositorio')
+        session.execute(insert(User), users_data)
+        session.commit()
+        return len(users_data)
+
 """
 Para crear más repositorios:
 1. Crea un archivo en la carpeta repositories (ejemplo: product_repository.py).
@@ -0,0 +1 @@
+# DTOs de los cuerpos de las peticiones con validación compilada (ver schemas/base.py).
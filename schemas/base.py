@@ -0,0 +1,163 @@
+"""
+Validación compilada de cuerpos JSON en DTOs con __slots__.
+Cada subclase de `Schema` declara sus campos con `Field`; al crear la clase se genera el código
+fuente de una función `decode` específica (comprobaciones de tipo y rango en línea, sin recorrer
+descriptores en cada petición) y se compila una sola vez con `exec`. `decode` recibe los bytes
+del cuerpo o un dict ya decodificado y devuelve una instancia del DTO o lanza ValidationError
+con un mensaje por campo. Los campos desconocidos se ignoran, así un cliente puede reenviar el
+objeto que leyó (con id y version).
+"""
+
+import json
+import sys
+
+MISSING = object()
+
+_decoder = json.JSONDecoder()
+
+_TYPE_NAMES = {str: 'texto', int: 'entero', float: 'número', bool: 'booleano', list: 'una lista', dict: 'un objeto'}
+
+
+class DecodeError(ValueError):
+    """El cuerpo no es JSON válido."""
+
+
+class ValidationError(ValueError):
+    """El cuerpo no cumple el esquema; `errors` asocia cada campo con su mensaje."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(f'{field}: {message}' for field, message in errors.items()))
+        self.errors = errors
+
+
+def _loads(data):
+    """json.loads sin detección de codificación: un cuerpo JSON es UTF-8 (RFC 8259)."""
+    if type(data) is bytes:
+        data = data.decode('utf-8')
+    text = data.strip()
+    value, end = _decoder.raw_decode(text)
+    if end != len(text):
+        raise ValueError(f'datos extra en la posición {end}')
+    return value
+
+
+class Field:
+    __slots__ = ('type', 'required', 'nullable', 'default', 'min_length', 'max_length', 'minimum', 'maximum', 'name')
+
+    def __init__(self, type, required=True, nullable=False, default=MISSING, min_length=None, max_length=None,
+                 minimum=None, maximum=None):
+        self.type = type
+        self.required = required
+        self.nullable = nullable
+        self.default = default
+        self.min_length = min_length
+        self.max_length = max_length
+        self.minimum = minimum
+        self.maximum = maximum
+        self.name = None
+
+
+def _field_source(index, field):
+    """Líneas de la función decode que validan y asignan un campo."""
+    name = field.name
+    var = f'v{index}'
+    lines = [f'{var} = data.get({name!r}, MISSING)', f'if {var} is MISSING:']
+    if field.required:
+        lines.append(f'    errors[{name!r}] = "campo requerido"')
+    elif field.default is not MISSING:
+        lines += [f'    obj.{name} = values[{name!r}] = fields[{index}].default']
+    else:
+        lines.append('    pass')
+    if field.nullable:
+        lines += [f'elif {var} is None:', f'    obj.{name} = values[{name!r}] = None']
+    else:
+        lines += [f'elif {var} is None:', f'    errors[{name!r}] = "no puede ser null"']
+
+    # type() en lugar de isinstance(): True no es un entero válido ni 1 un booleano
+    if field.type is float:
+        lines += [f'elif type({var}) is not float and type({var}) is not int:',
+                  f'    errors[{name!r}] = "debe ser un número"',
+                  f'elif {var} != {var} or {var} in (INF, -INF):',
+                  f'    errors[{name!r}] = "debe ser un número finito"',
+                  # Un entero JSON enorme (10**400) desbordaría float(): se rechaza como no finito
+                  f'elif type({var}) is int and not -FLOAT_MAX <= {var} <= FLOAT_MAX:',
+                  f'    errors[{name!r}] = "debe ser un número finito"']
+    else:
+        lines += [f'elif type({var}) is not {field.type.__name__}:',
+                  f'    errors[{name!r}] = "debe ser {_TYPE_NAMES[field.type]}"']
+    if field.min_length is not None:
+        lines += [f'elif len({var}) < {field.min_length}:',
+                  f'    errors[{name!r}] = "debe tener al menos {field.min_length} caracteres"']
+    if field.max_length is not None:
+        lines += [f'elif len({var}) > {field.max_length}:',
+                  f'    errors[{name!r}] = "debe tener como máximo {field.max_length} caracteres"']
+    if field.minimum is not None:
+        lines += [f'elif {var} < {field.minimum!r}:', f'    errors[{name!r}] = "debe ser mayor o igual que {field.minimum}"']
+    if field.maximum is not None:
+        lines += [f'elif {var} > {field.maximum!r}:', f'    errors[{name!r}] = "debe ser menor o igual que {field.maximum}"']
+    value = f'float({var})' if field.type is float else var
+    lines += ['else:', f'    obj.{name} = values[{name!r}] = {value}']
+    return lines
+
+
+def _compile_decode(cls, fields):
+    body = [
+        'def decode(data):',
+        '    if type(data) is bytes or type(data) is str:',
+        '        try:',
+        '            data = loads(data)',
+        '        except ValueError as e:',
+        '            raise DecodeError(f"JSON inválido: {e}")',
+        '    if type(data) is not dict:',
+        '        raise ValidationError({"body": "se esperaba un objeto JSON"})',
+        '    obj = new(cls)',
+        '    errors = {}',
+        '    values = {}',
+    ]
+    for index, field in enumerate(fields):
+        body += ['    ' + line for line in _field_source(index, field)]
+    body += [
+        '    if errors:',
+        '        raise ValidationError(errors)',
+        '    obj._values = values',
+        '    return obj',
+    ]
+    namespace = {
+        'loads': _loads, 'DecodeError': DecodeError, 'ValidationError': ValidationError,
+        'MISSING': MISSING, 'INF': float('inf'), 'FLOAT_MAX': sys.float_info.max, 'new': object.__new__, 'cls': cls, 'fields': fields,
+    }
+    exec(compile('\n'.join(body), f'<decode {cls.__name__}>', 'exec'), namespace)
+    return namespace['decode']
+
+
+class SchemaMeta(type):
+    def __new__(mcs, name, bases, namespace):
+        fields = []
+        for attr, value in list(namespace.items()):
+            if isinstance(value, Field):
+                value.name = attr
+                fields.append(value)
+                del namespace[attr]
+        namespace['__slots__'] = tuple(f.name for f in fields) + (('_values',) if fields else ())
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls.__fields__ = tuple(fields)
+        if fields:
+            cls.decode = staticmethod(_compile_decode(cls, cls.__fields__))
+        return cls
+
+
+class Schema(metaclass=SchemaMeta):
+    """DTO con __slots__; `decode(cuerpo)` lo construye validado y `to_dict()` devuelve los campos presentes."""
+
+    __slots__ = ()
+
+    @property
+    def fields_set(self):
+        return tuple(self._values)
+
+    def to_dict(self):
+        return dict(self._values)
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={value!r}' for name, value in self._values.items())
+        return f'{type(self).__name__}({values})'
@@ -0,0 +1,22 @@
+"""
+DTOs del cuerpo de POST /batch.
+"""
+
+from schemas.base import Schema, Field
+
+
+class BatchRequest(Schema):
+    """Subpeticiones en orden; `transaction` las ejecuta en una sola transacción."""
+
+    requests = Field(list)
+    transaction = Field(bool, required=False, default=False)
+    stop_on_error = Field(bool, required=False, default=False)
+
+
+class SubRequest(Schema):
+    """Una subpetición: método, ruta (con query string), cuerpo JSON y cabeceras opcionales."""
+
+    method = Field(str, min_length=1, max_length=10)
+    path = Field(str, min_length=1, max_length=2000)
+    body = Field(dict, required=False, nullable=True, default=None)
+    headers = Field(dict, required=False, default=None)
@@ -0,0 +1,31 @@
+"""
+DTOs de los cuerpos POST/PUT de /electrodomesticos (límites alineados con las columnas del modelo).
+"""
+
+from schemas.base import Schema, Field
+
+
+class ElectrodomesticoCreate(Schema):
+    marca = Field(str, min_length=1, max_length=100)
+    modelo = Field(str, min_length=1, max_length=100)
+    tipo = Field(str, min_length=1, max_length=80)
+    precio = Field(float, minimum=0)
+    clase_energetica = Field(str, required=False, nullable=True, default=None, max_length=5)
+    en_stock = Field(bool, required=False, default=True)
+
+
+class ElectrodomesticoUpdate(Schema):
+    """Actualización parcial: solo se escriben los campos presentes en el cuerpo."""
+
+    marca = Field(str, required=False, min_length=1, max_length=100)
+    modelo = Field(str, required=False, min_length=1, max_length=100)
+    tipo = Field(str, required=False, min_length=1, max_length=80)
+    precio = Field(float, required=False, minimum=0)
+    clase_energetica = Field(str, required=False, nullable=True, max_length=5)
+    en_stock = Field(bool, required=False)
+
+
+class StockUpdate(Schema):
+    """Cuerpo de PUT /electrodomesticos/<id>/stock."""
+
+    en_stock = Field(bool)
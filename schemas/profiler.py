@@ -0,0 +1,13 @@
+"""
+DTO del cuerpo de POST /profiler/.
+"""
+
+from schemas.base import Schema, Field
+
+
+class ProfileStart(Schema):
+    """Duración, endpoint a perfilar (todos si se omite) e intervalo de muestreo."""
+
+    seconds = Field(float, required=False, default=10.0, minimum=0.1)
+    route = Field(str, required=False, nullable=True, default=None, min_length=1, max_length=200)
+    interval_ms = Field(float, required=False, default=10.0, minimum=1, maximum=1000)
@@ -0,0 +1,12 @@
+"""
+DTOs de los cuerpos POST de /users.
+"""
+
+from schemas.base import Schema, Field
+
+
+class UserCredentials(Schema):
+    """Cuerpo de /users/register y /users/login."""
+
+    username = Field(str, min_length=1, max_length=80)
+    password = Field(str, min_length=1, max_length=1024)
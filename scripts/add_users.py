@@ -1,20 +1,15 @@
 """
-Script para agregar usuarios de ejemplo a la base de datos SQLite.
-Ejecuta este archivo para poblar la tabla users.
+Script para agregar usuarios de ejemplo a la base de datos de la aplicación.
+Usa la misma configuración que app.py (MYSQL_URL o SQLite local) y el alta masiva del servicio.
+Para importar archivos grandes usa: flask --app app users import usuarios.csv
 """
 import os
-from models.db import db
-from models.user import User
-from werkzeug.security import generate_password_hash
-from flask import Flask
-from dotenv import load_dotenv
+import sys
 
-load_dotenv()
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///flaskapi.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-db.init_app(app)
+from app import app
+from services.user_service import UserService
 
 usuarios = [
     {"username": "usuario1", "password": "password1"},
@@ -23,10 +18,5 @@ usuarios = [
 ]
 
 with app.app_context():
-    db.create_all()
-    for u in usuarios:
-        if not User.query.filter_by(username=u["username"]).first():
-            user = User(username=u["username"], password=generate_password_hash(u["password"]))
-            db.session.add(user)
-    db.session.commit()
-print("Usuarios agregados correctamente.")
+    summary = UserService.bulk_register(usuarios)
+print(f"Usuarios agregados correctamente: {summary['created']} creados, {summary['existing']} ya existían.")
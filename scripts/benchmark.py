@@ -0,0 +1,323 @@
+"""
+Suite de benchmark de la API.
+Levanta la aplicación en proceso sobre una base SQLite temporal, la llena con N usuarios y
+electrodomésticos y reproduce una carga mixta (login, listado, consulta por ID, alta,
+actualización y borrado). Informa throughput y latencias p50/p95/p99 por ruta y guarda
+el resultado en JSON para comparar entre commits.
+
+Uso:
+    python scripts/benchmark.py --appliances 2000 --users 50 --requests 5000 --output bench.json
+    python scripts/benchmark.py --compare bench.json              # compara con una ejecución previa
+    python scripts/benchmark.py --profile --profile-dir perfiles  # perfila la ruta más lenta
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Peso relativo de cada operación en la carga mixta
+WORKLOAD = {
+    'POST /users/login': 5,
+    'GET /electrodomesticos/': 10,
+    'GET /electrodomesticos/<id>': 50,
+    'POST /electrodomesticos/': 10,
+    'PUT /electrodomesticos/<id>': 20,
+    'DELETE /electrodomesticos/<id>': 5,
+}
+
+TIPOS = ['Nevera', 'Lavadora', 'Microondas', 'Horno', 'Lavavajillas', 'Televisor']
+MARCAS = ['Samsung', 'LG', 'Whirlpool', 'Bosch', 'Mabe', 'Haceb']
+PASSWORD = 'benchmark123'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark en proceso de FlaskAPIExample')
+    parser.add_argument('--appliances', type=int, default=1000, help='Electrodomésticos a sembrar')
+    parser.add_argument('--users', type=int, default=20, help='Usuarios a sembrar')
+    parser.add_argument('--requests', type=int, default=2000, help='Peticiones de la carga mixta')
+    parser.add_argument('--concurrency', type=int, default=1, help='Hilos cliente concurrentes')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla para una carga reproducible')
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+    parser.add_argument('--compare', help='JSON de una ejecución previa para mostrar diferencias')
+    parser.add_argument('--profile', action='store_true', help='Perfila la ruta más lenta tras la carga')
+    parser.add_argument('--profile-dir', default='profiles', help='Directorio para los perfiles')
+    parser.add_argument('--profile-requests', type=int, default=500, help='Peticiones en modo perfil')
+    return parser.parse_args()
+
+
+def load_app(db_path):
+    # La configuración se lee del entorno al importar app.py, por eso se fija antes del import
+    os.environ['MYSQL_URL'] = f'sqlite:///{db_path}'
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-' + 'x' * 32)
+    os.environ['EVENTS_DB_PATH'] = os.path.join(os.path.dirname(db_path), 'events.db')
+    import logging
+    logging.disable(logging.WARNING)
+    from app import app
+    return app
+
+
+def seed(app, n_appliances, n_users):
+    from werkzeug.security import generate_password_hash
+    from models.db import db
+    from models.user import User
+    from models.electrodomesticos import Electrodomestico
+
+    rng = random.Random(0)
+    # Un único hash compartido: sembrar no debe medir el coste de PBKDF2
+    hashed = generate_password_hash(PASSWORD)
+    with app.app_context():
+        db.session.bulk_insert_mappings(User, [
+            {'username': f'bench_user_{i}', 'password': hashed} for i in range(n_users)
+        ])
+        db.session.bulk_insert_mappings(Electrodomestico, [
+            {
+                'marca': rng.choice(MARCAS),
+                'modelo': f'BENCH-{i:07d}',
+                'tipo': rng.choice(TIPOS),
+                'precio': round(rng.uniform(100, 5000), 2),
+                'clase_energetica': rng.choice(['A+++', 'A++', 'A+', 'A', 'B']),
+                'en_stock': rng.random() < 0.8,
+            }
+            for i in range(n_appliances)
+        ])
+        db.session.commit()
+        ids = [row[0] for row in db.session.query(Electrodomestico.id).all()]
+    return ids
+
+
+class Worker:
+    """Cliente de carga con su propio test client y su propio generador aleatorio."""
+
+    def __init__(self, app, ids, n_users, seed_value):
+        self.client = app.test_client()
+        self.rng = random.Random(seed_value)
+        self.ids = ids
+        self.n_users = n_users
+        self.created = 0
+        self.seed_value = seed_value
+        self.token = None
+        status = self.login()
+        if status != 200:
+            raise RuntimeError(f'El login inicial del cliente de carga devolvió {status}')
+
+    def login(self):
+        """Inicia sesión con un usuario sembrado; guarda el token si responde 200 y devuelve el estado."""
+        username = f'bench_user_{self.rng.randrange(self.n_users)}'
+        response = self.client.post('/users/login', json={'username': username, 'password': PASSWORD})
+        if response.status_code == 200:
+            self.token = response.get_json()['access_token']
+        return response.status_code
+
+    def call(self, route):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        if route == 'POST /users/login':
+            return self.login()
+        if route == 'GET /electrodomesticos/':
+            return self.client.get('/electrodomesticos/', headers=headers).status_code
+        if route == 'POST /electrodomesticos/':
+            self.created += 1
+            body = {
+                'marca': self.rng.choice(MARCAS),
+                'modelo': f'BENCH-W{self.seed_value}-{self.created}',
+                'tipo': self.rng.choice(TIPOS),
+                'precio': round(self.rng.uniform(100, 5000), 2),
+            }
+            return self.client.post('/electrodomesticos/', json=body, headers=headers).status_code
+        item_id = self.rng.choice(self.ids)
+        if route == 'GET /electrodomesticos/<id>':
+            return self.client.get(f'/electrodomesticos/{item_id}', headers=headers).status_code
+        if route == 'PUT /electrodomesticos/<id>':
+            body = {'precio': round(self.rng.uniform(100, 5000), 2), 'en_stock': self.rng.random() < 0.5}
+            return self.client.put(f'/electrodomesticos/{item_id}', json=body, headers=headers).status_code
+        if route == 'DELETE /electrodomesticos/<id>':
+            return self.client.delete(f'/electrodomesticos/{item_id}', headers=headers).status_code
+        raise ValueError(f'Ruta desconocida: {route}')
+
+
+def build_plan(n_requests, seed_value):
+    rng = random.Random(seed_value)
+    routes = list(WORKLOAD)
+    weights = [WORKLOAD[r] for r in routes]
+    return rng.choices(routes, weights=weights, k=n_requests)
+
+
+def run_workload(app, ids, args):
+    plan = build_plan(args.requests, args.seed)
+    chunks = [plan[i::args.concurrency] for i in range(args.concurrency)]
+    latencies = defaultdict(list)
+    errors = Counter()
+    lock = threading.Lock()
+
+    def run_chunk(index):
+        worker = Worker(app, ids, args.users, args.seed + index)
+        local = defaultdict(list)
+        local_errors = Counter()
+        for route in chunks[index]:
+            start = time.perf_counter()
+            status = worker.call(route)
+            local[route].append(time.perf_counter() - start)
+            # 404 en borrados/lecturas de IDs ya eliminados es parte de la carga, no un error;
+            # un login con credenciales válidas que no devuelve 200 sí lo es
+            if status >= 500 or (route == 'POST /users/login' and status != 200):
+                local_errors[route] += 1
+        with lock:
+            for route, values in local.items():
+                latencies[route].extend(values)
+            errors.update(local_errors)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(run_chunk, range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    routes = {}
+    for route, values in sorted(latencies.items()):
+        values.sort()
+        total = sum(values)
+        routes[route] = {
+            'count': len(values),
+            'errors': errors.get(route, 0),
+            # Peticiones de la ruta completadas por segundo de reloj durante toda la carga
+            'throughput_rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+            'mean_ms': round(total / len(values) * 1000, 3),
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p95_ms': round(percentile(values, 95) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3),
+        }
+    count = sum(r['count'] for r in routes.values())
+    return {
+        'total': {
+            'count': count,
+            'errors': sum(errors.values()),
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        },
+        'routes': routes,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(summary, previous=None):
+    header = f'{"ruta":34} {"n":>6} {"err":>4} {"rps":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}'
+    print(header)
+    print('-' * len(header))
+    for route, stats in summary['routes'].items():
+        line = (f'{route:34} {stats["count"]:>6} {stats["errors"]:>4} {stats["throughput_rps"]:>9} '
+                f'{stats["p50_ms"]:>9} {stats["p95_ms"]:>9} {stats["p99_ms"]:>9}')
+        old = (previous or {}).get('routes', {}).get(route)
+        if old and old['p95_ms']:
+            delta = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+            line += f'   p95 {delta:+.1f}% vs {previous["meta"].get("commit")}'
+        print(line)
+    total = summary['total']
+    print(f'\nTotal: {total["count"]} peticiones en {total["elapsed_s"]} s '
+          f'({total["throughput_rps"]} req/s), {total["errors"]} errores (5xx o login fallido)')
+
+
+def sample_stacks(thread_id, stop, interval, stacks):
+    """Muestrea la pila del hilo perfilado y acumula stacks colapsados (formato flamegraph)."""
+    while not stop.is_set():
+        frame = sys._current_frames().get(thread_id)
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        if names:
+            stacks[';'.join(reversed(names))] += 1
+        time.sleep(interval)
+
+
+def profile_route(app, ids, args, route):
+    os.makedirs(args.profile_dir, exist_ok=True)
+    worker = Worker(app, ids, args.users, args.seed)
+    stacks = Counter()
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=sample_stacks, args=(threading.get_ident(), stop, 0.001, stacks), daemon=True
+    )
+    profiler = cProfile.Profile()
+    sampler.start()
+    profiler.enable()
+    for _ in range(args.profile_requests):
+        worker.call(route)
+    profiler.disable()
+    stop.set()
+    sampler.join()
+
+    slug = route.replace(' ', '_').replace('/', '_').strip('_').replace('<', '').replace('>', '')
+    prof_path = os.path.join(args.profile_dir, f'{slug}.prof')
+    collapsed_path = os.path.join(args.profile_dir, f'{slug}.collapsed')
+    profiler.dump_stats(prof_path)
+    with open(collapsed_path, 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    print(f'\nPerfil de "{route}": {prof_path} (cProfile, ver con snakeviz) y '
+          f'{collapsed_path} (stacks colapsados para flamegraph.pl/speedscope)')
+    return {'route': route, 'cprofile': prof_path, 'collapsed': collapsed_path}
+
+
+def main():
+    args = parse_args()
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix='flaskapi-bench-') as tmp_dir:
+        app = load_app(os.path.join(tmp_dir, 'bench.db'))
+        ids = seed(app, args.appliances, args.users)
+        print(f'Sembrados {len(ids)} electrodomésticos y {args.users} usuarios; '
+              f'ejecutando {args.requests} peticiones con {args.concurrency} hilo(s)\n')
+        latencies, errors, elapsed = run_workload(app, ids, args)
+        summary = summarize(latencies, errors, elapsed)
+        summary['meta'] = {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        }
+        print_report(summary, previous)
+
+        if args.profile:
+            slowest = max(summary['routes'], key=lambda r: summary['routes'][r]['p95_ms'])
+            summary['profile'] = profile_route(app, ids, args, slowest)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f'\nResultados guardados en {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark del catálogo columnar frente a SQLite.
+Para cada tamaño crea una base SQLite temporal, la carga en el catálogo columnar y mide la
+latencia de los filtros (tipo, rango de precio, en stock y top-k por precio) por las dos vías:
+repositorio + ORM + serialización contra máscaras vectorizadas de NumPy.
+
+Uso:
+    python scripts/benchmark_columnar.py --sizes 100000,1000000 --repeat 3 --output columnar.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+TIPOS = ['Nevera', 'Lavadora', 'Microondas', 'Horno', 'Lavavajillas', 'Televisor']
+MARCAS = ['Samsung', 'LG', 'Whirlpool', 'Bosch', 'Mabe', 'Haceb']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Catálogo columnar vs SQLite')
+    parser.add_argument('--sizes', default='100000,1000000', help='Tamaños de tabla separados por coma')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por consulta (se informa la mediana)')
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+    return parser.parse_args()
+
+
+def create_table(path, size):
+    rng = random.Random(size)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE electrodomesticos (id INTEGER PRIMARY KEY, marca VARCHAR(100) NOT NULL, '
+        'modelo VARCHAR(100) NOT NULL UNIQUE, tipo VARCHAR(80) NOT NULL, precio FLOAT NOT NULL, '
+        'clase_energetica VARCHAR(5), en_stock BOOLEAN, version INTEGER NOT NULL DEFAULT 1)'
+    )
+    conn.executemany(
+        'INSERT INTO electrodomesticos VALUES (?, ?, ?, ?, ?, ?, ?, 1)',
+        (
+            (i + 1, rng.choice(MARCAS), f'MOD-{i:08d}', rng.choice(TIPOS), round(rng.uniform(100, 5000), 2),
+             rng.choice(['A+++', 'A++', 'A', 'B', None]), rng.random() < 0.8)
+            for i in range(size)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def run_size(size, repeat, tmp_dir):
+    from flask import Flask
+    from models.db import db
+    from models.electrodomesticos import Electrodomestico
+    from repositories.electrodomesticos_repository import ElectrodomesticosRepository
+    from services.columnar_catalog import ColumnarCatalog
+
+    db_path = os.path.join(tmp_dir, f'columnar-{size}.db')
+    create_table(db_path, size)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+
+    results = {}
+    with app.app_context():
+        session = db.session
+        start = time.perf_counter()
+        catalog = ColumnarCatalog.from_rows(ElectrodomesticosRepository.iter_snapshot_rows(session), 0)
+        results['load_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        results['memory_mib'] = round(catalog.memory_bytes() / 1024 / 1024, 2)
+
+        def top_k_sql():
+            rows = (session.query(Electrodomestico)
+                    .filter_by(tipo='Nevera', en_stock=True)
+                    .order_by(Electrodomestico.precio, Electrodomestico.id).limit(20).all())
+            return [r.to_dict() for r in rows]
+
+        cases = {
+            'tipo': (
+                lambda: [e.to_dict() for e in ElectrodomesticosRepository.get_by_tipo('Nevera', session)],
+                lambda: catalog.filter(tipo='Nevera'),
+            ),
+            'precio': (
+                lambda: [e.to_dict() for e in ElectrodomesticosRepository.get_by_price_range(1000, 1100, session)],
+                lambda: catalog.filter(min_price=1000, max_price=1100),
+            ),
+            'en_stock': (
+                lambda: [e.to_dict() for e in ElectrodomesticosRepository.get_in_stock(session)],
+                lambda: catalog.filter(en_stock=True),
+            ),
+            'top20_nevera_en_stock': (
+                top_k_sql,
+                lambda: catalog.filter(tipo='Nevera', en_stock=True, sort='precio', limit=20),
+            ),
+        }
+        for name, (sql_fn, columnar_fn) in cases.items():
+            rows = len(columnar_fn())
+            sql_ms = median_ms(sql_fn, repeat)
+            columnar_ms = median_ms(columnar_fn, repeat)
+            session.expunge_all()
+            results[name] = {
+                'rows': rows,
+                'sqlite_ms': sql_ms,
+                'columnar_ms': columnar_ms,
+                'speedup': round(sql_ms / columnar_ms, 1) if columnar_ms else None,
+            }
+        db.session.remove()
+    return results
+
+
+def main():
+    args = parse_args()
+    import logging
+    logging.disable(logging.WARNING)
+    report = {}
+    with tempfile.TemporaryDirectory(prefix='flaskapi-columnar-') as tmp_dir:
+        for size in (int(s) for s in args.sizes.split(',')):
+            print(f'== {size} filas')
+            report[size] = run_size(size, args.repeat, tmp_dir)
+            print(f'   carga {report[size]["load_ms"]} ms, columnas {report[size]["memory_mib"]} MiB')
+            for name, stats in report[size].items():
+                if isinstance(stats, dict):
+                    print(f'   {name:24} {stats["rows"]:>8} filas  sqlite {stats["sqlite_ms"]:>10} ms  '
+                          f'columnar {stats["columnar_ms"]:>9} ms  x{stats["speedup"]}')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Resultados guardados en {args.output}')
+
+
+if __name__ == '__main__':
+    main()
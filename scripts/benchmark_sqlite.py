@@ -0,0 +1,229 @@
+"""
+Benchmark de lecturas y escrituras concurrentes sobre SQLite con N procesos.
+Compara la configuración por defecto de SQLAlchemy (journal de rollback, synchronous=FULL,
+un solo engine) con el perfil de `services/sqlite_profile.py` (WAL, PRAGMA, engines de lectura
+y escritura). Cada proceso simula un worker de gunicorn: crea su app Flask y durante
+`--seconds` ejecuta una mezcla de consultas por ID, listados paginados y actualizaciones con
+los repositorios de la aplicación. Informa operaciones por segundo, latencias p50/p99 y
+errores por bloqueo ("database is locked") de cada modo.
+Con --batch-size > 1 cada escritura es una transacción de varias actualizaciones (las ops de
+escritura cuentan transacciones). El modo `grouped` es el perfil ajustado con el group commit de
+`services/group_commit.py` que usa la app: con --threads > 1 las escrituras concurrentes de los
+hilos de un worker se confirman juntas en una transacción.
+
+Uso:
+    python scripts/benchmark_sqlite.py --workers 4 --seconds 10 --write-ratio 0.2 --output sqlite.json
+    python scripts/benchmark_sqlite.py --workers 2 --threads 8 --write-ratio 0.5 --modes tuned,grouped
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+TIPOS = ['Nevera', 'Lavadora', 'Microondas', 'Horno', 'Lavavajillas', 'Televisor']
+MARCAS = ['Samsung', 'LG', 'Whirlpool', 'Bosch', 'Mabe', 'Haceb']
+MODES = ('default', 'tuned', 'grouped')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='SQLite por defecto vs perfil ajustado con N workers')
+    parser.add_argument('--workers', type=int, default=4, help='Procesos concurrentes')
+    parser.add_argument('--threads', type=int, default=1, help='Hilos por proceso (como los de gthread)')
+    parser.add_argument('--seconds', type=float, default=10, help='Duración de la carga por modo')
+    parser.add_argument('--rows', type=int, default=20000, help='Electrodomésticos sembrados')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='Fracción de operaciones de escritura')
+    parser.add_argument('--batch-size', type=int, default=1, help='Actualizaciones por transacción de escritura')
+    parser.add_argument('--modes', default=','.join(MODES), help='Modos a medir separados por coma')
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+    return parser.parse_args()
+
+
+def create_database(path, rows):
+    """Siembra la base con el esquema de los modelos (modo de journal por defecto)."""
+    from flask import Flask
+    from models.db import db
+    from models.electrodomesticos import Electrodomestico
+    import models.precios  # noqa: F401 - las actualizaciones de precio escriben en el historial
+    from sqlalchemy import insert
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    rng = random.Random(rows)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(Electrodomestico), [
+            {'marca': rng.choice(MARCAS), 'modelo': f'MOD-{i:08d}', 'tipo': rng.choice(TIPOS),
+             'precio': round(rng.uniform(100, 5000), 2), 'en_stock': rng.random() < 0.8}
+            for i in range(rows)
+        ])
+        db.session.commit()
+        db.session.remove()
+    conn = sqlite3.connect(path)
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+def worker(mode, path, rows, seconds, write_ratio, batch_size, threads, seed, start_at, results):
+    import logging
+    import threading
+    logging.disable(logging.WARNING)
+    from flask import Flask
+    from models.db import db
+    from services import sqlite_profile
+    from services.group_commit import GroupCommit
+
+    url = f'sqlite:///{path}'
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    if mode in ('tuned', 'grouped'):
+        sqlite_profile.configure(app, url)
+    db.init_app(app)
+    with app.app_context():
+        sqlite_profile.register_engines(db.engines)
+    group = GroupCommit(enabled=mode == 'grouped')
+    collected = []
+    runners = [
+        threading.Thread(target=_run, args=(app, group, rows, seconds, write_ratio, batch_size,
+                                            seed * threads + index, start_at, collected))
+        for index in range(threads)
+    ]
+    for runner in runners:
+        runner.start()
+    for runner in runners:
+        runner.join()
+    results.put({
+        'latencies': {kind: [value for r in collected for value in r['latencies'][kind]] for kind in ('read', 'write')},
+        'errors': sum(r['errors'] for r in collected),
+    })
+
+
+def _run(app, group, rows, seconds, write_ratio, batch_size, seed, start_at, collected):
+    from sqlalchemy.exc import OperationalError
+    from models.db import db
+    from repositories.electrodomesticos_repository import ElectrodomesticosRepository
+
+    rng = random.Random(seed)
+    latencies = {'read': [], 'write': []}
+    errors = 0
+    with app.app_context():
+        while time.time() < start_at:
+            time.sleep(0.001)
+        deadline = start_at + seconds
+        while time.time() < deadline:
+            kind = 'write' if rng.random() < write_ratio else 'read'
+            start = time.perf_counter()
+            try:
+                if kind == 'write' and batch_size == 1:
+                    electrodomestico_id, precio = rng.randint(1, rows), round(rng.uniform(100, 5000), 2)
+                    group.run(lambda: ElectrodomesticosRepository.update(
+                        electrodomestico_id, {'precio': precio}, db.session,
+                    ))
+                elif kind == 'write':
+                    for _ in range(batch_size):
+                        _batched_update(db.session, rng, rows)
+                    db.session.commit()
+                elif rng.random() < 0.7:
+                    ElectrodomesticosRepository.get_by_id(rng.randint(1, rows), db.session)
+                else:
+                    ElectrodomesticosRepository.list_filtered(
+                        db.session, tipo=rng.choice(TIPOS), sort='precio', limit=20,
+                    )
+                latencies[kind].append((time.perf_counter() - start) * 1000)
+            except OperationalError:
+                errors += 1
+                db.session.rollback()
+            finally:
+                db.session.remove()
+    # list.append es atómico: cada hilo añade su resultado una sola vez
+    collected.append({'latencies': latencies, 'errors': errors})
+
+
+def _batched_update(session, rng, rows):
+    from sqlalchemy import update
+    from models.electrodomesticos import Electrodomestico
+
+    table = Electrodomestico.__table__
+    session.execute(
+        update(table).where(table.c.id == rng.randint(1, rows))
+        .values(precio=round(rng.uniform(100, 5000), 2), version=table.c.version + 1)
+    )
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+
+def run_mode(mode, args, tmp_dir):
+    path = os.path.join(tmp_dir, f'{mode}.db')
+    create_database(path, args.rows)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    start_at = time.time() + 1.0  # todos los workers empiezan a la vez tras crear su app
+    processes = [
+        context.Process(target=worker, args=(mode, path, args.rows, args.seconds, args.write_ratio,
+                                             args.batch_size, args.threads, seed, start_at, results))
+        for seed in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    report = {'errors': sum(r['errors'] for r in collected)}
+    for kind in ('read', 'write'):
+        samples = [value for r in collected for value in r['latencies'][kind]]
+        report[kind] = {
+            'ops': len(samples),
+            'ops_per_second': round(len(samples) / args.seconds, 1),
+            'p50_ms': percentile(samples, 0.50),
+            'p99_ms': percentile(samples, 0.99),
+            'mean_ms': round(statistics.fmean(samples), 3) if samples else None,
+        }
+    return report
+
+
+def main():
+    args = parse_args()
+    report = {
+        'workers': args.workers,
+        'threads': args.threads,
+        'seconds': args.seconds,
+        'rows': args.rows,
+        'write_ratio': args.write_ratio,
+        'batch_size': args.batch_size,
+        'modes': {},
+    }
+    with tempfile.TemporaryDirectory(prefix='flaskapi-sqlite-bench-') as tmp_dir:
+        for mode in args.modes.split(','):
+            result = run_mode(mode, args, tmp_dir)
+            report['modes'][mode] = result
+            print(f'== {mode} ({args.workers} workers x {args.threads} hilos, {args.write_ratio:.0%} escrituras)')
+            for kind in ('read', 'write'):
+                stats = result[kind]
+                print(f'   {kind:6} {stats["ops_per_second"]:>9} ops/s  p50 {stats["p50_ms"]} ms  '
+                      f'p99 {stats["p99_ms"]} ms')
+            print(f'   errores por bloqueo: {result["errors"]}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Resultados guardados en {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Compara el coste por petición de leer el cuerpo con `request.get_json()` y comprobar los campos
+requeridos a mano (ruta anterior) con decodificar y validar con los DTOs compilados de `schemas/`.
+Mide dentro de un contexto de petición de Flask, sin base de datos.
+
+Uso:
+    python scripts/benchmark_validation.py --iterations 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+BODY = json.dumps({
+    'marca': 'Samsung', 'modelo': 'Nevera RF28R7351SG', 'tipo': 'Nevera', 'precio': 1200.5,
+    'clase_energetica': 'A++', 'en_stock': True,
+}).encode('utf-8')
+REQUIRED_FIELDS = ['marca', 'modelo', 'tipo', 'precio']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='get_json + comprobación manual vs DTO compilado')
+    parser.add_argument('--iterations', type=int, default=100000, help='Decodificaciones por variante')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from flask import Flask, request
+    from schemas.electrodomesticos import ElectrodomesticoCreate
+
+    app = Flask(__name__)
+
+    def get_json_path():
+        # Se descarta el JSON cacheado: cada petición real decodifica su cuerpo una vez
+        request._cached_json = (Ellipsis, Ellipsis)
+        data = request.get_json() or {}
+        if not all(field in data for field in REQUIRED_FIELDS):
+            raise ValueError('Error en la petición')
+        return data
+
+    def compiled_path():
+        return ElectrodomesticoCreate.decode(request.get_data()).to_dict()
+
+    with app.test_request_context('/', method='POST', data=BODY, content_type='application/json'):
+        results = {}
+        for name, fn in (('get_json', get_json_path), ('dto compilado', compiled_path)):
+            fn()
+            seconds = min(timeit.repeat(fn, number=args.iterations, repeat=3))
+            results[name] = seconds / args.iterations * 1e6
+            print(f'{name:14} {results[name]:8.2f} µs/petición')
+    print(f'Mejora: x{results["get_json"] / results["dto compilado"]:.2f} (el DTO además valida tipos y rangos)')
+
+
+if __name__ == '__main__':
+    main()
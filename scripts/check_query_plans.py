@@ -0,0 +1,92 @@
+"""
+Comprueba con EXPLAIN QUERY PLAN (SQLite) que los listados ordenados y paginados usan los
+índices compuestos de la tabla de electrodomésticos y no ordenan en un B-tree temporal.
+Crea una base SQLite temporal con el esquema de los modelos, compila cada consulta de
+`ElectrodomesticosRepository.build_filtered_query` y termina con código 1 si algún plan no
+usa el índice esperado.
+
+Uso:
+    python scripts/check_query_plans.py [--rows 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+TIPOS = ['Nevera', 'Lavadora', 'Microondas', 'Horno', 'Lavavajillas', 'Televisor']
+MARCAS = ['Samsung', 'LG', 'Whirlpool', 'Bosch', 'Mabe', 'Haceb']
+
+# (descripción, parámetros de build_filtered_query, índice esperado o None si basta con no usar B-tree temporal)
+CASES = [
+    ('todos por precio', {'sort': 'precio', 'limit': 20}, 'ix_electrodomesticos_precio'),
+    ('todos por precio desc', {'sort': '-precio', 'limit': 20}, 'ix_electrodomesticos_precio'),
+    ('todos por marca', {'sort': 'marca', 'limit': 20}, 'ix_electrodomesticos_marca'),
+    ('todos por modelo', {'sort': 'modelo', 'limit': 20}, None),
+    ('tipo por precio', {'tipo': 'Nevera', 'sort': 'precio', 'limit': 20}, 'ix_electrodomesticos_tipo_precio'),
+    ('tipo en stock por precio', {'tipo': 'Nevera', 'en_stock': True, 'sort': 'precio', 'limit': 20},
+     'ix_electrodomesticos_tipo_stock_precio'),
+    ('tipo en stock, página siguiente',
+     {'tipo': 'Nevera', 'en_stock': True, 'sort': 'precio', 'limit': 20, 'after': (1500.0, 42)},
+     'ix_electrodomesticos_tipo_stock_precio'),
+    ('marca por precio desc', {'marca': 'Samsung', 'sort': '-precio', 'limit': 20},
+     'ix_electrodomesticos_marca_precio'),
+    ('en stock por precio', {'en_stock': True, 'sort': 'precio', 'limit': 20}, 'ix_electrodomesticos_stock_precio'),
+    ('rango de precio por precio', {'min_price': 1000.0, 'max_price': 2000.0, 'sort': 'precio', 'limit': 20},
+     'ix_electrodomesticos_precio'),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Verifica los planes de consulta de los listados ordenados')
+    parser.add_argument('--rows', type=int, default=20000, help='Filas de prueba (el planificador usa ANALYZE)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import logging
+    logging.disable(logging.WARNING)
+    from flask import Flask
+    from sqlalchemy import insert, text
+    from models.db import db
+    from models.electrodomesticos import Electrodomestico
+    from repositories.electrodomesticos_repository import ElectrodomesticosRepository
+
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix='flaskapi-plans-') as tmp_dir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(tmp_dir, "plans.db")}'
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            rng = random.Random(0)
+            db.session.execute(insert(Electrodomestico), [
+                {'marca': rng.choice(MARCAS), 'modelo': f'MOD-{i:08d}', 'tipo': rng.choice(TIPOS),
+                 'precio': round(rng.uniform(100, 5000), 2), 'en_stock': rng.random() < 0.8}
+                for i in range(args.rows)
+            ])
+            db.session.commit()
+            db.session.execute(text('ANALYZE'))
+
+            for name, params, expected_index in CASES:
+                query = ElectrodomesticosRepository.build_filtered_query(db.session, **params)
+                sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+                plan = ' | '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+                ok = 'TEMP B-TREE' not in plan and (expected_index is None or expected_index in plan)
+                failures += not ok
+                print(f'[{"OK" if ok else "FALLO"}] {name}: {plan}')
+            db.session.remove()
+
+    if failures:
+        print(f'{failures} consultas no usan el índice esperado')
+        sys.exit(1)
+    print('Todos los listados ordenados usan sus índices')
+
+
+if __name__ == '__main__':
+    main()
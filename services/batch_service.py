@@ -0,0 +1,92 @@
+"""
+Transacción única de un lote (POST /batch con `transaction: true`).
+Las subpeticiones usan una sesión ligada a una sola conexión con la transacción abierta: cada
+`commit` de los repositorios libera un SAVEPOINT y cada `rollback` vuelve al suyo, y al final
+del lote la transacción se confirma o se deshace entera. Mientras tanto los efectos que solo
+deben ocurrir tras confirmar (invalidación de la caché y del catálogo columnar, eventos SSE) se
+aplazan con `after_commit`, y las lecturas del lote no pasan por la caché ni por el snapshot
+para ver sus propias escrituras sin publicarlas a otras peticiones.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Efectos aplazados del lote en curso (None fuera de una transacción de lote)
+_pending_effects = contextvars.ContextVar('efectos_lote', default=None)
+
+
+def in_transaction():
+    return _pending_effects.get() is not None
+
+
+def after_commit(fn, *args):
+    """Ejecuta `fn(*args)` ahora o, dentro de la transacción de un lote, cuando esta se confirme."""
+    pending = _pending_effects.get()
+    if pending is None:
+        fn(*args)
+    else:
+        pending.append((fn, args))
+
+
+@contextmanager
+def discard_effects_on_error():
+    """Dentro de la transacción de un lote, olvida los efectos que aplazó el bloque si este falla."""
+    pending = _pending_effects.get()
+    mark = len(pending) if pending is not None else 0
+    try:
+        yield
+    except BaseException:
+        if pending is not None:
+            del pending[mark:]
+        raise
+
+
+class BatchTransaction:
+    def __init__(self):
+        self.rolled_back = False
+
+    def rollback(self):
+        """Marca la transacción para deshacerla al terminar el lote."""
+        self.rolled_back = True
+
+
+class BatchService:
+
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """Sustituye `db.session` de esta petición por una sesión dentro de una sola transacción."""
+        from models.db import db
+        connection = db.engine.connect()
+        outer = connection.begin()
+        session = Session(bind=connection, join_transaction_mode='create_savepoint')
+        db.session.registry.set(session)
+        pending = []
+        token = _pending_effects.set(pending)
+        transaction = BatchTransaction()
+        try:
+            yield transaction
+        except BaseException:
+            transaction.rolled_back = True
+            raise
+        finally:
+            _pending_effects.reset(token)
+            # La sesión deshace su SAVEPOINT abierto (si lo hay) sin tocar la transacción exterior
+            session.close()
+            db.session.registry.clear()
+            try:
+                if transaction.rolled_back:
+                    outer.rollback()
+                else:
+                    outer.commit()
+            finally:
+                connection.close()
+            logger.info(f'Transacción del lote {"deshecha" if transaction.rolled_back else "confirmada"} '
+                        f'({len(pending)} efectos aplazados)')
+        if not transaction.rolled_back:
+            for fn, args in pending:
+                fn(*args)
@@ -0,0 +1,390 @@
+"""
+Snapshot binario de solo lectura del catálogo de electrodomésticos.
+La tabla se compila en un archivo compacto (columnas de ancho fijo, tabla de strings, índices
+por id, modelo y precio, listas de posiciones por tipo, marca y stock, y estadísticas ya
+calculadas) que cada worker abre con mmap: las páginas se comparten entre procesos y las
+lecturas no tocan la base de datos ni recorren la tabla entera. El archivo se reemplaza de forma
+atómica con rename y solo se usa si su generación coincide con la generación vigente de la caché
+de consultas, así una escritura confirmada nunca se sirve desde un snapshot anterior.
+
+Formato (little endian):
+    cabecera   MAGIC, generación u64, filas u32, strings u32, offsets de cada sección u64
+    ids        int64[filas] ordenados
+    precio     float64[filas]
+    marca, modelo, tipo, clase_energetica   uint32[filas] índices en la tabla de strings
+    en_stock   uint8[filas]
+    version    uint32[filas]
+    modelo_idx     uint32[filas] posiciones de fila ordenadas por modelo
+    precio_idx     uint32[filas] posiciones de fila ordenadas por precio
+    precio_sorted  float64[filas] los precios en ese mismo orden (para bisect)
+    tipo_*, marca_*   uint32[strings + 1] offsets + uint32[] posiciones (en orden de id) de cada string
+    stock_*        uint32[3] offsets + uint32[filas] posiciones sin stock y con stock
+    string_sorted  uint32[strings] índices de la tabla de strings ordenados por sus bytes
+    string_offsets uint32[strings + 1] offsets en string_data
+    stats          JSON UTF-8 con las estadísticas por tipo (el mismo formato que la consulta)
+    string_data    bytes UTF-8
+"""
+
+import bisect
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from services.query_cache import query_cache
+from services.shared_paths import shared_path
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ELSNAP03'
+NULL_STRING = 0xFFFFFFFF
+SECTIONS = ('ids', 'precio', 'marca', 'modelo', 'tipo', 'clase_energetica', 'en_stock', 'version',
+            'modelo_idx', 'precio_idx', 'precio_sorted', 'tipo_offsets', 'tipo_postings',
+            'marca_offsets', 'marca_postings', 'stock_offsets', 'stock_postings', 'string_sorted',
+            'string_offsets', 'stats', 'string_data')
+HEADER = struct.Struct(f'<8sQII{len(SECTIONS)}Q')
+FORMATS = {'ids': 'q', 'precio': 'd', 'marca': 'I', 'modelo': 'I', 'tipo': 'I',
+           'clase_energetica': 'I', 'en_stock': 'B', 'version': 'I', 'modelo_idx': 'I', 'precio_idx': 'I',
+           'precio_sorted': 'd', 'tipo_offsets': 'I', 'tipo_postings': 'I', 'marca_offsets': 'I',
+           'marca_postings': 'I', 'stock_offsets': 'I', 'stock_postings': 'I', 'string_sorted': 'I',
+           'string_offsets': 'I'}
+COLUMNS = ('ids', 'precio', 'marca', 'modelo', 'tipo', 'clase_energetica', 'en_stock', 'version')
+
+
+def _postings(column, buckets):
+    """Posiciones de fila agrupadas por valor: offsets uint32[buckets + 1] y posiciones uint32[]."""
+    groups = [array('I') for _ in range(buckets)]
+    for position, value in enumerate(column):
+        if value != NULL_STRING:
+            groups[value].append(position)
+    offsets = array('I', [0])
+    postings = array('I')
+    for group in groups:
+        postings.extend(group)
+        offsets.append(len(postings))
+    return offsets, postings
+
+
+def _stats(columns, string_list):
+    """Estadísticas por tipo con el mismo formato que ElectrodomesticosRepository.get_stats."""
+    por_tipo = {}
+    for tipo, precio, en_stock in zip(columns['tipo'], columns['precio'], columns['en_stock']):
+        entry = por_tipo.setdefault(string_list[tipo], {'total': 0, 'en_stock': 0, 'precio_min': precio,
+                                                        'precio_max': precio, 'precio_suma': 0.0})
+        entry['total'] += 1
+        entry['en_stock'] += en_stock
+        entry['precio_suma'] += precio
+        entry['precio_min'] = min(entry['precio_min'], precio)
+        entry['precio_max'] = max(entry['precio_max'], precio)
+    for entry in por_tipo.values():
+        entry['precio_promedio'] = round(entry.pop('precio_suma') / entry['total'], 2)
+    return {
+        'total': len(columns['ids']),
+        'en_stock': sum(e['en_stock'] for e in por_tipo.values()),
+        'por_tipo': por_tipo,
+    }
+
+
+def compile_snapshot(rows, generation, path):
+    """
+    Escribe el snapshot a partir de tuplas (id, marca, modelo, tipo, precio, clase_energetica, en_stock,
+    version) ordenadas por id y lo publica con un rename atómico.
+    """
+    strings = {}
+
+    def intern(value):
+        if value is None:
+            return NULL_STRING
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    columns = {name: array(FORMATS[name]) for name in COLUMNS}
+    for id_, marca, modelo, tipo, precio, clase, en_stock, version in rows:
+        columns['ids'].append(id_)
+        columns['precio'].append(precio)
+        columns['marca'].append(intern(marca))
+        columns['modelo'].append(intern(modelo))
+        columns['tipo'].append(intern(tipo))
+        columns['clase_energetica'].append(intern(clase))
+        columns['en_stock'].append(1 if en_stock else 0)
+        columns['version'].append(version)
+
+    string_list = list(strings)
+    encoded = [s.encode('utf-8') for s in string_list]
+    count = len(columns['ids'])
+    modelo_column = columns['modelo']
+    precio_column = columns['precio']
+    columns['modelo_idx'] = array('I', sorted(range(count), key=lambda i: encoded[modelo_column[i]]))
+    columns['precio_idx'] = array('I', sorted(range(count), key=precio_column.__getitem__))
+    columns['precio_sorted'] = array('d', (precio_column[i] for i in columns['precio_idx']))
+    columns['tipo_offsets'], columns['tipo_postings'] = _postings(columns['tipo'], len(string_list))
+    columns['marca_offsets'], columns['marca_postings'] = _postings(columns['marca'], len(string_list))
+    columns['stock_offsets'], columns['stock_postings'] = _postings(columns['en_stock'], 2)
+    columns['string_sorted'] = array('I', sorted(range(len(encoded)), key=encoded.__getitem__))
+    offsets = array('I', [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    columns['string_offsets'] = offsets
+
+    stats = json.dumps(_stats(columns, string_list), ensure_ascii=False).encode('utf-8')
+    blobs = [columns[name].tobytes() for name in SECTIONS[:-2]] + [stats, b''.join(encoded)]
+    section_offsets = []
+    position = HEADER.size
+    for blob in blobs:
+        position += (-position) % 8  # alinea cada sección a 8 bytes para poder hacer cast del memoryview
+        section_offsets.append(position)
+        position += len(blob)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, generation, count, len(string_list), *section_offsets))
+        for offset, blob in zip(section_offsets, blobs):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+def published_generation(path):
+    """Generación del snapshot publicado en `path`, o None si no existe o tiene otro formato."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return None
+    return HEADER.unpack(header)[1]
+
+
+class Snapshot:
+    """Vista de solo lectura sobre un archivo de snapshot mapeado en memoria."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.generation, self.count, self.string_count, *offsets = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'Archivo de snapshot inválido: {path}')
+        view = memoryview(self._mmap)
+        lengths = {name: self.count for name in FORMATS}
+        lengths.update(tipo_offsets=self.string_count + 1, marca_offsets=self.string_count + 1,
+                       stock_offsets=3, string_sorted=self.string_count, string_offsets=self.string_count + 1)
+        for name, offset, end in zip(SECTIONS, offsets, offsets[1:] + [len(self._mmap)]):
+            if name == 'string_data':
+                self._string_data = view[offset:]
+            elif name == 'stats':
+                self._stats = bytes(view[offset:end]).rstrip(b'\0')
+            else:
+                if name.endswith('_postings'):
+                    # Las listas de posiciones miden lo que indica el último de sus offsets
+                    lengths[name] = getattr(self, name.replace('_postings', '_offsets'))[-1]
+                size = struct.calcsize(FORMATS[name]) * lengths[name]
+                setattr(self, name, view[offset:offset + size].cast(FORMATS[name]))
+
+    def string(self, index):
+        if index == NULL_STRING:
+            return None
+        return bytes(self._string_data[self.string_offsets[index]:self.string_offsets[index + 1]]).decode('utf-8')
+
+    def _string_bytes(self, index):
+        return bytes(self._string_data[self.string_offsets[index]:self.string_offsets[index + 1]])
+
+    def _string_index(self, value):
+        # Búsqueda binaria sobre los índices de string ordenados por bytes
+        encoded = value.encode('utf-8')
+        low, high = 0, self.string_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._string_bytes(self.string_sorted[middle]) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.string_count and self._string_bytes(self.string_sorted[low]) == encoded:
+            return self.string_sorted[low]
+        return None
+
+    def row(self, position):
+        return {
+            "id": self.ids[position],
+            "marca": self.string(self.marca[position]),
+            "modelo": self.string(self.modelo[position]),
+            "tipo": self.string(self.tipo[position]),
+            "precio": self.precio[position],
+            "clase_energetica": self.string(self.clase_energetica[position]),
+            "en_stock": bool(self.en_stock[position]),
+            "version": self.version[position],
+        }
+
+    def get_by_id(self, electrodomestico_id):
+        position = bisect.bisect_left(self.ids, electrodomestico_id)
+        if position < self.count and self.ids[position] == electrodomestico_id:
+            return self.row(position)
+        return None
+
+    def get_by_modelo(self, modelo):
+        encoded = modelo.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._string_bytes(self.modelo[self.modelo_idx[middle]]) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            position = self.modelo_idx[low]
+            if self.string(self.modelo[position]) == modelo:
+                return self.row(position)
+        return None
+
+    def filter(self, tipo=None, marca=None, en_stock=None, min_price=None, max_price=None):
+        """
+        Filtra por igualdad de tipo/marca, stock y rango de precio; devuelve dicts en orden de id.
+        Recorre solo la lista de posiciones más corta de los filtros pedidos y comprueba el resto
+        fila a fila.
+        """
+        candidates = []
+        tipo_index = marca_index = None
+        if tipo is not None:
+            tipo_index = self._string_index(tipo)
+            if tipo_index is None:
+                return []
+            candidates.append(self.tipo_postings[self.tipo_offsets[tipo_index]:self.tipo_offsets[tipo_index + 1]])
+        if marca is not None:
+            marca_index = self._string_index(marca)
+            if marca_index is None:
+                return []
+            candidates.append(self.marca_postings[self.marca_offsets[marca_index]:self.marca_offsets[marca_index + 1]])
+        if en_stock is not None:
+            value = 1 if en_stock else 0
+            candidates.append(self.stock_postings[self.stock_offsets[value]:self.stock_offsets[value + 1]])
+        by_price = None
+        if min_price is not None or max_price is not None:
+            low = 0 if min_price is None else bisect.bisect_left(self.precio_sorted, min_price)
+            high = self.count if max_price is None else bisect.bisect_right(self.precio_sorted, max_price)
+            by_price = self.precio_idx[low:high]
+            candidates.append(by_price)
+
+        if not candidates:
+            positions = range(self.count)
+        else:
+            positions = min(candidates, key=len)
+            if positions is by_price:
+                # El índice de precio está ordenado por precio; el resultado va en orden de id
+                positions = sorted(positions)
+        result = []
+        for position in positions:
+            if tipo_index is not None and self.tipo[position] != tipo_index:
+                continue
+            if marca_index is not None and self.marca[position] != marca_index:
+                continue
+            if en_stock is not None and bool(self.en_stock[position]) != en_stock:
+                continue
+            if min_price is not None and self.precio[position] < min_price:
+                continue
+            if max_price is not None and self.precio[position] > max_price:
+                continue
+            result.append(self.row(position))
+        return result
+
+    def stats(self):
+        """Estadísticas por tipo calculadas al compilar el snapshot."""
+        return json.loads(self._stats)
+
+
+class CatalogSnapshot:
+    """Mantiene el snapshot del worker y lo recompila periódicamente y tras cada escritura."""
+
+    def __init__(self, path, enabled=False, interval=300.0, debounce=1.0):
+        self.path = path
+        self.enabled = enabled
+        self.interval = interval
+        self.debounce = debounce
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+
+    def current(self, generation):
+        """Devuelve el snapshot si está al día con `generation`, o None para leer de la base de datos."""
+        if not self.enabled:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+        with self._lock:
+            try:
+                inode = os.stat(self.path).st_ino
+                if self._snapshot is None or self._snapshot.inode != inode:
+                    self._snapshot = Snapshot(self.path)
+            except (OSError, ValueError):
+                return None
+            snapshot = self._snapshot
+        return snapshot if snapshot.generation == generation else None
+
+    def mark_changed(self):
+        if self.enabled:
+            self._changed.set()
+
+    def start(self, app, build):
+        """Arranca (una vez por proceso) el hilo que recompila con `build()` dentro del contexto de la app."""
+        if not self.enabled or (self._thread is not None and self._thread_pid == os.getpid()):
+            return
+        self._thread_pid = os.getpid()
+        self._thread = threading.Thread(target=self._loop, args=(app, build), name='catalog-snapshot', daemon=True)
+        self._thread.start()
+
+    def _loop(self, app, build):
+        self._changed.set()
+        while True:
+            # Sin cambios en todo el intervalo se recompila igualmente (recoge escrituras externas a la app)
+            periodic = not self._changed.wait(self.interval)
+            time.sleep(self.debounce)  # agrupa ráfagas de escrituras en una sola compilación
+            # Un cambio que llegue durante la compilación vuelve a activar el evento: otra vuelta
+            self._changed.clear()
+            with app.app_context():
+                self.rebuild(build, force=periodic)
+
+    def rebuild(self, build, force=False):
+        """
+        Compila el snapshot con `build(path)`. Si otro proceso está compilando espera a que
+        termine y después compila otra vez, salvo que el archivo publicado ya esté al día con la
+        generación vigente (y no se pida `force`): así un cambio confirmado mientras se compilaba,
+        que esa compilación pudo no ver, nunca se pierde, y varios procesos que piden la misma
+        compilación no la repiten.
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        lock_path = f'{self.path}.lock'
+        with open(lock_path, 'w') as lock_file:
+            # Solo un proceso compila a la vez; los demás esperan a que publique su archivo
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not force and published_generation(self.path) == query_cache.generation():
+                    return False
+                start = time.perf_counter()
+                generation, count = build(self.path)
+                logger.info(f'Snapshot del catálogo compilado: {count} filas, generación {generation} '
+                            f'en {(time.perf_counter() - start) * 1000:.1f} ms')
+                return True
+            except Exception as e:
+                logger.error(f'No se pudo compilar el snapshot del catálogo: {str(e)}')
+                return False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+catalog_snapshot = CatalogSnapshot(
+    os.getenv('SNAPSHOT_PATH', shared_path('catalog.snap')),
+    enabled=os.getenv('SNAPSHOT_ENABLED', '0') == '1',
+    interval=float(os.getenv('SNAPSHOT_INTERVAL_SECONDS', '300')),
+)
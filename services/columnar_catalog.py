@@ -0,0 +1,334 @@
+"""
+Catálogo columnar en memoria para los filtros de electrodomésticos (opcional, requiere NumPy).
+Guarda `precio` como float64, `marca`/`modelo`/`tipo`/`clase_energetica` codificados con diccionario,
+`en_stock` como máscara booleana y resuelve filtros, ordenación y top-k con operaciones
+vectorizadas en lugar de consultas SQL y objetos ORM. Se mantiene al día aplicando los cambios
+de cada escritura confirmada en el worker; si detecta escrituras de otros workers (la generación
+compartida avanzó sin pasar por él) se recarga en segundo plano y mientras tanto no se usa.
+Las bajas dejan huecos (`alive=False`) que se compactan cuando superan COMPACT_RATIO de las filas.
+"""
+
+import os
+import threading
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # dependencia opcional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SORT_COLUMNS = ('precio', 'marca', 'modelo', 'id')
+# Fracción de posiciones muertas (bajas y textos de modelo sin uso) a partir de la que se compacta
+COMPACT_RATIO = float(os.getenv('COLUMNAR_COMPACT_RATIO', '0.25'))
+COMPACT_MIN_SLOTS = 1024
+
+
+class _Dictionary:
+    """Codificación por diccionario de una columna de strings (-1 representa NULL)."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+        self._array = None
+        self._ranks = None
+
+    def encode(self, value):
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            self._array = self._ranks = None
+        return code
+
+    def lookup(self, value):
+        return self.codes.get(value)
+
+    def array(self):
+        """Valores como array de texto de NumPy (comparaciones vectorizadas por punto de código, como str)."""
+        if self._array is None:
+            self._array = np.array(self.values, dtype=np.str_)
+        return self._array
+
+    def ranks(self):
+        """Posición alfabética de cada código: ordenar por rango es ordenar por el texto."""
+        if self._ranks is None:
+            ranks = np.empty(len(self.values), dtype=np.int64)
+            ranks[np.argsort(self.array(), kind='stable')] = np.arange(len(ranks))
+            self._ranks = ranks
+        return self._ranks
+
+
+COLUMNS = ('ids', 'precio', 'marca', 'modelo', 'tipo', 'clase_energetica', 'en_stock', 'version', 'alive')
+
+
+class ColumnarCatalog:
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.generation = None
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.precio = np.zeros(capacity, dtype=np.float64)
+        self.marca = np.zeros(capacity, dtype=np.int32)
+        self.modelo = np.zeros(capacity, dtype=np.int32)
+        self.tipo = np.zeros(capacity, dtype=np.int32)
+        self.clase_energetica = np.zeros(capacity, dtype=np.int32)
+        self.en_stock = np.zeros(capacity, dtype=np.bool_)
+        self.version = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=np.bool_)
+        self.marcas = _Dictionary()
+        self.modelos = _Dictionary()
+        self.tipos = _Dictionary()
+        self.clases = _Dictionary()
+        self.positions = {}
+        self.dead = 0  # posiciones de bajas más textos de modelo que ya no usa ninguna fila
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_rows(cls, rows, generation):
+        """Construye el catálogo a partir de tuplas (id, marca, modelo, tipo, precio, clase, en_stock, version)."""
+        catalog = cls()
+        for row in rows:
+            catalog._upsert(*row)
+        catalog.generation = generation
+        return catalog
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def _upsert(self, id_, marca, modelo, tipo, precio, clase, en_stock, version):
+        position = self.positions.get(id_)
+        if position is None:
+            if self.size == len(self.ids):
+                self._grow()
+            position = self.positions[id_] = self.size
+            self.size += 1
+        elif self.modelos.values[self.modelo[position]] != modelo:
+            self.dead += 1
+        self.ids[position] = id_
+        self.modelo[position] = self.modelos.encode(modelo)
+        self.precio[position] = precio
+        self.marca[position] = self.marcas.encode(marca)
+        self.tipo[position] = self.tipos.encode(tipo)
+        self.clase_energetica[position] = self.clases.encode(clase)
+        self.en_stock[position] = bool(en_stock)
+        self.version[position] = version
+        self.alive[position] = True
+
+    def _delete(self, id_):
+        position = self.positions.pop(id_, None)
+        if position is not None:
+            self.alive[position] = False
+            self.dead += 1
+
+    def _compact(self):
+        """Elimina las posiciones de las bajas y reconstruye el diccionario de modelos con los vivos."""
+        live = np.flatnonzero(self.alive[:self.size])
+        capacity = max(1024, len(live) * 2)
+        for name in COLUMNS:
+            column = getattr(self, name)
+            compacted = np.zeros(capacity, dtype=column.dtype)
+            compacted[:len(live)] = column[live]
+            setattr(self, name, compacted)
+        modelos = _Dictionary()
+        old_values = self.modelos.values
+        self.modelo[:len(live)] = [modelos.encode(old_values[code]) for code in self.modelo[:len(live)].tolist()]
+        self.modelos = modelos
+        self.size = len(live)
+        self.positions = dict(zip(self.ids[:self.size].tolist(), range(self.size)))
+        self.dead = 0
+
+    def apply(self, changes, previous_generation, new_generation):
+        """
+        Aplica los cambios de una escritura confirmada. Solo es válido si el catálogo estaba en
+        `previous_generation`; si no, otro worker escribió entre medias y queda desactualizado.
+        """
+        with self.lock:
+            if self.generation != previous_generation:
+                return False
+            for action, values in changes:
+                if action == 'eliminado':
+                    self._delete(values[0])
+                else:
+                    self._upsert(*values)
+            if self.dead > max(COMPACT_MIN_SLOTS, COMPACT_RATIO * self.size):
+                self._compact()
+            self.generation = new_generation
+            return True
+
+    def filter(self, tipo=None, marca=None, en_stock=None, min_price=None, max_price=None,
+               sort=None, limit=None, after=None):
+        """
+        Devuelve dicts de los electrodomésticos que cumplen los filtros, ordenados por `sort`
+        (`precio`, `-precio`, `marca`, `modelo`; por defecto id) y limitados a `limit`.
+        `after` es el cursor (valor de orden, id) de la última fila de la página anterior.
+        """
+        with self.lock:
+            n = self.size
+            mask = self.alive[:n].copy()
+            if tipo is not None:
+                code = self.tipos.lookup(tipo)
+                if code is None:
+                    return []
+                mask &= self.tipo[:n] == code
+            if marca is not None:
+                code = self.marcas.lookup(marca)
+                if code is None:
+                    return []
+                mask &= self.marca[:n] == code
+            if en_stock is not None:
+                mask &= self.en_stock[:n] == en_stock
+            if min_price is not None:
+                mask &= self.precio[:n] >= min_price
+            if max_price is not None:
+                mask &= self.precio[:n] <= max_price
+            if after is not None:
+                mask &= self._after_mask(n, sort, after)
+            selected = np.flatnonzero(mask)
+            selected = self._order(selected, sort, limit)
+            return self._rows(selected)
+
+    @staticmethod
+    def _parse_sort(sort):
+        sort = sort or 'id'
+        column = sort.lstrip('-')
+        if column not in SORT_COLUMNS:
+            raise ValueError(f'Columna de ordenación no soportada: {sort}')
+        return column, sort.startswith('-')
+
+    def _after_mask(self, n, sort, after):
+        """Máscara de las filas posteriores al cursor en el orden pedido (mismo criterio que el SQL)."""
+        column, descending = self._parse_sort(sort)
+        value, last_id = after
+        ids = self.ids[:n]
+        if column == 'id':
+            return ids < last_id if descending else ids > last_id
+        if column == 'precio':
+            values = self.precio[:n]
+            greater, equal = values > value, values == value
+        else:
+            # Se compara el texto de cada código del diccionario y se expande por fila
+            dictionary, codes = (self.marcas, self.marca) if column == 'marca' else (self.modelos, self.modelo)
+            values = dictionary.array()
+            greater, equal = (values > value)[codes[:n]], (values == value)[codes[:n]]
+        if descending:
+            return (~greater & ~equal) | (equal & (ids < last_id))
+        return greater | (equal & (ids > last_id))
+
+    def _order(self, selected, sort, limit):
+        """
+        Ordena las posiciones seleccionadas; los empates se resuelven por id en el mismo sentido
+        que la columna, igual que el ORDER BY del repositorio.
+        """
+        column, descending = self._parse_sort(sort)
+        # Por id y no por posición: las altas no llegan en orden de id (commits concurrentes, shards)
+        ids = self.ids[selected]
+        if column == 'id':
+            keys = ids
+        elif column == 'precio':
+            keys = self.precio[selected]
+        elif column == 'marca':
+            # Rango alfabético de cada código para ordenar por el texto y no por el orden de alta
+            keys = self.marcas.ranks()[self.marca[selected]]
+        else:
+            keys = self.modelos.ranks()[self.modelo[selected]]
+        if descending:
+            keys = -keys
+            ids = -ids
+        if limit is not None and 0 < limit < len(selected):
+            # top-k: argpartition es O(n); solo se ordenan los candidatos hasta el k-ésimo valor (con empates)
+            threshold = keys[np.argpartition(keys, limit - 1)[limit - 1]]
+            candidates = np.flatnonzero(keys <= threshold)
+            order = candidates[np.lexsort((ids[candidates], keys[candidates]))]
+        else:
+            order = np.lexsort((ids, keys))
+        if limit is not None:
+            order = order[:limit]
+        return selected[order]
+
+    def _rows(self, selected):
+        marcas, modelos, tipos, clases = self.marcas.values, self.modelos.values, self.tipos.values, self.clases.values
+        return [
+            {
+                "id": id_,
+                "marca": marcas[marca],
+                "modelo": modelos[modelo],
+                "tipo": tipos[tipo],
+                "precio": precio,
+                "clase_energetica": clases[clase] if clase >= 0 else None,
+                "en_stock": en_stock,
+                "version": version,
+            }
+            for id_, marca, modelo, tipo, precio, clase, en_stock, version in zip(
+                self.ids[selected].tolist(),
+                self.marca[selected].tolist(),
+                self.modelo[selected].tolist(),
+                self.tipo[selected].tolist(),
+                self.precio[selected].tolist(),
+                self.clase_energetica[selected].tolist(),
+                self.en_stock[selected].tolist(),
+                self.version[selected].tolist(),
+            )
+        ]
+
+    def memory_bytes(self):
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+
+class ColumnarCatalogManager:
+    """Catálogo columnar del worker: lo carga, aplica escrituras propias y lo recarga si queda desfasado."""
+
+    def __init__(self, enabled=False):
+        if enabled and np is None:
+            logger.warning('COLUMNAR_CATALOG activo pero NumPy no está instalado; se usa la base de datos')
+            enabled = False
+        self.enabled = enabled
+        self.catalog = None
+        self._loading = threading.Lock()
+        self._app = None
+        self._build = None
+
+    def configure(self, app, build):
+        self._app = app
+        self._build = build
+
+    def current(self, generation):
+        """Devuelve el catálogo si está en `generation`; si no, programa su recarga y devuelve None."""
+        if not self.enabled:
+            return None
+        catalog = self.catalog
+        if catalog is not None and catalog.generation == generation:
+            return catalog
+        self._reload_async()
+        return None
+
+    def apply(self, changes, new_generation):
+        catalog = self.catalog
+        if catalog is not None and not catalog.apply(changes, new_generation - 1, new_generation):
+            logger.info('Catálogo columnar desfasado por escrituras de otro worker; se recargará')
+
+    def _reload_async(self):
+        if self._build is None or not self._loading.acquire(blocking=False):
+            return
+        threading.Thread(target=self._reload, name='columnar-catalog', daemon=True).start()
+
+    def _reload(self):
+        try:
+            with self._app.app_context():
+                self.catalog = self._build()
+            logger.info(f'Catálogo columnar cargado: {self.catalog.size} filas, '
+                        f'{self.catalog.memory_bytes() / 1024 / 1024:.1f} MiB en columnas')
+        except Exception as e:
+            logger.error(f'No se pudo cargar el catálogo columnar: {str(e)}')
+        finally:
+            self._loading.release()
+
+
+columnar_catalog = ColumnarCatalogManager(enabled=os.getenv('COLUMNAR_CATALOG', '0') == '1')
@@ -1,27 +1,285 @@
 from repositories.electrodomesticos_repository import ElectrodomesticosRepository
+from repositories.sharded_electrodomesticos_repository import ShardedElectrodomesticosRepository
+from repositories.precios_repository import PreciosRepository
+from models.electrodomesticos import Electrodomestico
+from services.singleflight import SingleFlight
+from services.query_cache import query_cache
+from services.catalog_snapshot import catalog_snapshot, compile_snapshot
+from services.columnar_catalog import columnar_catalog, ColumnarCatalog
+from services.tracing import tracer, traced_class
+from services.event_broker import electrodomestico_event, queue_events
+from services.stock_buffer import stock_buffer
+from services.job_queue import job_queue, task
+from services.sharding import shard_router
+from services.batch_service import after_commit, in_transaction
+from services.group_commit import group_commit
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import json
+import base64
+import binascii
+import copy
+import itertools
+import math
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Con SHARD_URLS los electrodomésticos viven en los shards (ver services/sharding.py)
+_repository = ShardedElectrodomesticosRepository if shard_router.enabled else ElectrodomesticosRepository
+
+# Lecturas idénticas concurrentes dentro del worker comparten una sola consulta
+read_flight = SingleFlight(timeout=float(os.getenv('SINGLEFLIGHT_TIMEOUT_SECONDS', '5')))
+
+
+def _serialize(electrodomesticos):
+    with tracer.span('serializar', 'serialization', filas=len(electrodomesticos)):
+        return [e.to_dict() for e in electrodomesticos]
+
+
+def _cached_list(name, loader, sort=None, limit=None, after=None, **filters):
+    """
+    Devuelve el JSON (bytes) de una consulta de listado desde la caché de dos niveles;
+    en caso de fallo la consulta se ejecuta una sola vez por worker (single-flight), contra el
+    catálogo columnar o el snapshot del catálogo si están al día, o contra la base de datos con `loader`.
+    Con `sort`, `limit` o `after` (cursor keyset) la consulta a la base de datos la resuelve
+    `list_filtered` con ORDER BY ... LIMIT sobre los índices compuestos; el snapshot, que solo
+    recorre en orden de id, no se usa en ese caso.
+    La generación se lee antes de consultar para que una escritura concurrente nunca deje
+    datos obsoletos en la generación vigente. Dentro de un lote transaccional se consulta siempre la base.
+    Los cambios de stock pendientes del buffer write-behind se superponen al resultado (ver
+    `_overlay_pending_stock`) y la secuencia del journal forma parte de la clave mientras haya alguno.
+    """
+    page = {'sort': sort, 'limit': limit, 'after': after}
+    if in_transaction():
+        # Un lote transaccional lee sus propias escrituras sin confirmar: ni caché ni catálogos
+        from models.db import db
+        return json.dumps(_serialize(_repository.list_filtered(db.session, **filters, **page))).encode('utf-8')
+    paged = any(v is not None for v in page.values())
+    # La secuencia antes que el contenido: un cambio anotado entre ambas lecturas nunca queda bajo una clave anterior
+    journal_seq = stock_buffer.version()
+    pending = stock_buffer.pending()
+    key = query_cache.normalize(name, **filters, **page, pendiente=journal_seq if pending else None)
+    generation = query_cache.generation()
+    body = query_cache.get(key, generation)
+    if body is not None:
+        return body
+
+    def load():
+        from models.db import db
+        source_page = page
+        if pending and filters.get('en_stock') is not None and limit is not None:
+            # Las filas que el valor pendiente saca del filtro no pueden dejar la página corta
+            source_page = dict(page, limit=limit + len(pending))
+        columnar = columnar_catalog.current(generation)
+        snapshot = catalog_snapshot.current(generation) if columnar is None and not paged else None
+        if columnar is not None:
+            rows = columnar.filter(**filters, **source_page)
+        elif snapshot is not None:
+            rows = snapshot.filter(**filters)
+        elif paged or loader is None:
+            rows = _serialize(_repository.list_filtered(db.session, **filters, **source_page))
+        else:
+            rows = _serialize(loader())
+        if pending:
+            rows = _overlay_pending_stock(rows, pending, filters, **page)
+        with tracer.span('json.dumps', 'serialization', filas=len(rows)):
+            body = json.dumps(rows).encode('utf-8')
+        return query_cache.put(key, generation, body)
+
+    return read_flight.do(('list', generation, key), load)
+
+
+def _overlay_pending_stock(rows, pending, filters, sort=None, limit=None, after=None):
+    """
+    Aplica a un listado los cambios de stock pendientes ({id: en_stock}): corrige en_stock, quita
+    las filas que por su valor pendiente ya no cumplen el filtro de stock y añade las que ahora lo
+    cumplen, leídas de la base con los demás filtros, el orden y el cursor. Recorta a `limit`.
+    """
+    from models.db import db
+    rows = [dict(row, en_stock=pending[row['id']]) if pending.get(row['id'], row['en_stock']) != row['en_stock']
+            else row for row in rows]
+    en_stock = filters.get('en_stock')
+    if en_stock is None:
+        return rows
+    rows = [row for row in rows if row['en_stock'] == en_stock]
+    present = {row['id'] for row in rows}
+    candidates = [i for i, value in pending.items() if value == en_stock and i not in present]
+    if candidates:
+        others = {k: v for k, v in filters.items() if k != 'en_stock'}
+        added = _repository.list_filtered(db.session, ids=candidates, sort=sort, after=after, **others)
+        rows += [dict(row, en_stock=en_stock) for row in _serialize(added)]
+        sort = sort or 'id'
+        column = sort.lstrip('-')
+        rows.sort(key=lambda row: (row[column], row['id']), reverse=sort.startswith('-'))
+    return rows[:limit] if limit is not None else rows
+
+
+def _stats_with_pending_stock(stats):
+    """Ajusta los contadores de stock de las estadísticas con los cambios pendientes del buffer."""
+    from models.db import db
+    pending = stock_buffer.pending()
+    if not pending:
+        return stats
+    # El resultado puede ser compartido (single-flight): se ajusta una copia
+    stats = copy.deepcopy(stats)
+    for electrodomestico in _repository.list_filtered(db.session, ids=list(pending)):
+        en_stock = pending[electrodomestico.id]
+        if en_stock != electrodomestico.en_stock:
+            delta = 1 if en_stock else -1
+            stats['en_stock'] += delta
+            stats['por_tipo'][electrodomestico.tipo]['en_stock'] += delta
+    return stats
+
+
+def _with_pending_stock(electrodomestico):
+    """Superpone el stock pendiente en el buffer write-behind (sin modificar el dict compartido)."""
+    if electrodomestico is None:
+        return None
+    en_stock = stock_buffer.get(electrodomestico['id'])
+    if en_stock is None or en_stock == electrodomestico['en_stock']:
+        return electrodomestico
+    return dict(electrodomestico, en_stock=en_stock)
+
+
+def encode_cursor(sort, row):
+    """Cursor opaco de continuación: orden pedido, valor de la columna de orden e id de la última fila."""
+    sort = sort or 'id'
+    payload = [sort, row[sort.lstrip('-')], row['id']]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _cursor_value_valid(column, value):
+    # El cursor llega del cliente: el valor debe tener el tipo de la columna de orden antes de llegar al SQL
+    if column in ('marca', 'modelo'):
+        return isinstance(value, str)
+    if column == 'precio':
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_cursor(token, sort):
+    """Devuelve (valor, id) del cursor; ValueError si es inválido o se generó para otro orden."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError('Cursor inválido')
+    if cursor_sort != (sort or 'id'):
+        raise ValueError('El cursor no corresponde al orden solicitado')
+    if not _cursor_value_valid('id', last_id) or not _cursor_value_valid(cursor_sort.lstrip('-'), value):
+        raise ValueError('Cursor inválido')
+    return value, last_id
+
+
+# =========================
+# Invalidación de la caché al confirmar escrituras
+# =========================
+def _catalog_row(target):
+    return (target.id, target.marca, target.modelo, target.tipo, target.precio,
+            target.clase_energetica, target.en_stock, target.version)
+
+
+@event.listens_for(Electrodomestico, 'after_insert')
+@event.listens_for(Electrodomestico, 'after_update')
+def _record_catalog_upsert(mapper, connection, target):
+    Session.object_session(target).info.setdefault('cambios_catalogo', []).append(('guardado', _catalog_row(target)))
+
+
+@event.listens_for(Electrodomestico, 'after_delete')
+def _record_catalog_delete(mapper, connection, target):
+    Session.object_session(target).info.setdefault('cambios_catalogo', []).append(('eliminado', (target.id,)))
+
+
+def _apply_catalog_changes(changes):
+    # En un lote transaccional se aplaza hasta que la transacción se confirme
+    after_commit(_publish_catalog_changes, changes)
+
+
+def _publish_catalog_changes(changes):
+    # La invalidación es síncrona: la siguiente lectura del cliente no puede ver la caché anterior
+    generation = query_cache.invalidate()
+    columnar_catalog.apply(changes, generation)
+    if job_queue.enabled and catalog_snapshot.enabled:
+        # La compilación la hace el worker de trabajos; una ráfaga de escrituras encola un solo trabajo
+        job_queue.submit_unique('compilar_snapshot')
+    else:
+        catalog_snapshot.mark_changed()
+
+
+@task('compilar_snapshot')
+def _rebuild_catalog_snapshot():
+    catalog_snapshot.rebuild(ElectrodomesticosService.build_catalog_snapshot)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_query_cache(session):
+    changes = session.info.pop('cambios_catalogo', None)
+    if changes:
+        _apply_catalog_changes(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session):
+    session.info.pop('cambios_catalogo', None)
+
+
+# =========================
+# Histórico de precios en la transacción de la escritura
+# =========================
+@event.listens_for(Electrodomestico, 'after_insert')
+def _record_initial_price(mapper, connection, target):
+    PreciosRepository.record([(target.id, target.precio)], connection)
+
+
+@event.listens_for(Electrodomestico, 'after_update')
+def _record_price_change(mapper, connection, target):
+    if inspect(target).attrs.precio.history.has_changes():
+        PreciosRepository.record([(target.id, target.precio)], connection)
+
+@traced_class('service')
 class ElectrodomesticosService:
     
     @staticmethod
     def create_electrodomestico(electrodomestico_data):
         from models.db import db
         logger.info(f'Creando electrodoméstico en servicio: {electrodomestico_data.get("marca")} {electrodomestico_data.get("modelo")}')
-        electrodomestico = ElectrodomesticosRepository.create(electrodomestico_data, db.session)
+
+        def write():
+            electrodomestico = _repository.create(electrodomestico_data, db.session)
+            # Cargado y fuera de la sesión: con group commit los commits de las demás escrituras del
+            # grupo lo expirarían y la sesión se cierra al confirmar el grupo
+            db.session.refresh(electrodomestico)
+            db.session.expunge(electrodomestico)
+            return electrodomestico
+
+        electrodomestico = group_commit.run(write)
         logger.info(f'Electrodoméstico creado en servicio: {electrodomestico.modelo} (ID: {electrodomestico.id})')
         return electrodomestico
 
 
     @staticmethod
     def get_electrodomestico_by_id(electrodomestico_id):
+        """Devuelve el electrodoméstico serializado (dict) o None. Las lecturas concurrentes se coalescen."""
         from models.db import db
         logger.info(f'Obteniendo electrodoméstico por ID en servicio: {electrodomestico_id}')
-        electrodomestico = ElectrodomesticosRepository.get_by_id(electrodomestico_id, db.session)
+
+        generation = query_cache.generation()
+        snapshot = catalog_snapshot.current(generation)
+
+        def load():
+            electrodomestico = _repository.get_by_id(electrodomestico_id, db.session)
+            return electrodomestico.to_dict() if electrodomestico else None
+
+        if in_transaction():
+            electrodomestico = load()
+        else:
+            electrodomestico = snapshot.get_by_id(electrodomestico_id) if snapshot else read_flight.do(('id', generation, electrodomestico_id), load)
+        electrodomestico = _with_pending_stock(electrodomestico)
         if electrodomestico:
-            logger.info(f'Electrodoméstico obtenido en servicio: {electrodomestico.modelo}')
+            logger.info(f'Electrodoméstico obtenido en servicio: {electrodomestico["modelo"]}')
         else:
             logger.warning(f'Electrodoméstico no encontrado en servicio con ID: {electrodomestico_id}')
         return electrodomestico
@@ -30,39 +288,251 @@ class ElectrodomesticosService:
     def get_electrodomestico_by_modelo(modelo):
         from models.db import db
         logger.info(f'Obteniendo electrodoméstico por modelo en servicio: {modelo}')
-        electrodomestico = ElectrodomesticosRepository.get_by_modelo(modelo, db.session)
+
+        generation = query_cache.generation()
+        snapshot = catalog_snapshot.current(generation)
+
+        def load():
+            electrodomestico = _repository.get_by_modelo(modelo, db.session)
+            return electrodomestico.to_dict() if electrodomestico else None
+
+        if in_transaction():
+            electrodomestico = load()
+        else:
+            electrodomestico = snapshot.get_by_modelo(modelo) if snapshot else read_flight.do(('modelo', generation, modelo), load)
+        electrodomestico = _with_pending_stock(electrodomestico)
         if electrodomestico:
-            logger.info(f'Electrodoméstico obtenido en servicio: {electrodomestico.modelo}')
+            logger.info(f'Electrodoméstico obtenido en servicio: {electrodomestico["modelo"]}')
         else:
             logger.warning(f'Electrodoméstico no encontrado en servicio con modelo: {modelo}')
         return electrodomestico
 
     @staticmethod
-    def get_all_electrodomesticos():
+    def get_all_electrodomesticos(sort=None, limit=None, after=None):
         from models.db import db
         logger.info('Obteniendo todos los electrodomésticos en servicio')
-        electrodomesticos = ElectrodomesticosRepository.get_all(db.session)
-        logger.info(f'{len(electrodomesticos)} electrodomésticos obtenidos en servicio')
+        electrodomesticos = _cached_list('all', lambda: _repository.get_all(db.session),
+                                         sort=sort, limit=limit, after=after)
+        logger.info(f'Electrodomésticos obtenidos en servicio ({len(electrodomesticos)} bytes)')
         return electrodomesticos
 
     @staticmethod
-    def update_electrodomestico(electrodomestico_id, update_data):
+    def get_electrodomesticos_by_tipo(tipo, en_stock=None, sort=None, limit=None, after=None):
+        from models.db import db
+        logger.info(f'Obteniendo electrodomésticos por tipo en servicio: {tipo}')
+        # El filtro de stock adicional solo lo resuelve list_filtered
+        loader = (lambda: _repository.get_by_tipo(tipo, db.session)) if en_stock is None else None
+        electrodomesticos = _cached_list('tipo', loader,
+                                         tipo=tipo, en_stock=en_stock, sort=sort, limit=limit, after=after)
+        logger.info(f'Electrodomésticos del tipo "{tipo}" obtenidos en servicio ({len(electrodomesticos)} bytes)')
+        return electrodomesticos
+
+    @staticmethod
+    def get_electrodomesticos_by_marca(marca, en_stock=None, sort=None, limit=None, after=None):
+        from models.db import db
+        logger.info(f'Obteniendo electrodomésticos por marca en servicio: {marca}')
+        # El filtro de stock adicional solo lo resuelve list_filtered
+        loader = (lambda: _repository.get_by_marca(marca, db.session)) if en_stock is None else None
+        electrodomesticos = _cached_list('marca', loader,
+                                         marca=marca, en_stock=en_stock, sort=sort, limit=limit, after=after)
+        logger.info(f'Electrodomésticos de la marca "{marca}" obtenidos en servicio ({len(electrodomesticos)} bytes)')
+        return electrodomesticos
+
+    @staticmethod
+    def get_electrodomesticos_in_stock(sort=None, limit=None, after=None):
+        from models.db import db
+        logger.info('Obteniendo electrodomésticos en stock en servicio')
+        electrodomesticos = _cached_list('en_stock', lambda: _repository.get_in_stock(db.session),
+                                         en_stock=True, sort=sort, limit=limit, after=after)
+        logger.info(f'Electrodomésticos en stock obtenidos en servicio ({len(electrodomesticos)} bytes)')
+        return electrodomesticos
+
+    @staticmethod
+    def get_electrodomesticos_by_price_range(min_price, max_price, sort=None, limit=None, after=None):
+        from models.db import db
+        logger.info(f'Obteniendo electrodomésticos por rango de precio en servicio: {min_price} - {max_price}')
+        electrodomesticos = _cached_list(
+            'precio',
+            lambda: _repository.get_by_price_range(min_price, max_price, db.session),
+            min_price=min_price,
+            max_price=max_price,
+            sort=sort,
+            limit=limit,
+            after=after,
+        )
+        logger.info(f'Electrodomésticos obtenidos en el rango de precio en servicio ({len(electrodomesticos)} bytes)')
+        return electrodomesticos
+
+    @staticmethod
+    def next_cursor(body, sort, limit):
+        """
+        Cursor para pedir la página siguiente de un listado limitado, o None si no hay más filas.
+        
+        Args:
+            body (bytes): JSON devuelto por uno de los listados
+            sort (str): Orden de la consulta
+            limit (int): Límite de la consulta
+            
+        Returns:
+            str: Cursor opaco para el parámetro `after`
+        """
+        if limit is None:
+            return None
+        rows = json.loads(body)
+        if len(rows) < limit or not rows:
+            return None
+        return encode_cursor(sort, rows[-1])
+
+    @staticmethod
+    def get_stats():
+        from models.db import db
+        logger.info('Obteniendo estadísticas de electrodomésticos en servicio')
+        if in_transaction():
+            return _repository.get_stats(db.session)
+        generation = query_cache.generation()
+        snapshot = catalog_snapshot.current(generation)
+        if snapshot:
+            return _stats_with_pending_stock(snapshot.stats())
+        return _stats_with_pending_stock(read_flight.do(('stats', generation), lambda: _repository.get_stats(db.session)))
+
+    @staticmethod
+    def build_catalog_snapshot(path):
+        """Compila la tabla en el snapshot binario; devuelve (generación, filas)."""
+        from models.db import db
+        generation = query_cache.generation()
+        try:
+            count = compile_snapshot(_repository.iter_snapshot_rows(db.session), generation, path)
+        finally:
+            db.session.remove()
+        return generation, count
+
+    @staticmethod
+    def build_columnar_catalog():
+        """Carga la tabla en el catálogo columnar en memoria."""
+        from models.db import db
+        generation = query_cache.generation()
+        try:
+            return ColumnarCatalog.from_rows(_repository.iter_snapshot_rows(db.session), generation)
+        finally:
+            db.session.remove()
+
+    @staticmethod
+    def warm_catalog(max_bytes, top):
+        """
+        Carga en la caché de listados, ya serializados, los electrodomésticos en stock y los
+        listados de los `top` tipos y marcas con más filas (y el catálogo columnar si está
+        activo) sin pasar de `max_bytes`. Devuelve un resumen de lo cargado.
+        """
+        from models.db import db
+        used = 0
+        if columnar_catalog.enabled:
+            columnar_catalog.catalog = ElectrodomesticosService.build_columnar_catalog()
+            used += columnar_catalog.catalog.memory_bytes()
+        try:
+            tipos = [tipo for tipo, _ in _repository.get_top_values('tipo', top, db.session)]
+            marcas = [marca for marca, _ in _repository.get_top_values('marca', top, db.session)]
+        finally:
+            db.session.remove()
+
+        listings = [('en_stock', {'en_stock': True}, ElectrodomesticosService.get_electrodomesticos_in_stock)]
+        for tipo, marca in itertools.zip_longest(tipos, marcas):
+            if tipo is not None:
+                listings.append(('tipo', {'tipo': tipo},
+                                 lambda tipo=tipo: ElectrodomesticosService.get_electrodomesticos_by_tipo(tipo)))
+            if marca is not None:
+                listings.append(('marca', {'marca': marca},
+                                 lambda marca=marca: ElectrodomesticosService.get_electrodomesticos_by_marca(marca)))
+
+        loaded = []
+        try:
+            for name, filters, load in listings:
+                body = load()
+                if used + len(body) > max_bytes:
+                    # Fuera del presupuesto no se queda en memoria; los siguientes pueden caber
+                    query_cache.evict(query_cache.normalize(name, **filters))
+                    logger.warning(f'Listado {name} {filters} fuera del presupuesto de calentamiento ({len(body)} bytes)')
+                    continue
+                used += len(body)
+                loaded.append(query_cache.normalize(name, **filters))
+        finally:
+            db.session.remove()
+        return {'listados': len(loaded), 'bytes': used, 'claves': loaded}
+
+    @staticmethod
+    def update_electrodomestico(electrodomestico_id, update_data, expected_version=None):
+        """
+        Actualiza con una sola sentencia condicionada a `expected_version` (If-Match).
+        Devuelve el dict de la fila actualizada o None si no existe; VersionConflict si la versión no coincide.
+        Las sentencias directas no pasan por los eventos del ORM, así que la caché, el catálogo
+        columnar y el stream SSE se actualizan aquí tras confirmar.
+        """
         from models.db import db
         logger.info(f'Actualizando electrodoméstico en servicio: ID {electrodomestico_id}')
-        electrodomestico = ElectrodomesticosRepository.update(electrodomestico_id, update_data, db.session)
-        if electrodomestico:
-            logger.info(f'Electrodoméstico actualizado en servicio: {electrodomestico.modelo} (ID: {electrodomestico.id})')
-        else:
+
+        def write():
+            if 'en_stock' in update_data:
+                # La escritura directa sustituye a los cambios de stock aún sin volcar; dentro de un lote
+                # transaccional solo si se confirma (si se deshace, los cambios pendientes siguen valiendo)
+                after_commit(stock_buffer.discard, electrodomestico_id)
+            row = _repository.update(electrodomestico_id, update_data, db.session, expected_version)
+            if row is not None:
+                _apply_catalog_changes([('guardado', _catalog_row(row))])
+                queue_events([electrodomestico_event('actualizado', row)])
+            return row
+
+        row = group_commit.run(write)
+        if row is None:
             logger.warning(f'No se pudo actualizar el electrodoméstico en servicio con ID: {electrodomestico_id}')
-        return electrodomestico
+            return None
+        logger.info(f'Electrodoméstico actualizado en servicio: {row.modelo} (ID: {row.id})')
+        return dict(row._mapping)
 
     @staticmethod
-    def delete_electrodomestico(electrodomestico_id):
+    def delete_electrodomestico(electrodomestico_id, expected_version=None):
+        """Elimina con una sola sentencia condicionada a `expected_version`; True si se eliminó, False si no existe."""
         from models.db import db
         logger.info(f'Eliminando electrodoméstico en servicio: ID {electrodomestico_id}')
-        result = ElectrodomesticosRepository.delete(electrodomestico_id, db.session)
-        if result:
-            logger.info(f'Electrodoméstico eliminado en servicio: ID {electrodomestico_id}')
-        else:
+
+        def write():
+            after_commit(stock_buffer.discard, electrodomestico_id)
+            row = _repository.delete(electrodomestico_id, db.session, expected_version)
+            if row is not None:
+                _apply_catalog_changes([('eliminado', (row.id,))])
+                queue_events([electrodomestico_event('eliminado', row)])
+            return row
+
+        row = group_commit.run(write)
+        if row is None:
             logger.warning(f'No se pudo eliminar el electrodoméstico en servicio con ID: {electrodomestico_id}')
-        return result
\ No newline at end of file
+            return False
+        logger.info(f'Electrodoméstico eliminado en servicio: ID {electrodomestico_id}')
+        return True
+
+    @staticmethod
+    def set_stock(electrodomestico_id, en_stock):
+        """
+        Cambia el stock. Con el buffer write-behind activo (STOCK_WRITE_BEHIND=1) solo se anota en
+        el journal y se escribe en el siguiente volcado; si no, se actualiza al momento.
+        Devuelve (dict con id, en_stock y pendiente, o None si no existe).
+        """
+        logger.info(f'Cambiando stock en servicio: ID {electrodomestico_id} -> {en_stock}')
+        # El journal no participa en la transacción de un lote: ahí se escribe al momento
+        if not stock_buffer.enabled or in_transaction():
+            row = ElectrodomesticosService.update_electrodomestico(electrodomestico_id, {'en_stock': en_stock})
+            if row is None:
+                return None
+            return {'id': row['id'], 'en_stock': row['en_stock'], 'pendiente': False}
+        if ElectrodomesticosService.get_electrodomestico_by_id(electrodomestico_id) is None:
+            return None
+        stock_buffer.set(electrodomestico_id, en_stock)
+        return {'id': electrodomestico_id, 'en_stock': en_stock, 'pendiente': True}
+
+    @staticmethod
+    def apply_stock_changes(changes):
+        """Vuelca un lote del buffer de stock ({id: en_stock}) y publica los cambios como una escritura más."""
+        from models.db import db
+        rows = _repository.update_stock_batch(changes, db.session)
+        if rows:
+            _apply_catalog_changes([('guardado', _catalog_row(row)) for row in rows])
+            queue_events([electrodomestico_event('actualizado', row) for row in rows])
+        return len(rows)
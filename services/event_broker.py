@@ -0,0 +1,230 @@
+"""
+Broker de eventos para el stream SSE de electrodomésticos.
+Los eventos se escriben en un archivo SQLite compartido por todos los workers de gunicorn;
+cada worker tiene un único hilo que lee los eventos nuevos y los reparte en memoria
+a sus suscriptores, así miles de conexiones inactivas no generan consultas adicionales.
+Con SSE_SERVER=1 los streams los sirve un proceso aparte con un bucle asyncio
+(services/sse_server.py): una corrutina por conexión en lugar de un hilo, así caben miles de
+streams inactivos. La ruta del stream de la app sigue disponible (desarrollo, un solo puerto);
+ahí cada stream ocupa un hilo del worker gthread y `max_subscribers` limita los streams por
+worker para que siempre queden hilos para el resto de la API.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.electrodomesticos import Electrodomestico
+from services.batch_service import after_commit
+from services.local_sqlite import LocalSQLite
+from services.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+
+EVENTS_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS events ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, payload TEXT NOT NULL);'
+)
+
+
+class BrokerFull(Exception):
+    """El worker ya tiene abiertos `max_subscribers` streams."""
+
+
+class Subscription:
+    """Suscripción de un cliente SSE con sus filtros opcionales (id, tipo, marca)."""
+
+    __slots__ = ('filters', 'queue')
+
+    def __init__(self, filters, max_pending=100):
+        self.filters = {k: v for k, v in filters.items() if v is not None}
+        self.queue = queue.Queue(maxsize=max_pending)
+
+    def matches(self, event):
+        return all(event.get(k) == v for k, v in self.filters.items())
+
+
+class EventBroker:
+    def __init__(self, path, poll_interval=0.5, retention_seconds=3600, max_subscribers=0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._db = LocalSQLite(path, EVENTS_SCHEMA)
+        self._poller = None
+        self._poller_pid = None
+        self._last_id = None
+
+    def _connection(self):
+        return self._db.connection()
+
+    def publish(self, event):
+        """Persiste un evento para que todos los workers lo repartan a sus suscriptores."""
+        try:
+            self._connection().execute(
+                'INSERT INTO events (created_at, payload) VALUES (?, ?)',
+                (time.time(), json.dumps(event)),
+            )
+        except sqlite3.Error as e:
+            # Un fallo del stream nunca debe afectar la escritura ya confirmada en la base de datos
+            logger.error(f'No se pudo publicar el evento {event.get("evento")}: {str(e)}')
+
+    def subscribe(self, filters):
+        """Registra un suscriptor; lanza BrokerFull si el worker ya tiene `max_subscribers` (0 = sin límite)."""
+        self._ensure_poller()
+        subscription = Subscription(filters)
+        with self._lock:
+            if self.max_subscribers and len(self._subscribers) >= self.max_subscribers:
+                raise BrokerFull()
+            self._subscribers.add(subscription)
+        logger.info(f'Nueva suscripción SSE con filtros {subscription.filters} ({len(self._subscribers)} activas)')
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        logger.info(f'Suscripción SSE cerrada ({len(self._subscribers)} activas)')
+
+    def events_after(self, last_event_id):
+        """Eventos (id, evento) posteriores a `last_event_id`, en orden."""
+        rows = self._connection().execute(
+            'SELECT id, payload FROM events WHERE id > ? ORDER BY id', (last_event_id,)
+        ).fetchall()
+        return [(event_id, json.loads(payload)) for event_id, payload in rows]
+
+    def latest_id(self):
+        return self._connection().execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+
+    def replay(self, subscription, last_event_id):
+        """Devuelve los eventos posteriores a Last-Event-ID que coinciden con la suscripción."""
+        return [(event_id, event) for event_id, event in self.events_after(last_event_id)
+                if subscription.matches(event)]
+
+    def _ensure_poller(self):
+        # El hilo se arranca en el primer suscriptor de cada worker (después del fork de gunicorn)
+        with self._lock:
+            if self._poller is not None and self._poller.is_alive() and self._poller_pid == os.getpid():
+                return
+            self._last_id = self.latest_id()
+            self._poller_pid = os.getpid()
+            self._poller = threading.Thread(target=self._poll_loop, name='sse-event-poller', daemon=True)
+            self._poller.start()
+
+    def _poll_loop(self):
+        last_prune = time.time()
+        while True:
+            try:
+                for event_id, event in self.events_after(self._last_id):
+                    self._dispatch(event_id, event)
+                    self._last_id = event_id
+                # Con la cola de trabajos la purga la hace su worker, no cada worker web
+                if not job_queue.enabled and time.time() - last_prune > 60:
+                    self.prune()
+                    last_prune = time.time()
+            except sqlite3.Error as e:
+                logger.error(f'Error leyendo eventos del broker: {str(e)}')
+            time.sleep(self.poll_interval)
+
+    def prune(self):
+        """Borra los eventos más antiguos que `retention_seconds` (ya no se pueden reenviar)."""
+        try:
+            self._connection().execute(
+                'DELETE FROM events WHERE created_at < ?', (time.time() - self.retention_seconds,)
+            )
+        except sqlite3.Error as e:
+            logger.error(f'No se pudieron purgar los eventos antiguos: {str(e)}')
+
+    def _dispatch(self, event_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait((event_id, event))
+            except queue.Full:
+                # Cliente demasiado lento: se descarta el evento en lugar de bloquear al resto
+                logger.warning(f'Cola SSE llena, evento {event_id} descartado para un suscriptor')
+
+
+event_broker = EventBroker(
+    os.getenv('EVENTS_DB_PATH', 'events.db'),
+    poll_interval=float(os.getenv('EVENTS_POLL_INTERVAL', '0.5')),
+    # gunicorn.conf.py lo deriva de los hilos por worker si no se define
+    max_subscribers=int(os.getenv('SSE_MAX_STREAMS', '0')),
+)
+
+
+def electrodomestico_event(evento, electrodomestico):
+    """
+    Construye el evento publicado para un electrodoméstico creado, actualizado o eliminado
+    (una instancia del modelo o una fila devuelta por RETURNING).
+    """
+    return {
+        'evento': evento,
+        'id': electrodomestico.id,
+        'marca': electrodomestico.marca,
+        'modelo': electrodomestico.modelo,
+        'tipo': electrodomestico.tipo,
+        'precio': electrodomestico.precio,
+        'en_stock': electrodomestico.en_stock,
+    }
+
+
+# =========================
+# Publicación al confirmar la transacción
+# =========================
+@event.listens_for(Electrodomestico, 'after_insert')
+def _queue_insert_event(mapper, connection, target):
+    Session.object_session(target).info.setdefault('sse_events', []).append(
+        electrodomestico_event('creado', target)
+    )
+
+
+@event.listens_for(Electrodomestico, 'after_update')
+def _queue_update_event(mapper, connection, target):
+    Session.object_session(target).info.setdefault('sse_events', []).append(
+        electrodomestico_event('actualizado', target)
+    )
+
+
+@event.listens_for(Electrodomestico, 'after_delete')
+def _queue_delete_event(mapper, connection, target):
+    Session.object_session(target).info.setdefault('sse_events', []).append(
+        electrodomestico_event('eliminado', target)
+    )
+
+
+def publish_events(events):
+    for pending in events:
+        event_broker.publish(pending)
+
+
+def queue_events(events):
+    """
+    Publica eventos de una escritura ya confirmada (en un lote transaccional, cuando este se confirme).
+    Se insertan directamente y no a través de la cola de trabajos: encolarlos costaría el mismo
+    INSERT local; el reparto a los suscriptores ya lo hacen los hilos lectores de cada worker.
+    """
+    after_commit(publish_events, events)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending_events(session):
+    pending = session.info.pop('sse_events', None)
+    if pending:
+        queue_events(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_events(session):
+    session.info.pop('sse_events', None)
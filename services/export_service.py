@@ -0,0 +1,180 @@
+"""
+Exportación masiva de tablas para consumidores analíticos.
+Las filas se leen por lotes con un cursor del lado del servidor (`yield_per`: SSCursor en MySQL,
+cursor incremental en SQLite), cada lote se transpone a columnas y se codifica de una vez como
+CSV, como un RecordBatch de Arrow IPC o como un row group de Parquet (estos dos solo si pyarrow
+está instalado). Cada lote codificado se entrega como un bloque de bytes, así la memoria no
+crece con el tamaño de la tabla. De `users` solo se exportan id y username. Con sharding, los
+electrodomésticos se leen de todos los shards a la vez y se mezclan por id.
+"""
+
+import csv
+import heapq
+import io
+import itertools
+import time
+import logging
+
+from sqlalchemy import Boolean, Float, Integer, select
+
+from models.electrodomesticos import Electrodomestico
+from models.user import User
+from services.sharding import shard_router
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - depende del entorno
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TABLES = {
+    'electrodomesticos': [c for c in Electrodomestico.__table__.c],
+    'users': [User.__table__.c.id, User.__table__.c.username],
+}
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def available_formats():
+    return [name for name in FORMATS if name == 'csv' or pyarrow is not None]
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column.type, Integer):
+        return pyarrow.int64()
+    if isinstance(column.type, Float):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escritura de pyarrow que acumula los bytes hasta que el exportador los recoge."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _CsvEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+        self.booleans = [isinstance(c.type, Boolean) for c in columns]
+
+    def header(self):
+        return self._encode([[c.name for c in self.columns]])
+
+    def batch(self, column_values):
+        # Transformaciones por columna (booleanos como true/false) y una sola escritura del lote
+        column_values = [
+            [None if v is None else ('true' if v else 'false') for v in values] if boolean else values
+            for values, boolean in zip(column_values, self.booleans)
+        ]
+        return self._encode(zip(*column_values))
+
+    def close(self):
+        return b''
+
+    @staticmethod
+    def _encode(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+
+class _ArrowEncoder:
+    def __init__(self, columns, fmt):
+        self.schema = pyarrow.schema([pyarrow.field(c.name, _arrow_type(c), nullable=c.nullable) for c in columns])
+        self.sink = _ChunkSink()
+        if fmt == 'parquet':
+            self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression='snappy')
+        else:
+            self.writer = pyarrow.ipc.new_stream(self.sink, self.schema)
+
+    def header(self):
+        return self.sink.drain()
+
+    def batch(self, column_values):
+        arrays = [pyarrow.array(values, type=field.type) for values, field in zip(column_values, self.schema)]
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def close(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+def _encoder(columns, fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f'Formato no soportado: {fmt}')
+    if fmt == 'csv':
+        return _CsvEncoder(columns)
+    if pyarrow is None:
+        raise ValueError(f'El formato {fmt} requiere pyarrow')
+    return _ArrowEncoder(columns, fmt)
+
+
+def _sharded_partitions(query, batch_size):
+    """Con sharding: recorre todos los shards a la vez y mezcla sus filas por la primera columna (id)."""
+    def rows(shard):
+        with shard_router.session(shard) as session:
+            yield from session.execute(query)
+
+    merged = heapq.merge(*(rows(shard) for shard in shard_router.shards), key=lambda row: row[0])
+    while True:
+        partition = list(itertools.islice(merged, batch_size))
+        if not partition:
+            return
+        yield partition
+
+
+def export_table(session, table, fmt='csv', batch_size=10000):
+    """
+    Genera la exportación de `table` en `fmt` como bloques de bytes, uno por lote de `batch_size` filas.
+    Lanza ValueError si la tabla o el formato no están disponibles (antes de consultar).
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f'Tabla no exportable: {table}')
+    columns = EXPORT_TABLES[table]
+    encoder = _encoder(columns, fmt)
+    query = select(*columns).order_by(columns[0]).execution_options(yield_per=batch_size)
+
+    def generate():
+        start = time.perf_counter()
+        rows = 0
+        yield encoder.header()
+        if shard_router.enabled and table == 'electrodomesticos':
+            partitions = _sharded_partitions(query, batch_size)
+        else:
+            partitions = session.execute(query).partitions()
+        for partition in partitions:
+            rows += len(partition)
+            yield encoder.batch([list(values) for values in zip(*partition)])
+        yield encoder.close()
+        logger.info(f'Exportadas {rows} filas de {table} en {fmt} en {time.perf_counter() - start:.2f} s')
+
+    return generate()
@@ -0,0 +1,114 @@
+"""
+Group commit de las escrituras de electrodomésticos en el perfil SQLite (un escritor por worker).
+Sin él, los hilos de un worker que escriben a la vez esperan uno tras otro en el pool del escritor
+y cada uno hace su propio BEGIN IMMEDIATE ... COMMIT. Con él, el primer hilo que llega (líder)
+ejecuta las escrituras en cola (hasta GROUP_COMMIT_MAX_WRITES) dentro de una sola transacción
+de `BatchService.transaction`, cada una en su SAVEPOINT, y confirma una vez: una escritura que
+falla solo deshace su SAVEPOINT y sus efectos aplazados. La invalidación de la caché, el catálogo
+columnar y los eventos SSE se aplican una vez por grupo tras confirmar. Si quedan escrituras en
+cola, el líder cede el turno al primer hilo en espera, que forma el grupo siguiente.
+GROUP_COMMIT=0 lo desactiva; con MySQL (que ya agrupa los commits en InnoDB) o con sharding no se usa.
+"""
+
+import os
+import threading
+from collections import deque
+import logging
+
+from services import sqlite_profile
+from services.batch_service import BatchService, discard_effects_on_error, in_transaction
+from services.sharding import shard_router
+from services.shared_paths import database_url
+
+logger = logging.getLogger(__name__)
+
+
+class _Write:
+    __slots__ = ('fn', 'wake', 'lead', 'result', 'error')
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.wake = threading.Event()
+        self.lead = False
+        self.result = None
+        self.error = None
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class GroupCommit:
+    def __init__(self, enabled=False, max_writes=64):
+        self.enabled = enabled
+        self.max_writes = max_writes
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._leading = False
+
+    def run(self, fn):
+        """
+        Ejecuta `fn()` (una escritura con `db.session` que confirma con commit) en el siguiente
+        grupo y devuelve su resultado o relanza su excepción. Dentro de un lote transaccional, o
+        desactivado, la ejecuta directamente.
+        """
+        if not self.enabled or in_transaction():
+            return fn()
+        write = _Write(fn)
+        with self._lock:
+            self._queue.append(write)
+            lead = not self._leading
+            self._leading = True
+        if not lead:
+            write.wake.wait()
+            if not write.lead:
+                return write.outcome()
+        self._lead()
+        return write.outcome()
+
+    def _lead(self):
+        # El líder siempre está al principio de la cola: entra en su propio grupo
+        with self._lock:
+            group = [self._queue.popleft() for _ in range(min(self.max_writes, len(self._queue)))]
+        try:
+            self._commit(group)
+        finally:
+            with self._lock:
+                if self._queue:
+                    successor = self._queue[0]
+                    successor.lead = True
+                    successor.wake.set()
+                else:
+                    self._leading = False
+            for write in group:
+                write.wake.set()
+
+    @staticmethod
+    def _commit(group):
+        from models.db import db
+        try:
+            with BatchService.transaction():
+                for write in group:
+                    try:
+                        with discard_effects_on_error():
+                            write.result = write.fn()
+                    except Exception as e:
+                        # Solo se deshace el SAVEPOINT de esta escritura; las demás del grupo siguen
+                        db.session.rollback()
+                        write.error = e
+        except Exception as e:
+            logger.error(f'No se pudo confirmar un grupo de {len(group)} escrituras: {str(e)}')
+            for write in group:
+                if write.error is None:
+                    write.result, write.error = None, e
+            return
+        if len(group) > 1:
+            logger.info(f'Group commit: {len(group)} escrituras confirmadas en una transacción')
+
+
+group_commit = GroupCommit(
+    enabled=(os.getenv('GROUP_COMMIT', '1') == '1' and sqlite_profile.applies_to(database_url())
+             and not shard_router.enabled),
+    max_writes=int(os.getenv('GROUP_COMMIT_MAX_WRITES', '64')),
+)
@@ -0,0 +1,161 @@
+"""
+Comprobaciones de readiness del worker.
+La conectividad con la base de datos se comprueba con un engine propio sin pool (así la sonda no
+compite con las peticiones por las conexiones ni se queda esperando a un pool lleno) y el resultado
+se cachea unos segundos: como mucho una sonda en curso por worker, el resto de llamadas devuelven
+el último resultado. Además informa de la saturación del pool, las peticiones en curso y la cola
+de trabajos, y del modo drenaje, un archivo compartido por todos los workers que hace fallar la
+readiness antes de un apagado ordenado. Mientras el catálogo se calienta (services/warmup.py)
+el worker tampoco está listo.
+"""
+
+import os
+import threading
+import time
+import logging
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from services.shared_paths import shared_path
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessProbe:
+    def __init__(self, drain_path, db_cache_seconds=2.0, db_timeout_seconds=2.0, max_pool_saturation=1.0,
+                 max_job_queue=0):
+        self.drain_path = drain_path
+        self.db_cache_seconds = db_cache_seconds
+        self.db_timeout_seconds = db_timeout_seconds
+        self.max_pool_saturation = max_pool_saturation
+        self.max_job_queue = max_job_queue
+        self._probe_engine = None
+        self._probe_lock = threading.Lock()
+        self._db_result = None
+        self._job_depth = (None, 0.0)
+
+    # =========================
+    # Base de datos
+    # =========================
+    def _engine_for(self, engine):
+        if self._probe_engine is None:
+            timeout = max(1, int(self.db_timeout_seconds))
+            connect_args = {}
+            if engine.dialect.name == 'mysql':
+                connect_args = {'connect_timeout': timeout, 'read_timeout': timeout}
+            elif engine.dialect.name == 'sqlite':
+                connect_args = {'timeout': self.db_timeout_seconds}
+            self._probe_engine = create_engine(engine.url, poolclass=NullPool, connect_args=connect_args)
+        return self._probe_engine
+
+    def check_database(self, engine):
+        """Resultado de la última sonda; solo sondea si caducó y no hay otra sonda en curso."""
+        result = self._db_result
+        if result is not None and time.monotonic() - result['_at'] < self.db_cache_seconds:
+            return {**result, 'cached': True}
+        # Sin resultado previo se espera a la sonda; con resultado se devuelve el anterior si otra está en curso
+        if not self._probe_lock.acquire(blocking=result is None):
+            return {**result, 'cached': True}
+        try:
+            start = time.perf_counter()
+            try:
+                with self._engine_for(engine).connect() as conn:
+                    conn.execute(text('SELECT 1'))
+                result = {'ok': True, 'error': None}
+            except Exception as e:
+                logger.error(f'Sonda de base de datos fallida: {str(e)}')
+                result = {'ok': False, 'error': type(e).__name__}
+            result.update(latency_ms=round((time.perf_counter() - start) * 1000, 2), checked_at=time.time(),
+                          _at=time.monotonic())
+            self._db_result = result
+            return {**result, 'cached': False}
+        finally:
+            self._probe_lock.release()
+
+    @staticmethod
+    def pool_status(engine):
+        pool = engine.pool
+        if not all(hasattr(pool, attr) for attr in ('size', 'checkedout', 'overflow')):
+            return {'class': type(pool).__name__}
+        size = pool.size()
+        max_overflow = getattr(pool, '_max_overflow', 0)
+        capacity = size + max_overflow if max_overflow >= 0 else None
+        checked_out = pool.checkedout()
+        return {
+            'class': type(pool).__name__,
+            'size': size,
+            'checked_out': checked_out,
+            'overflow': pool.overflow(),
+            'capacity': capacity,
+            'saturation': round(checked_out / capacity, 3) if capacity else None,
+        }
+
+    # =========================
+    # Drenaje
+    # =========================
+    def draining(self):
+        return os.path.exists(self.drain_path)
+
+    def start_drain(self):
+        os.makedirs(os.path.dirname(self.drain_path) or '.', exist_ok=True)
+        with open(self.drain_path, 'w') as f:
+            f.write(str(time.time()))
+        logger.warning('Modo drenaje activado: la readiness falla hasta que se desactive')
+
+    def stop_drain(self):
+        try:
+            os.remove(self.drain_path)
+            logger.info('Modo drenaje desactivado')
+        except FileNotFoundError:
+            pass
+
+    # =========================
+    # Readiness
+    # =========================
+    def job_queue_depth(self, job_queue):
+        """Trabajos encolados (cacheado como la sonda de base de datos), o None sin cola en segundo plano."""
+        if not job_queue.enabled:
+            return None
+        depth, at = self._job_depth
+        if depth is None or time.monotonic() - at >= self.db_cache_seconds:
+            depth = job_queue.stats()['queued']
+            self._job_depth = (depth, time.monotonic())
+        return depth
+
+    def readiness(self, engine, inflight=None, job_queue_depth=None, warmup=None):
+        """Devuelve (listo, detalle) combinando drenaje, calentamiento, base de datos, pool y colas."""
+        database = self.check_database(engine)
+        database.pop('_at', None)
+        pool = self.pool_status(engine)
+        reasons = []
+        if self.draining():
+            reasons.append('draining')
+        if warmup is not None and not warmup['ready']:
+            reasons.append('warmup')
+        if not database['ok']:
+            reasons.append('database')
+        if pool.get('saturation') is not None and pool['saturation'] >= self.max_pool_saturation:
+            reasons.append('pool_saturated')
+        if self.max_job_queue and job_queue_depth is not None and job_queue_depth > self.max_job_queue:
+            reasons.append('job_queue')
+        detail = {
+            'status': 'ready' if not reasons else 'not_ready',
+            'reasons': reasons,
+            'pid': os.getpid(),
+            'draining': 'draining' in reasons,
+            'database': database,
+            'pool': pool,
+            'inflight_requests': inflight,
+            'job_queue_depth': job_queue_depth,
+            'warmup': warmup,
+        }
+        return not reasons, detail
+
+
+readiness_probe = ReadinessProbe(
+    os.getenv('HEALTH_DRAIN_PATH', shared_path('drain')),
+    db_cache_seconds=float(os.getenv('HEALTH_DB_CACHE_SECONDS', '2')),
+    db_timeout_seconds=float(os.getenv('HEALTH_DB_TIMEOUT_SECONDS', '2')),
+    max_pool_saturation=float(os.getenv('HEALTH_MAX_POOL_SATURATION', '1.0')),
+    max_job_queue=int(os.getenv('HEALTH_MAX_JOB_QUEUE', '0')),
+)
@@ -0,0 +1,116 @@
+"""
+Almacén de claves de idempotencia.
+Guarda clave → respuesta en un archivo SQLite compartido entre workers, con TTL y tamaño máximo,
+para que los reintentos de un POST repitan la respuesta original sin volver a tocar las tablas
+de negocio.
+"""
+
+import os
+import sqlite3
+import time
+import logging
+
+from services.local_sqlite import LocalSQLite
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    state TEXT NOT NULL,
+    status_code INTEGER,
+    content_type TEXT,
+    body BLOB,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys (created_at);
+'''
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+class IdempotencyStore:
+    def __init__(self, path, ttl_seconds=86400, max_entries=100000, lock_timeout=30):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Tiempo tras el cual una ejecución 'pending' se considera abandonada (worker caído)
+        self.lock_timeout = lock_timeout
+        self._db = LocalSQLite(path, IDEMPOTENCY_SCHEMA)
+        self._writes = 0
+
+    def acquire(self, key, fingerprint):
+        """
+        Intenta reservar la clave para ejecutar la petición.
+        Devuelve None si la reserva es nuestra, o la fila existente (state, fingerprint, status_code,
+        content_type, body, created_at) si otra petición ya la tiene.
+        """
+        conn = self._db.connection()
+        now = time.time()
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO idempotency_keys (key, fingerprint, state, created_at) VALUES (?, ?, ?, ?)',
+            (key, fingerprint, PENDING, now),
+        )
+        if cursor.rowcount == 1:
+            self._maybe_prune()
+            return None
+        row = self.get(key)
+        if row is None:
+            return self.acquire(key, fingerprint)
+        state, stored_fingerprint, _, _, _, created_at = row
+        expired = created_at < now - self.ttl_seconds
+        abandoned = state == PENDING and created_at < now - self.lock_timeout
+        if expired or abandoned:
+            # Se recupera la clave solo si nadie más la ha recuperado entre medias
+            cursor = conn.execute(
+                'UPDATE idempotency_keys SET fingerprint = ?, state = ?, status_code = NULL, body = NULL, '
+                'created_at = ? WHERE key = ? AND created_at = ?',
+                (fingerprint, PENDING, now, key, created_at),
+            )
+            if cursor.rowcount == 1:
+                logger.warning(f'Clave de idempotencia recuperada ({"expirada" if expired else "abandonada"}): {key}')
+                return None
+            return self.get(key)
+        return row
+
+    def get(self, key):
+        return self._db.connection().execute(
+            'SELECT state, fingerprint, status_code, content_type, body, created_at '
+            'FROM idempotency_keys WHERE key = ?',
+            (key,),
+        ).fetchone()
+
+    def complete(self, key, status_code, content_type, body):
+        self._db.connection().execute(
+            'UPDATE idempotency_keys SET state = ?, status_code = ?, content_type = ?, body = ? WHERE key = ?',
+            (DONE, status_code, content_type, sqlite3.Binary(body), key),
+        )
+
+    def release(self, key):
+        """Libera una reserva cuya ejecución falló para que un reintento pueda ejecutarse."""
+        self._db.connection().execute(
+            'DELETE FROM idempotency_keys WHERE key = ? AND state = ?', (key, PENDING)
+        )
+
+    def _maybe_prune(self):
+        self._writes += 1
+        if self._writes % 100:
+            return
+        conn = self._db.connection()
+        conn.execute('DELETE FROM idempotency_keys WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+        (count,) = conn.execute('SELECT COUNT(*) FROM idempotency_keys').fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                'DELETE FROM idempotency_keys WHERE key IN '
+                '(SELECT key FROM idempotency_keys WHERE state = ? ORDER BY created_at LIMIT ?)',
+                (DONE, count - self.max_entries),
+            )
+            logger.info(f'{count - self.max_entries} claves de idempotencia descartadas por tamaño')
+
+
+idempotency_store = IdempotencyStore(
+    os.getenv('IDEMPOTENCY_DB_PATH', 'idempotency.db'),
+    ttl_seconds=int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400')),
+    max_entries=int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '100000')),
+)
@@ -0,0 +1,179 @@
+"""
+Cola de trabajos en segundo plano.
+Los trabajos se guardan en un archivo SQLite local y los ejecuta un proceso worker aparte
+(`flask --app app jobs worker`), con reintentos con backoff exponencial y un límite de concurrencia.
+Encolar cuesta un INSERT local: solo compensa para trabajo más caro que eso (p. ej. recompilar el
+snapshot del catálogo), y las ráfagas de un mismo trabajo se agrupan con `submit_unique`.
+El worker purga los trabajos completados y, al recibir SIGTERM, deja de reservar y termina los
+que tiene en curso antes de salir.
+Con BACKGROUND_JOBS desactivado las tareas se ejecutan en línea, igual que antes.
+"""
+
+import json
+import os
+import random
+import time
+import traceback
+import logging
+
+from services.local_sqlite import LocalSQLite
+
+logger = logging.getLogger(__name__)
+
+JOBS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_run_at ON jobs (status, run_at);
+'''
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_tasks = {}
+
+
+def task(name):
+    """Registra una función como tarea ejecutable por el worker."""
+    def decorator(fn):
+        _tasks[name] = fn
+        return fn
+    return decorator
+
+
+class JobQueue:
+    def __init__(self, path, enabled=False, backoff_seconds=2.0, max_backoff_seconds=300.0,
+                 visibility_timeout=300.0, retention_seconds=3600.0):
+        self.enabled = enabled
+        # El worker borra los trabajos completados con más antigüedad que esta
+        self.retention_seconds = retention_seconds
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        # Un trabajo 'running' sin cambios durante este tiempo se da por abandonado (worker caído)
+        self.visibility_timeout = visibility_timeout
+        self._db = LocalSQLite(path, JOBS_SCHEMA)
+
+    def submit(self, name, payload, max_attempts=5):
+        """Encola la tarea, o la ejecuta en línea si la cola en segundo plano no está activa."""
+        if not self.enabled:
+            _tasks[name](**payload)
+            return None
+        now = time.time()
+        cursor = self._db.connection().execute(
+            'INSERT INTO jobs (name, payload, status, max_attempts, run_at, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (name, json.dumps(payload), QUEUED, max_attempts, now, now, now),
+        )
+        return cursor.lastrowid
+
+    def submit_unique(self, name, payload=None, max_attempts=5):
+        """
+        Como `submit`, pero no encola si ya hay un trabajo `name` esperando: una ráfaga de escrituras
+        produce un solo trabajo. Uno ya en curso no cuenta, así los cambios que llegan mientras se
+        ejecuta tienen su propio trabajo. Devuelve el id o None si ya había uno.
+        """
+        payload = payload or {}
+        if not self.enabled:
+            _tasks[name](**payload)
+            return None
+        now = time.time()
+        cursor = self._db.connection().execute(
+            'INSERT INTO jobs (name, payload, status, max_attempts, run_at, created_at, updated_at) '
+            'SELECT ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE name = ? AND status = ?)',
+            (name, json.dumps(payload), QUEUED, max_attempts, now, now, now, name, QUEUED),
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, limit):
+        """Reserva hasta `limit` trabajos listos de forma atómica entre varios workers."""
+        conn = self._db.connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                'SELECT id, name, payload, attempts, max_attempts FROM jobs '
+                'WHERE (status = ? AND run_at <= ?) OR (status = ? AND updated_at < ?) '
+                'ORDER BY run_at LIMIT ?',
+                (QUEUED, now, RUNNING, now - self.visibility_timeout, limit),
+            ).fetchall()
+            conn.executemany(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                [(RUNNING, now, row[0]) for row in rows],
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [
+            {'id': r[0], 'name': r[1], 'payload': json.loads(r[2]), 'attempts': r[3] + 1, 'max_attempts': r[4]}
+            for r in rows
+        ]
+
+    def run(self, job):
+        """Ejecuta un trabajo reservado y registra el resultado o programa su reintento."""
+        try:
+            _tasks[job['name']](**job['payload'])
+        except Exception as e:
+            error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+            if job['attempts'] >= job['max_attempts']:
+                logger.error(f'Trabajo {job["id"]} ({job["name"]}) fallido tras {job["attempts"]} intentos: {error}')
+                self._finish(job['id'], FAILED, error)
+            else:
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (job['attempts'] - 1))
+                delay *= random.uniform(0.5, 1.5)
+                logger.warning(f'Trabajo {job["id"]} ({job["name"]}) reintentará en {delay:.1f} s: {error}')
+                self._db.connection().execute(
+                    'UPDATE jobs SET status = ?, run_at = ?, updated_at = ?, last_error = ? WHERE id = ?',
+                    (QUEUED, time.time() + delay, time.time(), error, job['id']),
+                )
+            return False
+        self._finish(job['id'], DONE, None)
+        return True
+
+    def _finish(self, job_id, status, error):
+        self._db.connection().execute(
+            'UPDATE jobs SET status = ?, updated_at = ?, last_error = ? WHERE id = ?',
+            (status, time.time(), error, job_id),
+        )
+
+    def get(self, job_id):
+        row = self._db.connection().execute(
+            'SELECT id, name, status, attempts, max_attempts, run_at, created_at, updated_at, last_error '
+            'FROM jobs WHERE id = ?',
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'updated_at', 'last_error')
+        return dict(zip(keys, row))
+
+    def stats(self):
+        rows = self._db.connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def purge(self, older_than_seconds=86400):
+        """Borra los trabajos terminados con éxito más antiguos que el umbral; devuelve cuántos."""
+        cursor = self._db.connection().execute(
+            'DELETE FROM jobs WHERE status = ? AND updated_at < ?', (DONE, time.time() - older_than_seconds)
+        )
+        return cursor.rowcount
+
+
+job_queue = JobQueue(
+    os.getenv('JOBS_DB_PATH', 'jobs.db'),
+    enabled=os.getenv('BACKGROUND_JOBS', '0') == '1',
+    retention_seconds=float(os.getenv('JOBS_RETENTION_SECONDS', '3600')),
+)
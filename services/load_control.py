@@ -0,0 +1,250 @@
+"""
+Plazos por petición y limitador de concurrencia adaptativo.
+El plazo de la petición actual (ContextVar) se traslada a cada sentencia SQL: en MySQL con el hint
+MAX_EXECUTION_TIME en los SELECT y en SQLite con un progress handler que interrumpe la consulta;
+si el plazo ya venció no se envía la sentencia.
+El limitador cuenta las peticiones en curso de todos los workers en un archivo mmap de /dev/shm y
+ajusta el límite con AIMD según la latencia observada: suma 1/límite por cada petición rápida y lo
+multiplica por un factor < 1 (como mucho una vez por ventana) cuando una petición supera la
+latencia objetivo o agota su plazo. Cada prioridad puede ocupar solo una fracción del límite, así
+las rutas de baja prioridad se rechazan antes que las críticas.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from contextvars import ContextVar
+from services.shared_paths import shared_path
+import logging
+
+logger = logging.getLogger(__name__)
+
+CRITICAL = 'critical'
+NORMAL = 'normal'
+LOW = 'low'
+
+_deadline = ContextVar('deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """El plazo de la petición venció antes de ejecutar una sentencia SQL."""
+
+
+# =========================
+# Plazos
+# =========================
+def set_deadline(timeout_ms):
+    """Fija el plazo de la petición actual (None para no tener plazo)."""
+    _deadline.set(time.monotonic() + timeout_ms / 1000 if timeout_ms else None)
+
+
+def clear_deadline():
+    _deadline.set(None)
+
+
+def remaining_ms():
+    """Milisegundos que le quedan a la petición actual, o None si no tiene plazo."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return (deadline - time.monotonic()) * 1000
+
+
+def deadline_expired():
+    remaining = remaining_ms()
+    return remaining is not None and remaining <= 0
+
+
+def register_sql_deadlines(engine):
+    """Traslada el plazo de la petición a las sentencias del engine."""
+    from sqlalchemy import event
+
+    dialect = engine.dialect.name
+
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def _apply_deadline(conn, cursor, statement, parameters, context, executemany):
+        deadline = _deadline.get()
+        if dialect == 'sqlite':
+            dbapi_connection = conn.connection.dbapi_connection
+            if deadline is None:
+                dbapi_connection.set_progress_handler(None, 0)
+            else:
+                # El handler se llama cada N instrucciones de la VM de SQLite; devolver 1 interrumpe la consulta
+                dbapi_connection.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+        if deadline is None:
+            return statement, parameters
+        remaining = int((deadline - time.monotonic()) * 1000)
+        if remaining <= 0:
+            raise DeadlineExceeded('Plazo de la petición agotado antes de ejecutar la consulta')
+        if dialect == 'mysql' and statement.lstrip()[:6].upper() == 'SELECT':
+            statement = statement.lstrip()
+            statement = f'SELECT /*+ MAX_EXECUTION_TIME({remaining}) */{statement[6:]}'
+        return statement, parameters
+
+
+# =========================
+# Limitador adaptativo
+# =========================
+class AdaptiveLimiter:
+    """
+    Límite de peticiones en curso compartido entre workers. Cada proceso tiene una ranura
+    (pid, en curso) en el archivo; las de procesos muertos se liberan al rechazar.
+    """
+
+    SLOTS = 128
+    HEADER = struct.Struct('<dd')  # límite, instante de la última reducción
+    SLOT_ARRAY = struct.Struct(f'<{SLOTS}q')
+
+    def __init__(self, path, initial_limit=20.0, min_limit=2.0, max_limit=200.0, latency_target_ms=500.0,
+                 decrease_factor=0.9, shares=None):
+        self.path = path
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_ms = latency_target_ms
+        self.decrease_factor = decrease_factor
+        self.shares = shares or {CRITICAL: 1.0, NORMAL: 0.8, LOW: 0.5}
+        self._map = None
+        self._fd = None
+        self._slot = None
+        self._pid = None
+        # flock no excluye a los hilos de un mismo proceso (comparten descriptor)
+        self._thread_lock = threading.Lock()
+        self.rejected = 0
+
+    def _pids_offset(self):
+        return self.HEADER.size
+
+    def _inflight_offset(self):
+        return self.HEADER.size + self.SLOT_ARRAY.size
+
+    def _open(self):
+        if self._map is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            size = self._inflight_offset() + self.SLOT_ARRAY.size
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                    mapped = mmap.mmap(fd, size)
+                    self.HEADER.pack_into(mapped, 0, self.initial_limit, 0.0)
+                else:
+                    mapped = mmap.mmap(fd, size)
+                self._slot = self._claim_slot(mapped)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd, self._map, self._pid = fd, mapped, os.getpid()
+        return self._map
+
+    def _claim_slot(self, mapped):
+        pids = self.SLOT_ARRAY.unpack_from(mapped, self._pids_offset())
+        for index, pid in enumerate(pids):
+            if pid == os.getpid() or pid == 0 or not _alive(pid):
+                struct.pack_into('<q', mapped, self._pids_offset() + index * 8, os.getpid())
+                struct.pack_into('<q', mapped, self._inflight_offset() + index * 8, 0)
+                return index
+        logger.warning('No quedan ranuras libres en el limitador de concurrencia; este worker no limita')
+        return None
+
+    def _locked(self):
+        return _FileLock(self._thread_lock, self._fd)
+
+    def _inflight(self, mapped):
+        return sum(self.SLOT_ARRAY.unpack_from(mapped, self._inflight_offset()))
+
+    def _reap(self, mapped):
+        """Libera las ranuras de workers que murieron con peticiones en curso."""
+        pids = self.SLOT_ARRAY.unpack_from(mapped, self._pids_offset())
+        for index, pid in enumerate(pids):
+            if pid and pid != os.getpid() and not _alive(pid):
+                struct.pack_into('<q', mapped, self._pids_offset() + index * 8, 0)
+                struct.pack_into('<q', mapped, self._inflight_offset() + index * 8, 0)
+
+    def _add_inflight(self, mapped, delta):
+        offset = self._inflight_offset() + self._slot * 8
+        struct.pack_into('<q', mapped, offset, max(0, struct.unpack_from('<q', mapped, offset)[0] + delta))
+
+    def try_acquire(self, priority=NORMAL):
+        """Reserva un hueco para una petición de `priority`; False si hay que rechazarla."""
+        mapped = self._open()
+        if self._slot is None:
+            return True
+        with self._locked():
+            limit = self.HEADER.unpack_from(mapped, 0)[0]
+            allowed = max(1.0, limit * self.shares.get(priority, self.shares[NORMAL]))
+            if self._inflight(mapped) >= allowed:
+                self._reap(mapped)
+                if self._inflight(mapped) >= allowed:
+                    self.rejected += 1
+                    return False
+            self._add_inflight(mapped, 1)
+            return True
+
+    def release(self, latency_ms, overloaded=False):
+        """Libera el hueco y ajusta el límite con la latencia observada (AIMD)."""
+        mapped = self._open()
+        if self._slot is None:
+            return
+        with self._locked():
+            self._add_inflight(mapped, -1)
+            limit, last_decrease = self.HEADER.unpack_from(mapped, 0)
+            now = time.monotonic()
+            if overloaded or latency_ms > self.latency_target_ms:
+                # Una sola reducción por ventana: una ráfaga de peticiones lentas no hunde el límite a cero
+                if now - last_decrease >= self.latency_target_ms / 1000 or now < last_decrease:
+                    limit = max(self.min_limit, limit * self.decrease_factor)
+                    last_decrease = now
+            else:
+                limit = min(self.max_limit, limit + 1.0 / limit)
+            self.HEADER.pack_into(mapped, 0, limit, last_decrease)
+
+    def stats(self):
+        mapped = self._open()
+        with self._locked():
+            limit = self.HEADER.unpack_from(mapped, 0)[0]
+            inflight = self._inflight(mapped)
+        return {
+            'limit': round(limit, 2),
+            'inflight': inflight,
+            'allowed': {p: round(max(1.0, limit * share), 2) for p, share in self.shares.items()},
+            'rejected_by_worker': self.rejected,
+            'latency_target_ms': self.latency_target_ms,
+        }
+
+
+class _FileLock:
+    def __init__(self, thread_lock, fd):
+        self.thread_lock = thread_lock
+        self.fd = fd
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.thread_lock.release()
+        return False
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+limiter = AdaptiveLimiter(
+    os.getenv('SHED_LIMITER_PATH', shared_path('limiter')),
+    initial_limit=float(os.getenv('SHED_INITIAL_LIMIT', '20')),
+    min_limit=float(os.getenv('SHED_MIN_LIMIT', '2')),
+    max_limit=float(os.getenv('SHED_MAX_LIMIT', '200')),
+    latency_target_ms=float(os.getenv('SHED_LATENCY_TARGET_MS', '500')),
+)
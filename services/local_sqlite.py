@@ -0,0 +1,28 @@
+"""
+Conexiones a archivos SQLite locales compartidos entre workers de gunicorn.
+Lo usan los almacenes auxiliares (eventos, idempotencia, ...) que no viven en la base principal.
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class LocalSQLite:
+    """Entrega una conexión por hilo y por proceso (las conexiones SQLite no sobreviven al fork)."""
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.schema)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
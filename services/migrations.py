@@ -0,0 +1,263 @@
+"""
+Migraciones de esquema de la base de datos principal.
+Cada migración es un módulo `migrations/NNNN_descripcion.py` con `revision`, `description` y
+`upgrade(ctx)`; las aplicadas se registran en la tabla `schema_migrations`. El contexto ofrece
+operaciones idempotentes pensadas para tablas en producción: índices creados en línea en MySQL
+(ALGORITHM=INPLACE, LOCK=NONE), columnas añadidas sin copiar la tabla cuando el motor lo permite
+y backfills por lotes de clave primaria con pausa entre lotes, de modo que ninguna transacción
+bloquea la tabla durante mucho tiempo.
+Se ejecutan con `flask --app app db upgrade` antes de arrancar los workers.
+"""
+
+import importlib
+import os
+import pkgutil
+import re
+import time
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = 'migrations'
+MODULE_PATTERN = re.compile(r'^(\d{4})_\w+$')
+LOCK_NAME = 'flaskapi_schema_migrations'
+
+
+class MigrationContext:
+    """Operaciones disponibles para `upgrade(ctx)`; todas se pueden repetir sin efecto."""
+
+    def __init__(self, engine, batch_size=1000, throttle_seconds=0.05, lock_wait_timeout=5, ddl_retries=5):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.batch_size = batch_size
+        self.throttle_seconds = throttle_seconds
+        self.lock_wait_timeout = lock_wait_timeout
+        self.ddl_retries = ddl_retries
+
+    # =========================
+    # Introspección
+    # =========================
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        return any(c['name'] == column for c in inspect(self.engine).get_columns(table))
+
+    def has_index(self, table, name):
+        return any(i['name'] == name for i in inspect(self.engine).get_indexes(table))
+
+    # =========================
+    # DDL
+    # =========================
+    def create_tables(self, metadata):
+        """Crea las tablas de `metadata` que no existan (bases creadas antes con db.create_all)."""
+        metadata.create_all(self.engine, checkfirst=True)
+
+    def create_index(self, name, table, columns, unique=False):
+        """Crea un índice si no existe; en MySQL sin bloquear las escrituras mientras se construye."""
+        if self.has_index(table, name):
+            logger.info(f'Índice {name} ya existe en {table}')
+            return False
+        sql = f'CREATE {"UNIQUE " if unique else ""}INDEX {name} ON {table} ({", ".join(columns)})'
+        if self.dialect == 'mysql':
+            sql += ' ALGORITHM=INPLACE LOCK=NONE'
+        start = time.perf_counter()
+        self._execute_ddl(sql)
+        logger.info(f'Índice {name} creado en {table} en {time.perf_counter() - start:.1f} s')
+        return True
+
+    def drop_index(self, name, table):
+        if not self.has_index(table, name):
+            return False
+        if self.dialect == 'mysql':
+            self._execute_ddl(f'DROP INDEX {name} ON {table} ALGORITHM=INPLACE LOCK=NONE')
+        else:
+            self._execute_ddl(f'DROP INDEX {name}')
+        return True
+
+    def add_column(self, table, column, ddl):
+        """
+        Añade una columna si no existe. `ddl` es la definición sin el nombre (p. ej. 'INTEGER NOT NULL DEFAULT 1').
+        En MySQL se intenta ALGORITHM=INSTANT (solo metadatos) y si no, INPLACE sin bloqueo.
+        """
+        if self.has_column(table, column):
+            logger.info(f'Columna {table}.{column} ya existe')
+            return False
+        sql = f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'
+        if self.dialect == 'mysql':
+            try:
+                self._execute_ddl(f'{sql}, ALGORITHM=INSTANT')
+            except OperationalError:
+                self._execute_ddl(f'{sql}, ALGORITHM=INPLACE, LOCK=NONE')
+        else:
+            self._execute_ddl(sql)
+        logger.info(f'Columna {table}.{column} añadida')
+        return True
+
+    def _execute_ddl(self, sql):
+        """
+        Ejecuta DDL con un lock_wait_timeout corto en MySQL: si una transacción larga retiene el
+        metadata lock se reintenta más tarde en lugar de dejar en cola todas las consultas de la tabla.
+        """
+        for attempt in range(1, self.ddl_retries + 1):
+            try:
+                with self.engine.begin() as conn:
+                    if self.dialect == 'mysql':
+                        conn.execute(text(f'SET SESSION lock_wait_timeout = {int(self.lock_wait_timeout)}'))
+                    conn.execute(text(sql))
+                return
+            except OperationalError as e:
+                # 1205: Lock wait timeout exceeded
+                if self.dialect != 'mysql' or getattr(e.orig, 'args', [None])[0] != 1205 or attempt == self.ddl_retries:
+                    raise
+                logger.warning(f'DDL esperando metadata lock (intento {attempt}): {sql}')
+                time.sleep(min(30, 2 ** attempt))
+
+    # =========================
+    # Backfill por lotes
+    # =========================
+    def backfill(self, table, assignments, pending, key='id', batch_size=None, throttle_seconds=None, params=None):
+        """
+        Actualiza `SET assignments` en las filas que cumplen `pending` recorriendo la tabla por
+        rangos de clave primaria; cada lote es una transacción corta seguida de una pausa.
+        `pending` debe dejar de cumplirse al actualizar la fila, así el backfill se puede reanudar.
+
+        Returns:
+            int: Filas actualizadas
+        """
+        batch_size = batch_size or self.batch_size
+        throttle_seconds = self.throttle_seconds if throttle_seconds is None else throttle_seconds
+        params = params or {}
+        last_key = None
+        updated = 0
+        start = time.perf_counter()
+        while True:
+            with self.engine.begin() as conn:
+                # Se buscan los límites del lote leyendo solo el índice de la clave primaria
+                bound = 'WHERE {key} > :last_key'.format(key=key) if last_key is not None else ''
+                keys = conn.execute(
+                    text(f'SELECT {key} FROM {table} {bound} ORDER BY {key} LIMIT :batch_size'),
+                    {'last_key': last_key, 'batch_size': batch_size},
+                ).scalars().all()
+                if not keys:
+                    break
+                result = conn.execute(
+                    text(f'UPDATE {table} SET {assignments} WHERE {key} >= :low AND {key} <= :high AND ({pending})'),
+                    {'low': keys[0], 'high': keys[-1], **params},
+                )
+                updated += result.rowcount
+                last_key = keys[-1]
+            if len(keys) < batch_size:
+                break
+            if throttle_seconds:
+                time.sleep(throttle_seconds)
+        logger.info(f'Backfill de {table}: {updated} filas en {time.perf_counter() - start:.1f} s')
+        return updated
+
+
+class MigrationRunner:
+    def __init__(self, engine, package=MIGRATIONS_PACKAGE):
+        self.engine = engine
+        self.package = package
+
+    def _ensure_table(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                'CREATE TABLE IF NOT EXISTS schema_migrations ('
+                'revision VARCHAR(32) PRIMARY KEY, description VARCHAR(255) NOT NULL, applied_at DOUBLE PRECISION NOT NULL)'
+            ))
+
+    def discover(self):
+        """Devuelve los módulos de migración ordenados por revisión."""
+        package = importlib.import_module(self.package)
+        modules = []
+        for info in pkgutil.iter_modules(package.__path__):
+            if MODULE_PATTERN.match(info.name):
+                modules.append(importlib.import_module(f'{self.package}.{info.name}'))
+        modules.sort(key=lambda m: m.revision)
+        return modules
+
+    def applied(self):
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            rows = conn.execute(text('SELECT revision, applied_at FROM schema_migrations')).all()
+        return {revision: applied_at for revision, applied_at in rows}
+
+    def status(self):
+        applied = self.applied()
+        return [
+            {'revision': m.revision, 'description': m.description, 'applied_at': applied.get(m.revision)}
+            for m in self.discover()
+        ]
+
+    def drift(self, metadata):
+        """
+        Compara los modelos (`metadata`) con la base de datos y devuelve lo que los modelos declaran
+        y aún no existe: tablas, columnas e índices con nombre. Vacío si el esquema está al día.
+        """
+        inspector = inspect(self.engine)
+        missing = []
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                missing.append(f'tabla {table.name}')
+                continue
+            columns = {c['name'] for c in inspector.get_columns(table.name)}
+            missing += [f'columna {table.name}.{c.name}' for c in table.columns if c.name not in columns]
+            indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+            missing += [f'índice {table.name}.{i.name}' for i in table.indexes if i.name not in indexes]
+        return missing
+
+    def upgrade(self, target=None, **context_options):
+        """Aplica en orden las migraciones pendientes hasta `target` (incluida). Devuelve las aplicadas."""
+        with self._lock():
+            applied = self.applied()
+            context = MigrationContext(self.engine, **context_options)
+            done = []
+            for module in self.discover():
+                if target is not None and module.revision > target:
+                    break
+                if module.revision in applied:
+                    continue
+                logger.info(f'Aplicando migración {module.revision}: {module.description}')
+                start = time.perf_counter()
+                module.upgrade(context)
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        text('INSERT INTO schema_migrations (revision, description, applied_at) '
+                             'VALUES (:revision, :description, :applied_at)'),
+                        {'revision': module.revision, 'description': module.description, 'applied_at': time.time()},
+                    )
+                logger.info(f'Migración {module.revision} aplicada en {time.perf_counter() - start:.1f} s')
+                done.append(module.revision)
+            return done
+
+    def _lock(self):
+        return _MigrationLock(self.engine)
+
+
+class _MigrationLock:
+    """Evita que dos procesos (p. ej. dos despliegues) migren a la vez; en MySQL con GET_LOCK."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.conn = None
+
+    def __enter__(self):
+        if self.engine.dialect.name == 'mysql':
+            self.conn = self.engine.connect()
+            timeout = int(os.getenv('MIGRATION_LOCK_TIMEOUT_SECONDS', '600'))
+            acquired = self.conn.execute(text('SELECT GET_LOCK(:name, :timeout)'),
+                                         {'name': LOCK_NAME, 'timeout': timeout}).scalar()
+            if acquired != 1:
+                self.conn.close()
+                raise RuntimeError('No se pudo obtener el bloqueo de migraciones')
+        return self
+
+    def __exit__(self, *exc):
+        if self.conn is not None:
+            self.conn.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': LOCK_NAME})
+            self.conn.close()
+        return False
@@ -0,0 +1,101 @@
+"""
+Histórico de precios de los electrodomésticos.
+Cada escritura que fija el precio (alta por el ORM o actualización por sentencia directa) añade
+un evento a `precios_historial` y actualiza los agregados por hora y por día de
+`precios_agregados` en la misma transacción. Las consultas de rangos cortos leen los eventos;
+las de rangos largos se responden desde los agregados sin recorrer el histórico.
+"""
+
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from repositories.precios_repository import PreciosRepository
+from repositories.sharded_electrodomesticos_repository import ShardedElectrodomesticosRepository
+from services.sharding import shard_router
+from models.precios import BUCKETS
+from services.tracing import traced_class
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+BUCKET_OPTIONS = ('raw',) + tuple(BUCKETS)
+# Con bucket automático: eventos hasta RAW_MAX_SPAN, agregados por hora hasta HOURLY_MAX_SPAN y por día después
+RAW_MAX_SPAN_MS = int(float(os.getenv('PRECIOS_RAW_MAX_SPAN_HOURS', '48')) * 3600 * 1000)
+HOURLY_MAX_SPAN_MS = int(float(os.getenv('PRECIOS_HOURLY_MAX_SPAN_DAYS', '90')) * 24 * 3600 * 1000)
+RAW_LIMIT = int(os.getenv('PRECIOS_RAW_LIMIT', '10000'))
+
+
+def _iso(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(timespec='milliseconds')
+
+
+def choose_bucket(desde_ms, hasta_ms):
+    """Granularidad para un rango sin `bucket` explícito."""
+    span = hasta_ms - desde_ms
+    if span <= RAW_MAX_SPAN_MS:
+        return 'raw'
+    return 'hour' if span <= HOURLY_MAX_SPAN_MS else 'day'
+
+
+def _history_session(electrodomestico_id, session):
+    """Con sharding, el histórico está en el shard del electrodoméstico."""
+    if shard_router.enabled:
+        return ShardedElectrodomesticosRepository.history_session(electrodomestico_id, session)
+    return nullcontext(session)
+
+
+@traced_class('service')
+class PreciosService:
+
+    @staticmethod
+    def get_price_history(electrodomestico_id, desde_ms, hasta_ms, bucket=None):
+        """
+        Histórico de precios de un electrodoméstico en [desde_ms, hasta_ms].
+        
+        Args:
+            electrodomestico_id (int): ID del electrodoméstico
+            desde_ms, hasta_ms (int): Rango en milisegundos (UTC)
+            bucket (str): 'raw', 'hour', 'day' o None para elegirlo según la longitud del rango
+            
+        Returns:
+            dict: Precio vigente al empezar el rango y puntos (eventos o agregados min/max/último)
+        """
+        from models.db import db
+        bucket = bucket or choose_bucket(desde_ms, hasta_ms)
+        logger.info(f'Obteniendo histórico de precios en servicio: ID {electrodomestico_id} ({bucket})')
+        with _history_session(electrodomestico_id, db.session) as session:
+            history = {
+                'electrodomestico_id': electrodomestico_id,
+                'from': _iso(desde_ms),
+                'to': _iso(hasta_ms),
+                'bucket': bucket,
+                'precio_inicial': PreciosRepository.get_price_before(electrodomestico_id, desde_ms, session),
+            }
+            if bucket == 'raw':
+                events = PreciosRepository.get_events(electrodomestico_id, desde_ms, hasta_ms, RAW_LIMIT + 1, session)
+                history['truncado'] = len(events) > RAW_LIMIT
+                history['puntos'] = [{'fecha': _iso(ms), 'precio': precio} for ms, precio in events[:RAW_LIMIT]]
+            else:
+                rollups = PreciosRepository.get_rollups(electrodomestico_id, bucket, desde_ms, hasta_ms, session)
+                history['puntos'] = [
+                    {'inicio': _iso(inicio), 'precio_min': minimo, 'precio_max': maximo, 'precio_ultimo': ultimo,
+                     'cambios': cambios}
+                    for inicio, minimo, maximo, ultimo, cambios in rollups
+                ]
+        logger.info(f'{len(history["puntos"])} puntos de precio obtenidos en servicio')
+        return history
+
+    @staticmethod
+    def prune_events(days):
+        """Purga los eventos del histórico con más de `days` días (los agregados se conservan)."""
+        from models.db import db
+        before_ms = int((datetime.now(timezone.utc).timestamp() - days * 24 * 3600) * 1000)
+        if shard_router.enabled:
+            def prune(shard):
+                with shard_router.session(shard) as session:
+                    return PreciosRepository.prune_events(before_ms, session)
+            return sum(shard_router.scatter(prune))
+        try:
+            return PreciosRepository.prune_events(before_ms, db.session)
+        finally:
+            db.session.remove()
@@ -0,0 +1,251 @@
+"""
+Profiler estadístico bajo demanda para los workers en producción.
+Un hilo toma muestras de las pilas (`sys._current_frames`) de los hilos que están atendiendo
+peticiones en este worker, opcionalmente solo las de un endpoint (p. ej.
+`electrodomesticos_bp.get_all_electrodomesticos`), y las agrega entre peticiones como pilas
+colapsadas. El coste se acota: tras cada muestra el hilo espera lo necesario para que el tiempo
+de muestreo no pase de `max_overhead` (2 %) del tiempo total, alargando el intervalo si hace
+falta. Solo puede haber un perfil en curso entre todos los workers (flock). El resultado se
+guarda en un archivo compartido, así cualquier worker puede devolverlo como pilas colapsadas
+(flamegraph.pl, speedscope) o en el formato JSON de speedscope.
+Fuera de un perfil el único coste por petición es comprobar un atributo.
+"""
+
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from services.shared_paths import shared_path
+import logging
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('collapsed', 'speedscope')
+
+
+class ProfilerBusy(Exception):
+    """Ya hay un perfil en curso (en este o en otro worker)."""
+
+
+def _short_path(filename):
+    """Ruta relativa al proyecto; las de la biblioteca estándar y los paquetes, desde su raíz."""
+    for marker in ('site-packages' + os.sep, 'dist-packages' + os.sep, f'python{sys.version_info[0]}.{sys.version_info[1]}' + os.sep):
+        _, found, rest = filename.rpartition(marker)
+        if found:
+            return rest
+    return os.path.relpath(filename) if os.path.isabs(filename) else filename
+
+
+class SamplingProfiler:
+    def __init__(self, directory, max_seconds=120, max_overhead=0.02, keep=20):
+        self.directory = directory
+        self.max_seconds = max_seconds
+        self.max_overhead = max_overhead
+        self.keep = keep
+        self.active = False
+        self._route = None
+        self._threads = {}  # ident del hilo -> endpoint de la petición que atiende
+        self._labels = {}   # code object -> nombre del frame
+        self._lock = threading.Lock()
+
+    # =========================
+    # Seguimiento de peticiones
+    # =========================
+    def init_app(self, app):
+        from flask import request
+
+        @app.before_request
+        def _track_request():
+            if self.active:
+                self._threads[threading.get_ident()] = request.endpoint
+
+        @app.teardown_request
+        def _untrack_request(exc):
+            if self.active:
+                self._threads.pop(threading.get_ident(), None)
+
+    # =========================
+    # Perfil
+    # =========================
+    def start(self, seconds, route=None, interval_ms=10.0):
+        """
+        Arranca un perfil de `seconds` segundos en este worker; devuelve sus metadatos.
+        Lanza ProfilerBusy si ya hay uno en curso.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, 'profiler.lock'), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise ProfilerBusy()
+        with self._lock:
+            if self.active:
+                lock_file.close()
+                raise ProfilerBusy()
+            self._route = route
+            self._threads = {}
+            self.active = True
+        profile = {
+            'id': uuid.uuid4().hex,
+            'pid': os.getpid(),
+            'route': route,
+            'seconds': seconds,
+            'interval_ms': interval_ms,
+            'started_at': time.time(),
+            'status': 'running',
+        }
+        self._write(profile)
+        threading.Thread(target=self._run, args=(profile, lock_file), name='sampling-profiler', daemon=True).start()
+        logger.warning(f'Perfil {profile["id"]} iniciado en el worker {profile["pid"]}: '
+                       f'{seconds} s, ruta {route or "todas"}, cada {interval_ms} ms')
+        return profile
+
+    def _run(self, profile, lock_file):
+        stacks = {}
+        samples = 0
+        sampling_s = 0.0
+        interval_s = profile['interval_ms'] / 1000
+        own = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + profile['seconds']
+        last = start
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                weight_ms = (now - last) * 1000
+                last = now
+                frames = sys._current_frames()
+                for ident, endpoint in list(self._threads.items()):
+                    if ident == own or (self._route is not None and endpoint != self._route):
+                        continue
+                    frame = frames.get(ident)
+                    if frame is None:
+                        continue
+                    stack = self._collapse(frame)
+                    count, weight = stacks.get(stack, (0, 0.0))
+                    stacks[stack] = (count + 1, weight + weight_ms)
+                    samples += 1
+                del frames
+                cost = time.perf_counter() - now
+                sampling_s += cost
+                # Espera al menos el intervalo y lo bastante para que el muestreo no supere max_overhead
+                time.sleep(max(interval_s, cost / self.max_overhead - cost))
+            elapsed = time.perf_counter() - start
+            profile.update(
+                status='done',
+                elapsed_s=round(elapsed, 3),
+                samples=samples,
+                overhead=round(sampling_s / elapsed, 5) if elapsed else 0.0,
+                stacks=[[stack, count, round(weight, 3)] for stack, (count, weight) in stacks.items()],
+            )
+            logger.warning(f'Perfil {profile["id"]} terminado: {samples} muestras, '
+                           f'sobrecarga {profile["overhead"] * 100:.2f} %')
+        except Exception as e:
+            logger.error(f'Error en el perfil {profile["id"]}: {str(e)}')
+            profile.update(status='error', error=str(e))
+        finally:
+            self.active = False
+            self._threads = {}
+            self._write(profile)
+            self._prune()
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _collapse(self, frame):
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})'
+                self._labels[code] = label
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return ';'.join(labels)
+
+    # =========================
+    # Resultados
+    # =========================
+    def _path(self, profile_id):
+        return os.path.join(self.directory, f'{profile_id}.json')
+
+    def _write(self, profile):
+        tmp_path = f'{self._path(profile["id"])}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(profile, f)
+        os.replace(tmp_path, self._path(profile['id']))
+
+    def _prune(self):
+        profiles = sorted(
+            (os.path.getmtime(os.path.join(self.directory, name)), name)
+            for name in os.listdir(self.directory) if name.endswith('.json')
+        )
+        for _, name in profiles[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def get(self, profile_id):
+        """Metadatos y pilas de un perfil (de cualquier worker), o None si no existe."""
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def collapsed(profile):
+        """Pilas colapsadas: `frame;frame;... muestras` por línea."""
+        return ''.join(f'{stack} {count}\n' for stack, count, _ in sorted(profile['stacks']))
+
+    @staticmethod
+    def speedscope(profile):
+        """Perfil en el formato JSON de speedscope (muestras con su peso en milisegundos)."""
+        frames = []
+        index = {}
+        samples = []
+        weights = []
+        for stack, _, weight in profile['stacks']:
+            sample = []
+            for label in stack.split(';'):
+                if label not in index:
+                    index[label] = len(frames)
+                    name, _, location = label.rpartition(' (')
+                    file, _, line = location.rstrip(')').rpartition(':')
+                    frames.append({'name': name, 'file': file, 'line': int(line)})
+                sample.append(index[label])
+            samples.append(sample)
+            weights.append(weight)
+        name = f'{profile["route"] or "todas las rutas"} (worker {profile["pid"]})'
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'FlaskAPIExample',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(sum(weights), 3),
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+
+
+profiler = SamplingProfiler(
+    os.getenv('PROFILER_DIR', shared_path('profiles')),
+    max_seconds=int(os.getenv('PROFILER_MAX_SECONDS', '120')),
+    max_overhead=float(os.getenv('PROFILER_MAX_OVERHEAD', '0.02')),
+)
@@ -0,0 +1,213 @@
+"""
+Caché de resultados de consultas de listado/filtro.
+Guarda el JSON ya serializado (bytes) indexado por la consulta normalizada en dos niveles:
+L1 en memoria del proceso y L2 en archivos de un directorio en memoria compartida (/dev/shm)
+visible para todos los workers de esta instalación y esta base de datos (ver services/shared_paths.py). La invalidación es por generación: cualquier escritura de
+electrodomésticos incrementa un contador compartido (archivo mmap) y las entradas de
+generaciones anteriores dejan de ser alcanzables.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from services.shared_paths import shared_path
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    def __init__(self, cache_dir, l1_max_bytes=64 * 1024 * 1024, l2_max_bytes=256 * 1024 * 1024,
+                 l2_prune_every=200):
+        self.cache_dir = cache_dir
+        self.l1_max_bytes = l1_max_bytes
+        self.l2_max_bytes = l2_max_bytes
+        self.l2_prune_every = l2_prune_every
+        self._l1 = OrderedDict()
+        self._l1_bytes = 0
+        self._l1_generation = None
+        self._lock = threading.Lock()
+        self._generation_map = None
+        self._generation_pid = None
+        self._l2_writes = 0
+        self.stats_counters = {
+            'l1_hits': 0, 'l2_hits': 0, 'misses': 0,
+            'l1_evictions': 0, 'l2_evictions': 0, 'invalidations': 0,
+        }
+
+    # =========================
+    # Generación compartida
+    # =========================
+    def _generation_file(self):
+        # Tras el fork (preload_app) se reabre: un descriptor heredado comparte el flock con el master
+        if self._generation_map is None or self._generation_pid != os.getpid():
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, 'generation')
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < 8:
+                os.ftruncate(fd, 8)
+            self._generation_fd = fd
+            self._generation_map = mmap.mmap(fd, 8)
+            self._generation_pid = os.getpid()
+        return self._generation_map
+
+    def generation(self):
+        return struct.unpack_from('<Q', self._generation_file(), 0)[0]
+
+    def invalidate(self):
+        """Incrementa la generación: todas las entradas actuales quedan obsoletas en todos los workers."""
+        generation_map = self._generation_file()
+        fcntl.flock(self._generation_fd, fcntl.LOCK_EX)
+        try:
+            generation = struct.unpack_from('<Q', generation_map, 0)[0] + 1
+            struct.pack_into('<Q', generation_map, 0, generation)
+        finally:
+            fcntl.flock(self._generation_fd, fcntl.LOCK_UN)
+        self.stats_counters['invalidations'] += 1
+        return generation
+
+    # =========================
+    # Lectura y escritura
+    # =========================
+    @staticmethod
+    def normalize(name, **params):
+        """Clave canónica de una consulta: nombre y parámetros ordenados, sin los vacíos."""
+        parts = [f'{k}={params[k]!r}' for k in sorted(params) if params[k] is not None]
+        return name + '?' + '&'.join(parts)
+
+    def _l2_path(self, generation, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{generation}-{digest}.json')
+
+    def get(self, key, generation):
+        with self._lock:
+            if self._l1_generation != generation:
+                self._l1.clear()
+                self._l1_bytes = 0
+                self._l1_generation = generation
+            body = self._l1.get(key)
+            if body is not None:
+                self._l1.move_to_end(key)
+                self.stats_counters['l1_hits'] += 1
+                return body
+        try:
+            with open(self._l2_path(generation, key), 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            self.stats_counters['misses'] += 1
+            return None
+        self.stats_counters['l2_hits'] += 1
+        self._put_l1(key, generation, body)
+        return body
+
+    def put(self, key, generation, body):
+        self._put_l1(key, generation, body)
+        self._put_l2(key, generation, body)
+        return body
+
+    def evict(self, key):
+        """Saca una entrada de L1 (la de L2 sigue disponible para todos los workers)."""
+        with self._lock:
+            body = self._l1.pop(key, None)
+            if body is not None:
+                self._l1_bytes -= len(body)
+
+    def _put_l1(self, key, generation, body):
+        if len(body) > self.l1_max_bytes:
+            return
+        with self._lock:
+            if self._l1_generation != generation:
+                return
+            previous = self._l1.pop(key, None)
+            if previous is not None:
+                self._l1_bytes -= len(previous)
+            self._l1[key] = body
+            self._l1_bytes += len(body)
+            while self._l1_bytes > self.l1_max_bytes:
+                _, evicted = self._l1.popitem(last=False)
+                self._l1_bytes -= len(evicted)
+                self.stats_counters['l1_evictions'] += 1
+
+    def _put_l2(self, key, generation, body):
+        if len(body) > self.l2_max_bytes:
+            return
+        path = self._l2_path(generation, key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            # rename atómico: otro worker nunca lee un archivo a medio escribir
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f'No se pudo escribir la entrada L2 de la caché: {str(e)}')
+            return
+        self._l2_writes += 1
+        if self._l2_writes % self.l2_prune_every == 0:
+            self.prune_l2(generation)
+
+    def prune_l2(self, generation=None):
+        """Borra las entradas de generaciones anteriores y las más antiguas si se supera el presupuesto."""
+        generation = self.generation() if generation is None else generation
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+                if not name.startswith(f'{generation}-'):
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.l2_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats_counters['l2_evictions'] += 1
+        return total
+
+    def stats(self):
+        l2_entries = 0
+        l2_bytes = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    try:
+                        l2_bytes += os.stat(os.path.join(self.cache_dir, name)).st_size
+                        l2_entries += 1
+                    except FileNotFoundError:
+                        pass
+        lookups = self.stats_counters['l1_hits'] + self.stats_counters['l2_hits'] + self.stats_counters['misses']
+        hits = self.stats_counters['l1_hits'] + self.stats_counters['l2_hits']
+        return {
+            'generation': self.generation(),
+            'pid': os.getpid(),
+            'l1_entries': len(self._l1),
+            'l1_bytes': self._l1_bytes,
+            'l1_max_bytes': self.l1_max_bytes,
+            'l2_entries': l2_entries,
+            'l2_bytes': l2_bytes,
+            'l2_max_bytes': self.l2_max_bytes,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            **self.stats_counters,
+        }
+
+
+query_cache = QueryCache(
+    os.getenv('QUERY_CACHE_DIR', shared_path('query-cache')),
+    l1_max_bytes=int(os.getenv('QUERY_CACHE_L1_BYTES', str(64 * 1024 * 1024))),
+    l2_max_bytes=int(os.getenv('QUERY_CACHE_L2_BYTES', str(256 * 1024 * 1024))),
+)
@@ -0,0 +1,179 @@
+"""
+Sharding horizontal opcional de los electrodomésticos.
+Con SHARD_URLS=url0,url1,... las filas de `electrodomesticos` (y su histórico de precios, que
+se escribe en la misma transacción) se reparten entre esas bases; la base principal conserva
+usuarios y el directorio (`electrodomesticos_directorio`: id -> shard, con el modelo único).
+El shard de una fila nueva lo decide el mapa: hash CRC32 del modelo (SHARD_KEY=modelo, por
+defecto) o del tipo (SHARD_KEY=tipo), con asignaciones fijas opcionales por tipo en
+SHARD_TIPOS (p. ej. "Nevera:0,Lavadora:1"). Las consultas por ID o modelo van a un solo
+shard; los listados y estadísticas se lanzan en paralelo a todos y se combinan.
+Cada shard es un bind de Flask-SQLAlchemy (`shard_0`, `shard_1`, ...), así los plazos de
+petición también se aplican a sus sentencias. Probado en local con varios archivos SQLite:
+    SHARD_URLS=sqlite:///shard0.db,sqlite:///shard1.db
+"""
+
+import contextvars
+import os
+import threading
+import zlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+SHARD_BIND_PREFIX = 'shard_'
+# Tablas que viven en los shards (el resto, en la base principal)
+SHARD_TABLES = ('electrodomesticos', 'precios_historial', 'precios_agregados')
+
+
+class ShardMap:
+    """Decide el shard de un electrodoméstico a partir de su modelo o de su tipo."""
+
+    def __init__(self, count, key='modelo', tipos=None):
+        if key not in ('modelo', 'tipo'):
+            raise ValueError(f'SHARD_KEY debe ser modelo o tipo, no {key}')
+        self.count = count
+        self.key = key
+        self.tipos = tipos or {}
+        for tipo, shard in self.tipos.items():
+            if not 0 <= shard < count:
+                raise ValueError(f'SHARD_TIPOS asigna {tipo} al shard {shard}, que no existe')
+
+    @staticmethod
+    def parse_tipos(spec):
+        """'Nevera:0,Lavadora:1' -> {'Nevera': 0, 'Lavadora': 1}"""
+        tipos = {}
+        for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+            tipo, _, shard = item.rpartition(':')
+            if not tipo or not shard.isdigit():
+                raise ValueError(f'Asignación de SHARD_TIPOS inválida: {item}')
+            tipos[tipo] = int(shard)
+        return tipos
+
+    def shard_for(self, modelo, tipo):
+        if self.key == 'tipo':
+            if tipo in self.tipos:
+                return self.tipos[tipo]
+            value = tipo
+        else:
+            value = modelo
+        return zlib.crc32(value.encode('utf-8')) % self.count
+
+
+class ShardRouter:
+    def __init__(self, urls, shard_map=None, directory_cache_size=100000):
+        self.urls = urls
+        self.enabled = bool(urls)
+        self.shard_map = shard_map
+        self.directory_cache_size = directory_cache_size
+        self.engines = []
+        self._directory = {}  # id -> shard; se corrige al no encontrar la fila (resharding)
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def shards(self):
+        return range(len(self.urls))
+
+    def configure(self, app):
+        """Añade un bind por shard a la configuración de Flask-SQLAlchemy (antes de `db.init_app`)."""
+        if not self.enabled:
+            return
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        pool_size = int(os.getenv('SHARD_POOL_SIZE', '5'))
+        for shard, url in enumerate(self.urls):
+            # Opciones propias: las de SQLALCHEMY_ENGINE_OPTIONS (p. ej. el escritor SQLite de un
+            # solo hilo) no sirven para un shard que atiende lecturas en paralelo
+            binds[f'{SHARD_BIND_PREFIX}{shard}'] = {
+                'url': url, 'pool_size': pool_size, 'max_overflow': pool_size * 2, 'connect_args': {},
+            }
+        logger.info(f'Sharding de electrodomésticos activo: {len(self.urls)} shards por {self.shard_map.key}')
+
+    def register_engines(self, engines):
+        if not self.enabled:
+            return
+        self.engines = [engines[f'{SHARD_BIND_PREFIX}{shard}'] for shard in self.shards]
+        for engine in self.engines:
+            if engine.dialect.name == 'sqlite':
+                _register_sqlite(engine)
+
+    def create_tables(self, metadata):
+        """Crea en cada shard las tablas que le corresponden si no existen."""
+        tables = [metadata.tables[name] for name in SHARD_TABLES]
+        for engine in self.engines:
+            metadata.create_all(engine, tables=tables, checkfirst=True)
+
+    def session(self, shard):
+        """Sesión propia de un shard; los objetos siguen legibles después de confirmar y cerrar."""
+        return Session(bind=self.engines[shard], expire_on_commit=False)
+
+    def shard_for(self, modelo, tipo):
+        return self.shard_map.shard_for(modelo, tipo)
+
+    # =========================
+    # Caché del directorio
+    # =========================
+    def cached_shard(self, electrodomestico_id):
+        return self._directory.get(electrodomestico_id)
+
+    def remember(self, electrodomestico_id, shard):
+        if len(self._directory) >= self.directory_cache_size:
+            self._directory.clear()
+        self._directory[electrodomestico_id] = shard
+
+    def forget(self, electrodomestico_id):
+        self._directory.pop(electrodomestico_id, None)
+
+    # =========================
+    # Scatter-gather
+    # =========================
+    def scatter(self, fn, shards=None):
+        """
+        Ejecuta `fn(shard)` en paralelo en los shards (todos por defecto) y devuelve los
+        resultados en orden de shard. Cada llamada hereda el contexto de la petición (plazo, traza).
+        """
+        shards = list(self.shards if shards is None else shards)
+        if len(shards) == 1:
+            return [fn(shards[0])]
+        executor = self._get_executor()
+        futures = [executor.submit(contextvars.copy_context().run, fn, shard) for shard in shards]
+        return [future.result() for future in futures]
+
+    def _get_executor(self):
+        # Los hilos del pool no sobreviven al fork de gunicorn: uno por proceso
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    workers = int(os.getenv('SHARD_SCATTER_THREADS', str(len(self.urls) * 2)))
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shard-scatter')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+
+def _register_sqlite(engine):
+    """WAL y busy_timeout en los shards SQLite: varios hilos leen el mismo archivo a la vez."""
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('PRAGMA synchronous = NORMAL')
+            cursor.execute('PRAGMA busy_timeout = 5000')
+        finally:
+            cursor.close()
+
+
+def _from_env():
+    urls = [url.strip() for url in os.getenv('SHARD_URLS', '').split(',') if url.strip()]
+    shard_map = None
+    if urls:
+        shard_map = ShardMap(len(urls), key=os.getenv('SHARD_KEY', 'modelo'),
+                             tipos=ShardMap.parse_tipos(os.getenv('SHARD_TIPOS')))
+    return ShardRouter(urls, shard_map)
+
+
+shard_router = _from_env()
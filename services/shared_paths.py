@@ -0,0 +1,39 @@
+"""
+Rutas por defecto del estado compartido entre workers (caché de listados, snapshot del catálogo,
+limitador, modo drenaje, perfiles).
+Viven en memoria compartida (/dev/shm) dentro de un directorio propio de cada instalación y de
+cada base de datos: su nombre es un hash de la URL de la base de datos y del directorio de la
+app, así otra instancia, un benchmark o un script en el mismo host con otra base de datos nunca
+lee la caché ni toca la generación, el limitador o el drenaje de esta. Cada ruta se puede fijar
+de forma explícita con su variable de entorno.
+"""
+
+import hashlib
+import os
+import tempfile
+from dotenv import load_dotenv
+
+# Estas rutas se calculan al importar los servicios, antes de que app.py cargue el .env
+load_dotenv()
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def database_url():
+    """URL de la base de datos principal tal como la configura app.py (MYSQL_URL o SQLite local)."""
+    url = os.getenv('MYSQL_URL')
+    if url and url.startswith('mysql://'):
+        # Normaliza a dialecto + driver de SQLAlchemy
+        url = url.replace('mysql://', 'mysql+pymysql://', 1)
+    return url or 'sqlite:///app.db'
+
+
+def namespace():
+    key = f'{database_url()}\n{APP_ROOT}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def shared_path(name):
+    """Ruta `name` dentro del directorio compartido de esta instalación y esta base de datos."""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, f'flaskapi-{namespace()}', name)
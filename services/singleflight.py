@@ -0,0 +1,63 @@
+"""
+Coalescencia de lecturas idénticas (single-flight).
+Si varias peticiones del mismo worker piden la misma clave a la vez, solo la primera ejecuta
+la consulta; las demás esperan y reciben el mismo resultado ya serializado (o la misma excepción).
+Las claves incluyen la generación de la caché de consultas: una petición que llega después de
+una escritura no se une a una lectura que empezó antes de ella y podría devolver el valor anterior.
+"""
+
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightTimeout(Exception):
+    """La petición líder no terminó dentro del tiempo de espera."""
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Ejecuta `fn` una sola vez por clave entre las llamadas concurrentes y comparte su resultado."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            if not call.event.wait(self.timeout):
+                raise SingleFlightTimeout(f'Tiempo de espera agotado para la lectura {key}')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.info(f'Lectura {key} compartida con {call.waiters} peticiones concurrentes')
+            call.event.set()
+        return call.result
@@ -0,0 +1,120 @@
+"""
+Perfil de SQLite para despliegues de un solo nodo (sin MYSQL_URL).
+Cada conexión aplica al abrirse los PRAGMA de rendimiento: WAL (los lectores no bloquean al
+escritor ni al revés), synchronous=NORMAL (en WAL solo se sincroniza en los checkpoints),
+mmap_size, cache_size y busy_timeout.
+Lecturas y escrituras usan engines separados sobre el mismo archivo:
+- escritor (engine por defecto): un pool de una conexión por worker y transacciones
+  BEGIN IMMEDIATE, así los hilos de un worker esperan en el pool en lugar de reintentar
+  contra el bloqueo de SQLite y una transacción nunca falla al pasar de lectura a escritura;
+- lector (bind `sqlite_reader`): varias conexiones con query_only y transacciones diferidas.
+`RoutingSession` envía los SELECT al lector y todo lo demás al escritor; una vez que la
+sesión escribe, el resto de su transacción sigue en el escritor para leer sus propios cambios.
+SQLITE_TUNED=0 vuelve a la configuración por defecto de SQLAlchemy.
+"""
+
+import os
+import logging
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+READER_BIND = 'sqlite_reader'
+WRITE_FLAG = 'escritura_sqlite'
+
+ENABLED = os.getenv('SQLITE_TUNED', '1') == '1'
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '32768'))
+READER_POOL_SIZE = int(os.getenv('SQLITE_READER_POOL_SIZE', '4'))
+WAL_AUTOCHECKPOINT = int(os.getenv('SQLITE_WAL_AUTOCHECKPOINT', '1000'))
+
+
+def applies_to(url):
+    """True si `url` es un archivo SQLite (las bases en memoria no usan el perfil)."""
+    url = make_url(url)
+    return ENABLED and url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def configure(app, url):
+    """
+    Fija las opciones de engine del escritor y el bind del lector en la configuración de
+    Flask-SQLAlchemy; se llama antes de `db.init_app`. Devuelve True si se aplicó el perfil.
+    """
+    if not applies_to(url):
+        return False
+    timeout = BUSY_TIMEOUT_MS / 1000
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 1,
+        'max_overflow': 0,
+        'pool_timeout': max(timeout, 30),
+        'connect_args': {'timeout': timeout},
+    }
+    app.config['SQLALCHEMY_BINDS'] = {
+        READER_BIND: {
+            'url': url,
+            'pool_size': READER_POOL_SIZE,
+            'max_overflow': READER_POOL_SIZE,
+            'pool_timeout': 30,
+            'connect_args': {'timeout': timeout},
+        },
+    }
+    logger.info(f'Perfil SQLite activo: WAL, synchronous=NORMAL, {READER_POOL_SIZE} lectores y un escritor por worker')
+    return True
+
+
+def register_engines(engines):
+    """Registra los PRAGMA y el tipo de transacción en los engines creados por `db.init_app`."""
+    if READER_BIND not in engines:
+        return
+    _register(engines[None], writer=True)
+    _register(engines[READER_BIND], writer=False)
+
+
+def _register(engine, writer):
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        # Sin la transacción implícita de pysqlite: el BEGIN lo emite el evento `begin`
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+            if writer:
+                cursor.execute('PRAGMA journal_mode = WAL')
+                cursor.execute(f'PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT}')
+            cursor.execute('PRAGMA synchronous = NORMAL')
+            cursor.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+            cursor.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+            cursor.execute('PRAGMA temp_store = MEMORY')
+            if not writer:
+                cursor.execute('PRAGMA query_only = 1')
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def _begin(conn):
+        conn.exec_driver_sql('BEGIN IMMEDIATE' if writer else 'BEGIN')
+
+
+class RoutingSession(Session):
+    """Sesión de Flask-SQLAlchemy que envía los SELECT al engine lector del perfil SQLite."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get(WRITE_FLAG):
+            reader = self._db.engines.get(READER_BIND)
+            if reader is not None:
+                if (not self._flushing and isinstance(clause, Select)
+                        and clause._for_update_arg is None):
+                    return reader
+                self.info[WRITE_FLAG] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def _end_write(session):
+    session.info.pop(WRITE_FLAG, None)
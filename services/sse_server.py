@@ -0,0 +1,195 @@
+"""
+Servidor del stream SSE de electrodomésticos en un proceso aparte con un bucle asyncio
+(SSE_SERVER=1, `flask --app app sse serve`).
+Cada conexión es una corrutina con su cola en memoria, no un hilo de un worker: miles de streams
+inactivos cuestan unos pocos KiB cada uno. Una sola tarea lee los eventos nuevos del archivo
+compartido del broker (en un hilo, para no bloquear el bucle) y los reparte a todas las colas.
+Atiende únicamente `GET /electrodomesticos/stream`, con los mismos filtros, Last-Event-ID y
+heartbeat que la ruta de la app; el JWT se verifica con `verify_jwt_in_request` de la app, así
+los errores (401, 422) tienen el mismo cuerpo. El proxy envía esa ruta a `SSE_PORT`.
+"""
+
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs, urlsplit
+from flask_jwt_extended import verify_jwt_in_request
+from services.event_broker import Subscription, event_broker
+import logging
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = '/electrodomesticos/stream'
+MAX_HEADER_BYTES = 16 * 1024
+REQUEST_TIMEOUT_SECONDS = 10
+REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 405: 'Method Not Allowed',
+           422: 'Unprocessable Entity', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class _Stream:
+    """Conexión abierta: filtros de la suscripción y cola asyncio de eventos pendientes."""
+
+    __slots__ = ('subscription', 'queue')
+
+    def __init__(self, filters, max_pending=100):
+        self.subscription = Subscription(filters)
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+
+class SSEServer:
+    def __init__(self, app, broker=event_broker, max_streams=10000, heartbeat=15.0, poll_interval=0.5):
+        self.app = app
+        self.broker = broker
+        self.max_streams = max_streams
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self._streams = set()
+
+    async def serve(self, host, port):
+        last_id = await asyncio.to_thread(self.broker.latest_id)
+        server = await asyncio.start_server(self._handle, host, port, limit=MAX_HEADER_BYTES)
+        logger.info(f'Servidor SSE escuchando en {host}:{port} (máximo {self.max_streams} streams)')
+        async with server:
+            poller = asyncio.create_task(self._poll(last_id))
+            try:
+                await server.serve_forever()
+            finally:
+                poller.cancel()
+
+    async def _poll(self, last_id):
+        while True:
+            try:
+                events = await asyncio.to_thread(self.broker.events_after, last_id)
+            except Exception as e:
+                logger.error(f'Error leyendo eventos del broker: {str(e)}')
+                events = []
+            for event_id, event in events:
+                last_id = event_id
+                self._dispatch(event_id, event)
+            await asyncio.sleep(self.poll_interval)
+
+    def _dispatch(self, event_id, event):
+        for stream in list(self._streams):
+            if not stream.subscription.matches(event):
+                continue
+            try:
+                stream.queue.put_nowait((event_id, event))
+            except asyncio.QueueFull:
+                # Cliente demasiado lento: se descarta el evento en lugar de bloquear al resto
+                logger.warning(f'Cola SSE llena, evento {event_id} descartado para un suscriptor')
+
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT_SECONDS)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                return
+            lines = head.decode('latin-1').split('\r\n')
+            try:
+                method, target, _ = lines[0].split(' ', 2)
+            except ValueError:
+                await self._respond(writer, 400, {'msg': 'Petición inválida'})
+                return
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(':')
+                if sep:
+                    headers[name.strip()] = value.strip()
+            await self._stream(writer, method, target, headers)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception:
+            logger.exception('Error en una conexión SSE')
+        finally:
+            writer.close()
+
+    async def _stream(self, writer, method, target, headers):
+        url = urlsplit(target)
+        if url.path.rstrip('/') != STREAM_PATH:
+            await self._respond(writer, 404, {'error': 'Not Found', 'msg': 'Recurso no encontrado'})
+            return
+        if method != 'GET':
+            await self._respond(writer, 405, {'msg': 'Método no permitido'})
+            return
+        error = self._authenticate(headers)
+        if error is not None:
+            await self._respond(writer, *error)
+            return
+        if len(self._streams) >= self.max_streams:
+            logger.warning('Stream SSE rechazado: el servidor no admite más streams')
+            await self._respond(writer, 503, {'mensaje': 'Demasiados streams abiertos, inténtalo más tarde'},
+                                {'Retry-After': '5'})
+            return
+
+        args = parse_qs(url.query)
+        filters = {'id': _int_or_none(args.get('id', [None])[0]), 'tipo': args.get('tipo', [None])[0],
+                   'marca': args.get('marca', [None])[0]}
+        last_event_id = _int_or_none(headers.get('Last-Event-ID'))
+        stream = _Stream(filters)
+        self._streams.add(stream)
+        logger.info(f'Nueva suscripción SSE con filtros {stream.subscription.filters} ({len(self._streams)} activas)')
+        try:
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                         b'X-Accel-Buffering: no\r\nConnection: close\r\n\r\n')
+            sent_id = last_event_id or 0
+            if last_event_id is not None:
+                replay = await asyncio.to_thread(self.broker.replay, stream.subscription, last_event_id)
+                for event_id, event in replay:
+                    sent_id = event_id
+                    writer.write(_format(event_id, event))
+            await writer.drain()
+            while True:
+                try:
+                    event_id, event = await asyncio.wait_for(stream.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Comentario SSE para mantener viva la conexión (y detectar clientes que se fueron)
+                    writer.write(b': keep-alive\n\n')
+                else:
+                    if event_id <= sent_id:
+                        continue
+                    sent_id = event_id
+                    writer.write(_format(event_id, event))
+                await writer.drain()
+        finally:
+            self._streams.discard(stream)
+            logger.info(f'Suscripción SSE cerrada ({len(self._streams)} activas)')
+
+    def _authenticate(self, headers):
+        """Verifica el JWT como `@jwt_required()`; devuelve None o (estado, cuerpo) del error."""
+        with self.app.test_request_context(STREAM_PATH, headers=headers):
+            try:
+                verify_jwt_in_request()
+                return None
+            except Exception as e:
+                response = self.app.make_response(self.app.handle_user_exception(e))
+                return response.status_code, response.get_json()
+
+    @staticmethod
+    async def _respond(writer, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        head = [f'HTTP/1.1 {status} {REASONS.get(status, "")}', 'Content-Type: application/json',
+                f'Content-Length: {len(data)}', 'Connection: close']
+        head += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _format(event_id, event):
+    return f'id: {event_id}\nevent: {event["evento"]}\ndata: {json.dumps(event)}\n\n'.encode('utf-8')
+
+
+def serve(app, host, port, max_streams):
+    server = SSEServer(
+        app,
+        max_streams=max_streams,
+        heartbeat=float(os.getenv('SSE_HEARTBEAT_SECONDS', '15')),
+        poll_interval=float(os.getenv('EVENTS_POLL_INTERVAL', '0.5')),
+    )
+    asyncio.run(server.serve(host, port))
@@ -0,0 +1,175 @@
+"""
+Buffer write-behind de los cambios de stock (`PUT /electrodomesticos/<id>/stock`).
+Cada cambio se añade al journal (tabla solo de inserciones en un archivo SQLite local con
+synchronous=FULL, compartido por los workers) antes de responder. Un hilo por worker vuelca el journal cada `flush_interval_ms` o en
+cuanto acumula `max_items` ids: coalesce el journal en memoria (último valor de cada id) y lo
+escribe en la base principal con un solo UPDATE por lote; después borra del journal lo volcado. Solo un worker
+vuelca a la vez (flock), así dos volcados nunca se aplican en desorden, y lo que quede en el
+journal tras una caída lo vuelca el siguiente worker que arranque.
+Las lecturas por id consultan el journal (índice por id) antes que la base de datos, así ven
+el valor pendiente desde cualquier worker; los listados y las estadísticas superponen `pending()`
+y usan `version()` en la clave de caché, así un cambio anotado nunca sirve un listado anterior.
+"""
+
+import fcntl
+import os
+import threading
+import time
+import logging
+
+from services.local_sqlite import LocalSQLite
+
+logger = logging.getLogger(__name__)
+
+STOCK_JOURNAL_SCHEMA = '''
+PRAGMA synchronous=FULL;
+CREATE TABLE IF NOT EXISTS stock_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    electrodomestico_id INTEGER NOT NULL,
+    en_stock INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_stock_journal_electrodomestico ON stock_journal (electrodomestico_id, seq);
+'''
+
+
+class StockBuffer:
+    def __init__(self, path, enabled=False, flush_interval_ms=200, max_items=500):
+        self.path = path
+        self.enabled = enabled
+        self.flush_interval_ms = flush_interval_ms
+        self.max_items = max_items
+        self._db = LocalSQLite(path, STOCK_JOURNAL_SCHEMA)
+        self._pending_ids = set()  # ids escritos por este worker desde su último volcado
+        self._lock = threading.Lock()
+        self._full = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+
+    def set(self, electrodomestico_id, en_stock):
+        """Registra el cambio en el journal (durable al volver). Devuelve su número de secuencia."""
+        cursor = self._db.connection().execute(
+            'INSERT INTO stock_journal (electrodomestico_id, en_stock, created_at) VALUES (?, ?, ?)',
+            (electrodomestico_id, int(en_stock), time.time()),
+        )
+        with self._lock:
+            self._pending_ids.add(electrodomestico_id)
+            if len(self._pending_ids) >= self.max_items:
+                self._full.set()
+        return cursor.lastrowid
+
+    def get(self, electrodomestico_id):
+        """Valor de stock pendiente de volcar (de cualquier worker), o None si no hay ninguno."""
+        if not self.enabled:
+            return None
+        row = self._db.connection().execute(
+            'SELECT en_stock FROM stock_journal WHERE electrodomestico_id = ? ORDER BY seq DESC LIMIT 1',
+            (electrodomestico_id,),
+        ).fetchone()
+        return bool(row[0]) if row else None
+
+    def pending(self):
+        """Último valor pendiente de cada id ({id: en_stock}) de todos los workers; vacío si está desactivado."""
+        if not self.enabled:
+            return {}
+        rows = self._db.connection().execute(
+            'SELECT electrodomestico_id, en_stock FROM stock_journal ORDER BY seq'
+        ).fetchall()
+        return {electrodomestico_id: bool(en_stock) for electrodomestico_id, en_stock in rows}
+
+    def version(self):
+        """Secuencia del último cambio anotado por cualquier worker (AUTOINCREMENT nunca la reutiliza); 0 si no hay."""
+        if not self.enabled:
+            return 0
+        row = self._db.connection().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'stock_journal'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def discard(self, electrodomestico_id):
+        """
+        Olvida los cambios pendientes de un id (una escritura directa de en_stock o un borrado los
+        sustituye). Espera a que termine el volcado en curso para que no la pise con un valor anterior.
+        """
+        if not self.enabled:
+            return
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._db.connection().execute('DELETE FROM stock_journal WHERE electrodomestico_id = ?',
+                                              (electrodomestico_id,))
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def start(self, app, apply):
+        """Arranca (una vez por proceso) el hilo que vuelca el journal con `apply({id: en_stock})` en el contexto de la app."""
+        if not self.enabled or (self._thread is not None and self._thread_pid == os.getpid()):
+            return
+        self._pending_ids = set()
+        self._thread_pid = os.getpid()
+        self._thread = threading.Thread(target=self._loop, args=(app, apply), name='stock-buffer', daemon=True)
+        self._thread.start()
+
+    def _loop(self, app, apply):
+        while True:
+            self._full.wait(self.flush_interval_ms / 1000)
+            self._full.clear()
+            with self._lock:
+                self._pending_ids = set()
+            with app.app_context():
+                self.flush(apply)
+
+    def flush(self, apply):
+        """
+        Vuelca el journal por lotes de hasta `max_items` ids. Devuelve cuántos ids se escribieron,
+        o None si otro worker está volcando (ese volcado incluye también nuestros cambios).
+        """
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            try:
+                total = 0
+                while True:
+                    last_seq, changes = self._read_batch()
+                    if not changes:
+                        break
+                    start = time.perf_counter()
+                    apply(changes)
+                    # Solo tras confirmar en la base principal: si el proceso cae antes, se vuelve a aplicar
+                    self._db.connection().execute('DELETE FROM stock_journal WHERE seq <= ?', (last_seq,))
+                    total += len(changes)
+                    logger.info(f'Volcados {len(changes)} cambios de stock en '
+                                f'{(time.perf_counter() - start) * 1000:.1f} ms')
+                    if len(changes) < self.max_items:
+                        break
+                return total
+            except Exception as e:
+                logger.error(f'No se pudo volcar el buffer de stock (se reintentará): {str(e)}')
+                return None
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_batch(self):
+        """Lee el journal en orden y coalesce por id hasta juntar `max_items` ids; devuelve (última seq, cambios)."""
+        changes = {}
+        last_seq = None
+        cursor = self._db.connection().execute(
+            'SELECT seq, electrodomestico_id, en_stock FROM stock_journal ORDER BY seq'
+        )
+        for seq, electrodomestico_id, en_stock in cursor:
+            if electrodomestico_id not in changes and len(changes) >= self.max_items:
+                break
+            changes[electrodomestico_id] = bool(en_stock)
+            last_seq = seq
+        cursor.close()
+        return last_seq, changes
+
+
+stock_buffer = StockBuffer(
+    os.getenv('STOCK_JOURNAL_PATH', 'stock_journal.db'),
+    enabled=os.getenv('STOCK_WRITE_BEHIND', '0') == '1',
+    flush_interval_ms=int(os.getenv('STOCK_FLUSH_INTERVAL_MS', '200')),
+    max_items=int(os.getenv('STOCK_FLUSH_MAX_ITEMS', '500')),
+)
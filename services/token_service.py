@@ -0,0 +1,278 @@
+"""
+Servicio de tokens JWT.
+Agrega a flask_jwt_extended una caché LRU de firmas ya verificadas (la firma de un token se
+comprueba una sola vez por clave) y un conjunto de claves con `kid` para firmar con RS256/EdDSA
+y rotar claves sin reiniciar la aplicación.
+"""
+
+import glob
+import hashlib
+import os
+import sys
+import secrets
+import threading
+import time
+from collections import OrderedDict
+import logging
+
+import jwt as pyjwt
+from jwt.algorithms import Algorithm
+from flask_jwt_extended import JWTManager
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ('RS256', 'RS384', 'RS512', 'ES256', 'ES384', 'EdDSA')
+
+
+class VerifiedSignatureCache:
+    """
+    Caché LRU de firmas verificadas, indexada por la identidad de la clave (kid y huella) y el
+    SHA-256 del token. Al rotar o borrar una clave sus entradas dejan de alcanzarse y `clear` las
+    descarta; la caducidad y demás claims se siguen comprobando en cada decodificación.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(identity, signing_input, signature):
+        # El signing input es base64url con un punto: el separador no puede aparecer en él
+        return identity, hashlib.sha256(signing_input + b'\0' + signature).digest()
+
+    def contains(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def add(self, key):
+        with self._lock:
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class VerificationKey:
+    """Clave de verificación que devuelve `decode_key_loader`, con su identidad (kid, huella)."""
+
+    __slots__ = ('key', 'identity')
+
+    def __init__(self, key, identity):
+        self.key = key
+        self.identity = identity
+
+
+class CachedVerification(Algorithm):
+    """
+    Algoritmo de PyJWT que envuelve al registrado para el mismo `alg` (API pública
+    `register_algorithm`) y se salta la verificación de una firma ya comprobada con la misma
+    clave. Solo cachea cuando la clave llega como `VerificationKey`, es decir, desde el
+    `decode_key_loader` de la app; firmar y cualquier otra clave van directamente al original.
+    """
+
+    def __init__(self, algorithm, cache):
+        self.algorithm = algorithm
+        self.cache = cache
+
+    def prepare_key(self, key):
+        if isinstance(key, VerificationKey):
+            return VerificationKey(self.algorithm.prepare_key(key.key), key.identity)
+        return self.algorithm.prepare_key(key)
+
+    def check_key_length(self, key):
+        return self.algorithm.check_key_length(key.key if isinstance(key, VerificationKey) else key)
+
+    def sign(self, msg, key):
+        return self.algorithm.sign(msg, key)
+
+    def verify(self, msg, key, sig):
+        if not isinstance(key, VerificationKey):
+            return self.algorithm.verify(msg, key, sig)
+        cache_key = self.cache.key(key.identity, msg, sig)
+        if self.cache.contains(cache_key):
+            return True
+        if not self.algorithm.verify(msg, key.key, sig):
+            return False
+        self.cache.add(cache_key)
+        return True
+
+    def to_jwk(self, key_obj, as_dict=False):
+        return self.algorithm.to_jwk(key_obj, as_dict=as_dict)
+
+    def from_jwk(self, jwk):
+        return self.algorithm.from_jwk(jwk)
+
+
+def install_verification_cache(algorithm, cache):
+    """Registra en PyJWT el algoritmo con caché en lugar del original (una vez por `configure_jwt`)."""
+    original = pyjwt.get_algorithm_by_name(algorithm)
+    if isinstance(original, CachedVerification):
+        original = original.algorithm
+    pyjwt.unregister_algorithm(algorithm)
+    pyjwt.register_algorithm(algorithm, CachedVerification(original, cache))
+
+
+def _fingerprint(key):
+    if isinstance(key, (str, bytes)):
+        secret = key.encode('utf-8') if isinstance(key, str) else key
+        return hashlib.sha256(secret).hexdigest()
+    from cryptography.hazmat.primitives import serialization
+    der = key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return hashlib.sha256(der).hexdigest()
+
+
+class KeySet:
+    """
+    Conjunto de claves de firma identificadas por `kid`.
+
+    Con algoritmos asimétricos se leen los archivos `<kid>.pem` de `keys_dir`: la clave activa
+    (archivo `active` del directorio o `JWT_ACTIVE_KID`) firma y todas las públicas verifican.
+    Para rotar basta con añadir la nueva clave, cambiar `active` y borrar la antigua cuando
+    expiren sus tokens; el directorio se vuelve a leer al ver un `kid` desconocido.
+    Cada clave de verificación lleva su identidad (kid y huella de la clave o del secreto); si al
+    recargar desaparece o cambia alguna, se llama a `on_rotate` (vacía la caché de firmas).
+    """
+
+    def __init__(self, algorithm, secret=None, keys_dir=None, active_kid=None, reload_interval=30,
+                 on_rotate=None):
+        self.algorithm = algorithm
+        self.secret = secret
+        self.on_rotate = on_rotate
+        self.keys_dir = keys_dir
+        self.default_active_kid = active_kid
+        self.reload_interval = reload_interval
+        self.active_kid = None
+        self._signing_key = None
+        self._verification_keys = {}
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+        self._secret_key = None
+        if self.is_asymmetric:
+            self.reload()
+        elif secret is not None:
+            self._secret_key = VerificationKey(secret, ('', _fingerprint(secret)))
+
+    @property
+    def is_asymmetric(self):
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def reload(self):
+        try:
+            from cryptography.hazmat.primitives import serialization
+        except ImportError as e:
+            raise RuntimeError(f'El algoritmo {self.algorithm} requiere el paquete cryptography') from e
+
+        signing_keys = {}
+        verification_keys = {}
+        for path in glob.glob(os.path.join(self.keys_dir, '*.pem')):
+            kid = os.path.splitext(os.path.basename(path))[0]
+            with open(path, 'rb') as f:
+                pem = f.read()
+            if b'PRIVATE KEY' in pem:
+                private_key = serialization.load_pem_private_key(pem, password=None)
+                signing_keys[kid] = private_key
+                public_key = private_key.public_key()
+            else:
+                public_key = serialization.load_pem_public_key(pem)
+            verification_keys[kid] = VerificationKey(public_key, (kid, _fingerprint(public_key)))
+
+        active_path = os.path.join(self.keys_dir, 'active')
+        active_kid = self.default_active_kid
+        if os.path.exists(active_path):
+            with open(active_path) as f:
+                active_kid = f.read().strip()
+        if active_kid not in signing_keys:
+            raise RuntimeError(f'No hay clave privada para el kid activo "{active_kid}" en {self.keys_dir}')
+
+        with self._lock:
+            previous = {key.identity for key in self._verification_keys.values()}
+            self.active_kid = active_kid
+            self._signing_key = signing_keys[active_kid]
+            self._verification_keys = verification_keys
+            self._loaded_at = time.time()
+        if self.on_rotate is not None and previous - {key.identity for key in verification_keys.values()}:
+            self.on_rotate()
+        logger.info(f'Claves JWT cargadas: activa "{active_kid}", {len(verification_keys)} de verificación')
+
+    def _maybe_reload(self):
+        if time.time() - self._loaded_at < self.reload_interval:
+            return
+        try:
+            self.reload()
+        except (OSError, ValueError, RuntimeError) as e:
+            # Se conservan las claves anteriores si el directorio está a medio rotar
+            logger.error(f'No se pudieron recargar las claves JWT: {str(e)}')
+            self._loaded_at = time.time()
+
+    def signing_key(self, identity=None):
+        if not self.is_asymmetric:
+            return self.secret
+        self._maybe_reload()
+        return self._signing_key
+
+    def verification_key(self, headers, payload=None):
+        if not self.is_asymmetric:
+            return self._secret_key
+        kid = headers.get('kid')
+        key = self._verification_keys.get(kid)
+        if key is None:
+            self._maybe_reload()
+            key = self._verification_keys.get(kid)
+        if key is None:
+            raise pyjwt.InvalidTokenError(f'kid desconocido: {kid}')
+        return key
+
+    def headers(self, identity=None):
+        return {'kid': self.active_kid} if self.is_asymmetric else {}
+
+
+def configure_jwt(app):
+    """Configura algoritmo, claves, refresh tokens y caché de verificación a partir del entorno."""
+    algorithm = os.getenv('JWT_ALGORITHM', 'HS256')
+    app.config['JWT_ALGORITHM'] = algorithm
+    app.config['JWT_DECODE_ALGORITHMS'] = [algorithm]
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', '900'))
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES', str(30 * 24 * 3600)))
+
+    secret = os.getenv('JWT_SECRET_KEY')
+    if algorithm not in ASYMMETRIC_ALGORITHMS and not secret:
+        if 'gunicorn.arbiter' in sys.modules:
+            # Un secreto aleatorio por worker haría que cada worker rechazara los tokens de los demás;
+            # gunicorn.conf.py lo genera una sola vez en el master, este es otro archivo de configuración
+            raise RuntimeError('JWT_SECRET_KEY no definido: con gunicorn hay que definirlo o usar gunicorn.conf.py')
+        # Sin clave por defecto en el código: un secreto aleatorio solo sirve para desarrollo en un proceso
+        logger.warning('JWT_SECRET_KEY no definido. Usando un secreto aleatorio; '
+                       'los tokens no serán válidos tras reiniciar.')
+        secret = secrets.token_urlsafe(64)
+    app.config['JWT_SECRET_KEY'] = secret
+
+    signature_cache = VerifiedSignatureCache(int(os.getenv('JWT_VERIFY_CACHE_SIZE', '10000')))
+    install_verification_cache(algorithm, signature_cache)
+    key_set = KeySet(
+        algorithm,
+        secret=secret,
+        keys_dir=os.getenv('JWT_KEYS_DIR', 'keys'),
+        active_kid=os.getenv('JWT_ACTIVE_KID'),
+        on_rotate=signature_cache.clear,
+    )
+
+    jwt = JWTManager(app)
+    jwt.encode_key_loader(key_set.signing_key)
+    jwt.decode_key_loader(key_set.verification_key)
+    jwt.additional_headers_loader(key_set.headers)
+    app.extensions['jwt_key_set'] = key_set
+    app.extensions['jwt_signature_cache'] = signature_cache
+    logger.info(f'JWT configurado con algoritmo {algorithm}')
+    return jwt
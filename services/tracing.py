@@ -0,0 +1,333 @@
+"""
+Trazas de peticiones lentas con spans por capa.
+Cada petición abre una traza; los métodos estáticos de servicios y repositorios (`traced_class`),
+las sentencias SQL (eventos del Engine) y la serialización JSON añaden spans con su duración, y
+el hook de la respuesta anota el código de estado y devuelve la cabecera X-Trace-Id. Al terminar la petición se decide si guardarla (muestreo por cola): solo se
+exportan las trazas lentas (TRACE_SLOW_MS), las que terminan en error y una fracción aleatoria
+opcional (TRACE_SAMPLE_RATE). La exportación va a un archivo JSONL (TRACE_JSONL_PATH) o a un
+colector OTLP/HTTP en JSON (TRACE_OTLP_ENDPOINT) desde un hilo aparte.
+Con TRACING_ENABLED desactivado no se envuelve ningún método ni se registran hooks.
+"""
+
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+
+logger = logging.getLogger(__name__)
+
+_current_trace = ContextVar('trace', default=None)
+_current_span = ContextVar('span', default=None)
+
+
+class Trace:
+    __slots__ = ('trace_id', 'name', 'start_time', 'start', 'end', 'spans', 'status', 'error', 'discarded', '_ids')
+
+    def __init__(self, name):
+        self.trace_id = secrets.token_hex(16)
+        self.name = name
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = []
+        self.status = None
+        self.error = None
+        self.discarded = False
+        self._ids = 0
+
+    def next_id(self):
+        self._ids += 1
+        return self._ids
+
+    def add(self, span_id, parent_id, name, layer, start, end, error=None, attributes=None):
+        self.spans.append((span_id, parent_id, name, layer, start, end, error, attributes))
+
+    def duration_ms(self):
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'start_time': self.start_time,
+            'duration_ms': round(self.duration_ms(), 3),
+            'status': self.status,
+            'error': self.error,
+            'spans': [
+                {
+                    'span_id': span_id,
+                    'parent_id': parent_id,
+                    'name': name,
+                    'layer': layer,
+                    'offset_ms': round((start - self.start) * 1000, 3),
+                    'duration_ms': round((end - start) * 1000, 3),
+                    'error': error,
+                    'attributes': attributes,
+                }
+                for span_id, parent_id, name, layer, start, end, error, attributes in self.spans
+            ],
+        }
+
+    def to_otlp(self):
+        """Traza en el formato JSON de OTLP/HTTP (resourceSpans)."""
+        base_ns = int(self.start_time * 1e9)
+
+        def ns(value):
+            return str(base_ns + int((value - self.start) * 1e9))
+
+        def span_id(value):
+            return f'{value:016x}'
+
+        root_id = span_id(0xffffffff)
+        spans = [{
+            'traceId': self.trace_id,
+            'spanId': root_id,
+            'name': self.name,
+            'kind': 2,
+            'startTimeUnixNano': ns(self.start),
+            'endTimeUnixNano': ns(self.end or time.perf_counter()),
+            'attributes': [{'key': 'http.status_code', 'value': {'intValue': str(self.status or 0)}}],
+            'status': {'code': 2 if self.error or (self.status or 0) >= 500 else 1},
+        }]
+        for sid, parent_id, name, layer, start, end, error, attributes in self.spans:
+            attrs = [{'key': 'layer', 'value': {'stringValue': layer}}]
+            attrs += [{'key': k, 'value': {'stringValue': str(v)}} for k, v in (attributes or {}).items()]
+            spans.append({
+                'traceId': self.trace_id,
+                'spanId': span_id(sid),
+                'parentSpanId': span_id(parent_id) if parent_id else root_id,
+                'name': name,
+                'kind': 3 if layer == 'sql' else 1,
+                'startTimeUnixNano': ns(start),
+                'endTimeUnixNano': ns(end),
+                'attributes': attrs,
+                'status': {'code': 2 if error else 1, **({'message': error} if error else {})},
+            })
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'flaskapi'}}]},
+                'scopeSpans': [{'scope': {'name': 'services.tracing'}, 'spans': spans}],
+            }]
+        }
+
+
+class TraceExporter:
+    """Exporta las trazas muestreadas desde un hilo propio; si la cola se llena, se descartan."""
+
+    def __init__(self, jsonl_path=None, otlp_endpoint=None, max_queue=1000):
+        self.jsonl_path = jsonl_path
+        self.otlp_endpoint = otlp_endpoint.rstrip('/') if otlp_endpoint else None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def export(self, trace):
+        if self._thread is None or self._thread_pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._thread_pid != os.getpid():
+                    self._thread_pid = os.getpid()
+                    self._thread = threading.Thread(target=self._loop, name='trace-exporter', daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _loop(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                if self.otlp_endpoint:
+                    request = urllib.request.Request(
+                        f'{self.otlp_endpoint}/v1/traces',
+                        data=json.dumps(trace.to_otlp()).encode('utf-8'),
+                        headers={'Content-Type': 'application/json'},
+                        method='POST',
+                    )
+                    urllib.request.urlopen(request, timeout=2).close()
+                if self.jsonl_path:
+                    line = json.dumps(trace.to_dict(), ensure_ascii=False) + '\n'
+                    # Una sola escritura en modo append por traza: las líneas de varios workers no se mezclan
+                    with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                        f.write(line)
+            except Exception as e:
+                logger.warning(f'No se pudo exportar la traza {trace.trace_id}: {str(e)}')
+
+
+class Tracer:
+    def __init__(self, enabled=False, slow_ms=500.0, sample_rate=0.0, exporter=None, max_statement_chars=300):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.max_statement_chars = max_statement_chars
+
+    # =========================
+    # Trazas y spans
+    # =========================
+    def start_trace(self, name):
+        trace = Trace(name)
+        _current_trace.set(trace)
+        _current_span.set(None)
+        return trace
+
+    def finish_trace(self, error=None):
+        trace = _current_trace.get()
+        if trace is None:
+            return None
+        _current_trace.set(None)
+        trace.end = time.perf_counter()
+        trace.error = trace.error or error
+        if trace.discarded:
+            return None
+        # Muestreo por cola: la decisión se toma con la traza completa
+        keep = (trace.error is not None or (trace.status or 0) >= 500 or trace.duration_ms() >= self.slow_ms
+                or (self.sample_rate and random.random() < self.sample_rate))
+        if keep and self.exporter is not None:
+            self.exporter.export(trace)
+        return trace
+
+    @staticmethod
+    def current_trace():
+        return _current_trace.get()
+
+    @contextmanager
+    def span(self, name, layer, **attributes):
+        trace = _current_trace.get()
+        if trace is None:
+            yield
+            return
+        span_id = trace.next_id()
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            trace.add(span_id, parent_id, name, layer, start, time.perf_counter(), error, attributes or None)
+
+    def wrap(self, fn, name, layer):
+        """Envuelve `fn` en un span; sin traza activa solo cuesta una lectura de ContextVar."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            span_id = trace.next_id()
+            parent_id = _current_span.get()
+            token = _current_span.set(span_id)
+            start = time.perf_counter()
+            error = None
+            try:
+                return fn(*args, **kwargs)
+            except BaseException as e:
+                error = type(e).__name__
+                raise
+            finally:
+                _current_span.reset(token)
+                trace.add(span_id, parent_id, name, layer, start, time.perf_counter(), error)
+        return wrapper
+
+    # =========================
+    # Integración con Flask y SQLAlchemy
+    # =========================
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        from flask import request
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        @app.before_request
+        def _start_request_trace():
+            self.start_trace(f'{request.method} {request.url_rule.rule if request.url_rule else request.path}')
+
+        @app.after_request
+        def _record_response(response):
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.status = response.status_code
+                response.headers['X-Trace-Id'] = trace.trace_id
+                if response.is_streamed:
+                    # Los streams (SSE) duran lo que dure el cliente: no son peticiones lentas
+                    trace.discarded = True
+            return response
+
+        @app.teardown_request
+        def _finish_request_trace(exc):
+            self.finish_trace(type(exc).__name__ if exc is not None else None)
+
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def _before_sql(conn, cursor, statement, parameters, context, executemany):
+            if _current_trace.get() is not None:
+                conn.info.setdefault('trace_sql_start', []).append(time.perf_counter())
+
+        @event.listens_for(Engine, 'after_cursor_execute')
+        def _after_sql(conn, cursor, statement, parameters, context, executemany):
+            trace = _current_trace.get()
+            starts = conn.info.get('trace_sql_start')
+            if trace is None or not starts:
+                return
+            trace.add(trace.next_id(), _current_span.get(), 'sql', 'sql', starts.pop(), time.perf_counter(),
+                      None, {'statement': statement[:self.max_statement_chars], 'executemany': executemany})
+
+        @event.listens_for(Engine, 'handle_error')
+        def _sql_error(context):
+            trace = _current_trace.get()
+            starts = context.connection.info.get('trace_sql_start') if context.connection is not None else None
+            if trace is None or not starts:
+                return
+            trace.add(trace.next_id(), _current_span.get(), 'sql', 'sql', starts.pop(), time.perf_counter(),
+                      type(context.original_exception).__name__,
+                      {'statement': (context.statement or '')[:self.max_statement_chars]})
+
+        logger.info(f'Trazas activas: se exportan las peticiones de más de {self.slow_ms} ms y las fallidas')
+
+
+def _build_exporter():
+    otlp_endpoint = os.getenv('TRACE_OTLP_ENDPOINT')
+    jsonl_path = os.getenv('TRACE_JSONL_PATH', '' if otlp_endpoint else 'traces.jsonl')
+    return TraceExporter(jsonl_path=jsonl_path or None, otlp_endpoint=otlp_endpoint)
+
+
+tracer = Tracer(
+    enabled=os.getenv('TRACING_ENABLED', '0') == '1',
+    slow_ms=float(os.getenv('TRACE_SLOW_MS', '500')),
+    sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', '0')),
+    exporter=_build_exporter(),
+)
+
+
+def traced_class(layer):
+    """
+    Decorador de clase: envuelve en un span cada método estático público (no generador).
+    Si las trazas están desactivadas devuelve la clase sin tocar.
+    """
+    def decorator(cls):
+        if not tracer.enabled:
+            return cls
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_') or not isinstance(value, staticmethod):
+                continue
+            fn = value.__func__
+            if inspect.isgeneratorfunction(fn):
+                continue
+            setattr(cls, attr, staticmethod(tracer.wrap(fn, f'{cls.__name__}.{attr}', layer)))
+        return cls
+    return decorator
@@ -5,17 +5,31 @@ Puedes crear más servicios siguiendo este ejemplo.
 """
 
 from repositories.user_repository import UserRepository
+from services.tracing import traced_class
 from werkzeug.security import generate_password_hash, check_password_hash
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import csv
+import io
+import json
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+@traced_class('service')
 class UserService:
 
     @staticmethod
     def register_user(username, password):
         from models.db import db
+        username = UserService.normalize_username(username)
         logger.info(f'Registrando usuario en servicio: {username}')
+        if not username:
+            return {'error': 'Nombre inválido', 'username': username}
+        if UserService.is_reserved(username):
+            logger.warning(f'Intento de registro con nombre reservado: {username}')
+            return {'error': 'Nombre reservado', 'username': username}
         # Validar si el usuario ya existe
         existing_user = UserRepository.get_by_username(username, db.session)
         if existing_user:
@@ -26,10 +40,26 @@ class UserService:
         logger.info(f'Usuario creado en servicio: {user.username} (ID: {user.id})')
         return user
 
+    @staticmethod
+    def create_admin(username, password):
+        """Crea un administrador (también con un nombre reservado); solo desde la CLI."""
+        from models.db import db
+        username = UserService.normalize_username(username)
+        logger.info(f'Creando administrador en servicio: {username}')
+        if UserRepository.get_by_username(username, db.session):
+            return {'error': 'Usuario ya existe', 'username': username}
+        return UserRepository.create_user(username, generate_password_hash(password), db.session, is_admin=True)
+
+    @staticmethod
+    def set_admin(username, is_admin):
+        """Concede o retira los permisos de administración; devuelve None si el usuario no existe."""
+        from models.db import db
+        return UserRepository.set_admin(username, is_admin, db.session)
 
     @staticmethod
     def authenticate(username, password):
         from models.db import db
+        username = UserService.normalize_username(username)
         logger.info(f'Autenticando usuario en servicio: {username}')
         user = UserRepository.get_by_username(username, db.session)
         if user and check_password_hash(user.password, password):
@@ -39,6 +69,27 @@ class UserService:
         return None
 
 
+    @staticmethod
+    def is_admin(user_id):
+        """Un usuario es administrador si tiene `is_admin`, que solo se concede desde la CLI."""
+        from models.db import db
+        user = UserRepository.get_by_id(int(user_id), db.session)
+        return user is not None and user.is_admin
+
+    @staticmethod
+    def reserved_usernames():
+        """Nombres de ADMIN_USERNAMES (separados por coma): no se pueden registrar por la API ni en bloque."""
+        return {u.strip() for u in os.getenv('ADMIN_USERNAMES', '').split(',') if u.strip()}
+
+    @staticmethod
+    def normalize_username(username):
+        """Nombre tal como se guarda y se busca: sin espacios al principio ni al final."""
+        return username.strip()
+
+    @staticmethod
+    def is_reserved(username):
+        return username.strip() in UserService.reserved_usernames()
+
     @staticmethod
     def get_all_users():
         from models.db import db
@@ -47,6 +98,81 @@ class UserService:
         logger.info(f'{len(users)} usuarios obtenidos en servicio')
         return users
 
+    @staticmethod
+    def parse_user_records(content, fmt):
+        """Convierte un CSV (cabecera username,password) o un JSONL en una lista de dicts."""
+        if fmt == 'csv':
+            return list(csv.DictReader(io.StringIO(content)))
+        if fmt == 'jsonl':
+            return [json.loads(line) for line in content.splitlines() if line.strip()]
+        raise ValueError(f'Formato no soportado: {fmt}')
+
+    @staticmethod
+    def bulk_register(records, batch_size=1000, workers=None, hash_method=None):
+        """
+        Registra usuarios en bloque.
+        Descarta inválidos, repetidos y nombres reservados (ADMIN_USERNAMES), consulta los existentes por bloques, calcula los hashes
+        en un pool de procesos e inserta por lotes. Un registro puede traer `password_hash`
+        ya calculado (migraciones) en lugar de `password`. `hash_method` (o BULK_PASSWORD_HASH_METHOD)
+        permite elegir el método de werkzeug, por ejemplo "pbkdf2:sha256:100000".
+        """
+        from models.db import db
+        logger.info(f'Registro masivo en servicio: {len(records)} registros')
+        summary = {'received': len(records), 'created': 0, 'existing': 0, 'duplicated': 0, 'invalid': 0, 'reserved': 0}
+        reserved = UserService.reserved_usernames()
+
+        candidates = {}
+        for record in records:
+            if not isinstance(record, dict):
+                summary['invalid'] += 1
+                continue
+            username, password, password_hash = record.get('username'), record.get('password'), record.get('password_hash')
+            # Un JSON puede traer cualquier tipo: el registro se cuenta como inválido en lugar de abortar el alta
+            if type(username) is not str or not all(v is None or type(v) is str for v in (password, password_hash)):
+                summary['invalid'] += 1
+                continue
+            username = UserService.normalize_username(username)
+            if (not username or len(username) > 80 or not (password or password_hash)
+                    or len(password or '') > 1024 or len(password_hash or '') > 255):
+                summary['invalid'] += 1
+                continue
+            if username in reserved:
+                summary['reserved'] += 1
+                continue
+            if username in candidates:
+                summary['duplicated'] += 1
+                continue
+            candidates[username] = record
+
+        existing = UserRepository.get_existing_usernames(candidates.keys(), db.session)
+        summary['existing'] = len(existing)
+        pending = [(u, r) for u, r in candidates.items() if u not in existing]
+
+        to_hash = [r['password'] for _, r in pending if not r.get('password_hash')]
+        hash_method = hash_method or os.getenv('BULK_PASSWORD_HASH_METHOD')
+        hashes = iter(UserService._hash_passwords(to_hash, workers, hash_method))
+        rows = [
+            {'username': u, 'password': r.get('password_hash') or next(hashes)}
+            for u, r in pending
+        ]
+
+        for start in range(0, len(rows), batch_size):
+            summary['created'] += UserRepository.bulk_create(rows[start:start + batch_size], db.session)
+        logger.info(f'Registro masivo completado en servicio: {summary}')
+        return summary
+
+    @staticmethod
+    def _hash_passwords(passwords, workers=None, hash_method=None):
+        # El hash domina el coste del alta masiva; con pocos usuarios no compensa arrancar procesos
+        hasher = partial(generate_password_hash, method=hash_method) if hash_method else generate_password_hash
+        if len(passwords) < 64 or workers == 1:
+            return [hasher(p) for p in passwords]
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(passwords) // (workers * 8))
+        logger.info(f'Calculando {len(passwords)} hashes con {workers} procesos')
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(hasher, passwords, chunksize=chunksize))
+
 """
 Para crear más servicios:
 1. Crea un archivo en la carpeta services (ejemplo: product_service.py).
@@ -0,0 +1,82 @@
+"""
+Calentamiento del catálogo al arrancar (CATALOG_WARMUP=1).
+Antes de atender tráfico se cargan los listados más pedidos: todos los electrodomésticos en
+stock y los listados de los `WARMUP_TOP` tipos y marcas con más filas, ya serializados en JSON
+en la caché de listados (y el catálogo columnar si está activo), hasta `WARMUP_MAX_BYTES`.
+Con gunicorn y `preload_app` (ver gunicorn.conf.py) se hace una sola vez en el master antes del
+fork: los workers heredan la caché en memoria copy-on-write y arrancan ya calientes. Sin
+preload (`PRELOAD_APP=0`, `flask run`) cada proceso calienta en un hilo y la puerta de
+calentamiento retiene las peticiones hasta `WARMUP_GATE_TIMEOUT_MS`; /health/ready responde 503
+mientras tanto. Con varios workers sin preload lo que calienta cada uno sigue valiendo: la caché
+se invalida una sola vez en el master de gunicorn antes de crearlos, no cada worker al importar
+la app, así un worker que arranca después no descarta lo que otro ya ha calentado.
+"""
+
+import gc
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogWarmup:
+    def __init__(self, enabled=False, max_bytes=128 * 1024 * 1024, top=5, gate_timeout_ms=10000, in_master=False):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.top = top
+        self.gate_timeout_ms = gate_timeout_ms
+        self.in_master = in_master
+        self.summary = None
+        self._done = threading.Event()
+        if not enabled:
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def configure(self, app, warm):
+        """
+        Calienta con `warm(max_bytes, top)` en el contexto de la app: en el master (preload) de
+        forma síncrona antes del fork; si no, en un hilo de este proceso.
+        """
+        if not self.enabled:
+            return
+        if self.in_master:
+            self._run(app, warm)
+            # Los objetos ya creados no los recorre el GC de los workers: no se copian sus páginas
+            gc.freeze()
+        else:
+            threading.Thread(target=self._run, args=(app, warm), name='catalog-warmup', daemon=True).start()
+
+    def _run(self, app, warm):
+        start = time.perf_counter()
+        try:
+            with app.app_context():
+                self.summary = warm(self.max_bytes, self.top)
+            logger.info(f'Catálogo calentado en {(time.perf_counter() - start) * 1000:.0f} ms: '
+                        f'{self.summary["listados"]} listados, {self.summary["bytes"] / 1024 / 1024:.1f} MiB')
+        except Exception as e:
+            # Sin calentar el worker sigue siendo correcto: solo más lento al principio
+            logger.error(f'No se pudo calentar el catálogo: {str(e)}')
+        finally:
+            self._done.set()
+
+    def wait(self):
+        """Espera al calentamiento como mucho `gate_timeout_ms`; True si terminó."""
+        return self._done.wait(self.gate_timeout_ms / 1000)
+
+    def status(self):
+        return {'ready': self.ready, 'in_master': self.in_master, **(self.summary or {})}
+
+
+catalog_warmup = CatalogWarmup(
+    enabled=os.getenv('CATALOG_WARMUP', '0') == '1',
+    max_bytes=int(os.getenv('WARMUP_MAX_BYTES', str(128 * 1024 * 1024))),
+    top=int(os.getenv('WARMUP_TOP', '5')),
+    gate_timeout_ms=int(os.getenv('WARMUP_GATE_TIMEOUT_MS', '10000')),
+    # Lo define gunicorn.conf.py cuando carga la app en el master (preload_app)
+    in_master=os.getenv('WARMUP_IN_MASTER', '0') == '1',
+)
@@ -0,0 +1,33 @@
+import os
+import random
+
+import pytest
+from flask import Flask
+from sqlalchemy import insert, text
+
+from models.db import db
+from models.electrodomesticos import Electrodomestico
+
+TIPOS = ['Nevera', 'Lavadora', 'Microondas', 'Horno', 'Lavavajillas', 'Televisor']
+MARCAS = ['Samsung', 'LG', 'Whirlpool', 'Bosch', 'Mabe', 'Haceb']
+
+
+@pytest.fixture(scope='session')
+def catalog_db(tmp_path_factory):
+    """App mínima con una base SQLite temporal y el esquema de los modelos, con 5000 electrodomésticos."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(tmp_path_factory.mktemp("db"), "catalog.db")}'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        rng = random.Random(0)
+        # Precios enteros con muchos repetidos: el id tiene que deshacer los empates
+        db.session.execute(insert(Electrodomestico), [
+            {'marca': rng.choice(MARCAS), 'modelo': f'MOD-{rng.randrange(10 ** 6):06d}-{i}', 'tipo': rng.choice(TIPOS),
+             'precio': float(rng.randrange(100, 200)), 'en_stock': rng.random() < 0.8}
+            for i in range(5000)
+        ])
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        yield db.session
+        db.session.remove()
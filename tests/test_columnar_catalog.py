@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from services import columnar_catalog as columnar  # noqa: E402
+from services.columnar_catalog import ColumnarCatalog  # noqa: E402
+
+MARCAS = ['Bosch', 'LG', 'Samsung', 'balay', 'Ñu', 'AEG']
+TIPOS = ['Nevera', 'Lavadora', 'Horno']
+SORTS = ['id', '-id', 'precio', '-precio', 'marca', '-marca', 'modelo', '-modelo']
+
+
+def _rows(count, seed=7):
+    rng = random.Random(seed)
+    ids = list(range(1, count + 1))
+    # Las altas llegan desordenadas (commits concurrentes, shards): el orden por id no es el de las posiciones
+    rng.shuffle(ids)
+    return [
+        (id_, rng.choice(MARCAS), f'M-{rng.randrange(10 ** 6):06d}-{id_}', rng.choice(TIPOS),
+         float(rng.randrange(50, 90)), rng.choice(['A', 'B', None]), rng.random() < 0.5, 1)
+        for id_ in ids
+    ]
+
+
+def _as_dict(row):
+    id_, marca, modelo, tipo, precio, clase, en_stock, version = row
+    return {'id': id_, 'marca': marca, 'modelo': modelo, 'tipo': tipo, 'precio': precio,
+            'clase_energetica': clase, 'en_stock': en_stock, 'version': version}
+
+
+def _expected(rows, sort='id', limit=None, after=None, **filters):
+    """Mismo resultado que el ORDER BY columna, id (ambos en el sentido pedido) del repositorio."""
+    column = sort.lstrip('-')
+    descending = sort.startswith('-')
+    selected = [r for r in map(_as_dict, rows) if all(r[k] == v for k, v in filters.items())]
+    selected.sort(key=lambda r: (r[column], r['id']), reverse=descending)
+    if after is not None:
+        key = tuple(after)
+        selected = [r for r in selected if ((r[column], r['id']) < key if descending else (r[column], r['id']) > key)]
+    return selected[:limit] if limit is not None else selected
+
+
+@pytest.mark.parametrize('sort', SORTS)
+def test_order_matches_repository_order(sort):
+    rows = _rows(500)
+    catalog = ColumnarCatalog.from_rows(rows, generation=1)
+    assert catalog.filter(sort=sort) == _expected(rows, sort)
+
+
+@pytest.mark.parametrize('sort', SORTS)
+def test_top_k_with_filters(sort):
+    rows = _rows(2000)
+    catalog = ColumnarCatalog.from_rows(rows, generation=1)
+    result = catalog.filter(tipo='Nevera', en_stock=True, sort=sort, limit=25)
+    assert result == _expected(rows, sort, limit=25, tipo='Nevera', en_stock=True)
+
+
+@pytest.mark.parametrize('sort', SORTS)
+def test_keyset_pages_cover_the_listing(sort):
+    rows = _rows(300)
+    catalog = ColumnarCatalog.from_rows(rows, generation=1)
+    column = sort.lstrip('-')
+    pages, after = [], None
+    while True:
+        page = catalog.filter(sort=sort, limit=40, after=after)
+        pages.extend(page)
+        if len(page) < 40:
+            break
+        after = (page[-1][column], page[-1]['id'])
+    assert pages == _expected(rows, sort)
+
+
+def test_updates_and_deletes_are_visible():
+    rows = _rows(50)
+    catalog = ColumnarCatalog.from_rows(rows, generation=1)
+    updated = (rows[0][0], 'LG', 'AAA-renombrado', 'Horno', 10.0, 'A', True, 2)
+    deleted = rows[1][0]
+    assert catalog.apply([('guardado', updated), ('eliminado', (deleted,))], 1, 2)
+    expected = [updated if r[0] == updated[0] else r for r in rows if r[0] != deleted]
+    for sort in SORTS:
+        assert catalog.filter(sort=sort) == _expected(expected, sort)
+
+
+def test_apply_rejects_a_stale_generation():
+    catalog = ColumnarCatalog.from_rows(_rows(10), generation=3)
+    assert not catalog.apply([('eliminado', (1,))], 1, 2)
+    assert catalog.generation == 3
+    assert len(catalog.filter()) == 10
+
+
+def test_deleted_slots_are_compacted(monkeypatch):
+    monkeypatch.setattr(columnar, 'COMPACT_MIN_SLOTS', 10)
+    rows = _rows(100)
+    catalog = ColumnarCatalog.from_rows(rows, generation=1)
+    doomed = [r[0] for r in rows[:40]]
+    renamed = (rows[50][0], 'AEG', 'otro-modelo', 'Horno', 12.0, None, False, 2)
+    assert catalog.apply([('eliminado', (i,)) for i in doomed] + [('guardado', renamed)], 1, 2)
+    survivors = [renamed if r[0] == renamed[0] else r for r in rows[40:]]
+    assert catalog.size == len(survivors)
+    assert catalog.dead == 0
+    assert len(catalog.modelos.values) == len(survivors)
+    assert catalog.alive[:catalog.size].all()
+    for sort in SORTS:
+        assert catalog.filter(sort=sort) == _expected(survivors, sort)
+    # Las posiciones siguen siendo válidas para escrituras posteriores
+    assert catalog.apply([('eliminado', (survivors[0][0],))], 2, 3)
+    assert catalog.filter() == _expected(survivors[1:])
+
+
+def test_unknown_filter_values_return_nothing():
+    catalog = ColumnarCatalog.from_rows(_rows(20), generation=1)
+    assert catalog.filter(tipo='Secadora') == []
+    assert catalog.filter(marca='Desconocida') == []